@@ -1,6 +1,11 @@
 from django.contrib import admin
+from django.utils import timezone
 
-from .models import RSVP, Category, Event, Payment, Profile
+from .cancellation import start_cancellation
+from .models import (RSVP, Broadcast, Category, Coupon, CouponRedemption,
+                     Event, EventCancellation, Job, MediaBlob, OutboxEmail,
+                     Payment, PaymentItem, PaymentNotification, PeriodicTask,
+                     Profile, Refund, ReminderSchedule, RevenueLedger)
 
 
 @admin.register(Category)
@@ -11,6 +16,13 @@ class CategoryAdmin(admin.ModelAdmin):
     readonly_fields = ("created", "modified")
 
 
+class RSVPInline(admin.TabularInline):
+    model = RSVP
+    extra = 0
+    raw_id_fields = ("user",)
+    readonly_fields = ("created",)
+
+
 @admin.register(Event)
 class EventAdmin(admin.ModelAdmin):
     list_display = (
@@ -20,13 +32,21 @@ class EventAdmin(admin.ModelAdmin):
         "date",
         "status",
         "tickets_sold",
+        "view_count",
         "created",
     )
     list_filter = ("status", "category", "date", "created")
     search_fields = ("name", "description", "location", "organizer__username")
-    readonly_fields = ("created", "modified", "tickets_sold")
-    filter_horizontal = ("participants",)
+    readonly_fields = (
+        "created",
+        "modified",
+        "tickets_sold",
+        "tickets_reserved",
+        "view_count",
+    )
+    inlines = [RSVPInline]
     date_hierarchy = "date"
+    actions = ["cancel_events"]
 
     fieldsets = (
         (
@@ -34,19 +54,226 @@ class EventAdmin(admin.ModelAdmin):
             {"fields": ("name", "description", "category", "organizer")},
         ),
         ("Event Details", {"fields": ("date", "time", "location", "image")}),
-        ("Pricing & Status", {"fields": ("ticket_price", "status", "tickets_sold")}),
-        ("Participants", {"fields": ("participants",), "classes": ("collapse",)}),
+        (
+            "Pricing & Status",
+            {
+                "fields": (
+                    "ticket_price",
+                    "capacity",
+                    "status",
+                    "tickets_sold",
+                    "tickets_reserved",
+                    "view_count",
+                )
+            },
+        ),
         ("Timestamps", {"fields": ("created", "modified"), "classes": ("collapse",)}),
     )
 
+    @admin.action(description="Cancel selected events, refund and notify attendees")
+    def cancel_events(self, request, queryset):
+        for event in queryset.exclude(status="cancelled"):
+            start_cancellation(event, user=request.user)
+        self.message_user(request, "Cancellation started for the selected events.")
+
+
+class PaymentItemInline(admin.TabularInline):
+    model = PaymentItem
+    extra = 0
+    readonly_fields = ("description", "unit_price", "quantity")
+    can_delete = False
+
 
 @admin.register(Payment)
 class PaymentAdmin(admin.ModelAdmin):
-    list_display = ("transaction_id", "user", "event", "amount", "status", "created")
+    list_display = (
+        "transaction_id",
+        "user",
+        "event",
+        "quantity",
+        "amount",
+        "status",
+        "created",
+    )
     list_filter = ("status", "created")
     search_fields = ("transaction_id", "user__username", "event__name")
     readonly_fields = ("created", "modified")
     date_hierarchy = "created"
+    inlines = [PaymentItemInline]
+
+
+@admin.register(Coupon)
+class CouponAdmin(admin.ModelAdmin):
+    list_display = (
+        "code",
+        "event",
+        "discount_type",
+        "value",
+        "redemptions_count",
+        "max_redemptions",
+        "is_active",
+    )
+    list_filter = ("discount_type", "is_active", "created")
+    search_fields = ("code", "event__name")
+    raw_id_fields = ("event",)
+    # Changed only through conditional updates when coupons are redeemed
+    readonly_fields = ("redemptions_count", "created", "modified")
+
+
+@admin.register(CouponRedemption)
+class CouponRedemptionAdmin(admin.ModelAdmin):
+    list_display = ("coupon", "user", "payment", "discount", "created")
+    search_fields = ("coupon__code", "user__username", "payment__transaction_id")
+    raw_id_fields = ("coupon", "user", "payment")
+    readonly_fields = ("created", "modified")
+
+
+@admin.register(PaymentNotification)
+class PaymentNotificationAdmin(admin.ModelAdmin):
+    list_display = ("transaction_id", "source", "status", "attempts", "created")
+    list_filter = ("source", "status", "created")
+    search_fields = ("transaction_id",)
+    readonly_fields = ("created", "modified", "processed_at")
+    date_hierarchy = "created"
+
+
+@admin.register(OutboxEmail)
+class OutboxEmailAdmin(admin.ModelAdmin):
+    list_display = ("subject", "recipients", "status", "attempts", "created", "sent_at")
+    list_filter = ("status", "created")
+    search_fields = ("subject",)
+    readonly_fields = ("created", "modified", "sent_at", "claim_token")
+    date_hierarchy = "created"
+    actions = ["retry_emails"]
+
+    @admin.action(description="Retry selected emails now")
+    def retry_emails(self, request, queryset):
+        retried = queryset.exclude(status="sent").update(
+            status="pending", next_attempt_at=timezone.now(), modified=timezone.now()
+        )
+        self.message_user(request, f"Queued {retried} email(s) for another attempt.")
+
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    list_display = (
+        "name",
+        "queue",
+        "priority",
+        "status",
+        "attempts",
+        "run_at",
+        "finished_at",
+    )
+    list_filter = ("status", "queue", "name")
+    search_fields = ("name", "last_error")
+    readonly_fields = (
+        "created",
+        "modified",
+        "started_at",
+        "finished_at",
+        "claim_token",
+    )
+    date_hierarchy = "created"
+    actions = ["retry_jobs"]
+
+    @admin.action(description="Retry selected jobs now")
+    def retry_jobs(self, request, queryset):
+        retried = queryset.exclude(status__in=["running", "succeeded"]).update(
+            status="queued",
+            attempts=0,
+            run_at=timezone.now(),
+            finished_at=None,
+            modified=timezone.now(),
+        )
+        self.message_user(request, f"Queued {retried} job(s) for another run.")
+
+
+@admin.register(PeriodicTask)
+class PeriodicTaskAdmin(admin.ModelAdmin):
+    list_display = ("name", "next_run_at", "last_run_at", "runs", "skips")
+    search_fields = ("name",)
+    raw_id_fields = ("last_job",)
+    readonly_fields = ("created", "modified", "last_run_at", "runs", "skips")
+    actions = ["run_now"]
+
+    @admin.action(description="Run selected tasks on the next scheduler pass")
+    def run_now(self, request, queryset):
+        updated = queryset.update(next_run_at=timezone.now(), modified=timezone.now())
+        self.message_user(request, f"Scheduled {updated} task(s) to run now.")
+
+
+@admin.register(Refund)
+class RefundAdmin(admin.ModelAdmin):
+    list_display = (
+        "payment",
+        "amount",
+        "status",
+        "attempts",
+        "refund_ref_id",
+        "created",
+    )
+    list_filter = ("status", "created")
+    search_fields = ("payment__transaction_id", "refund_ref_id")
+    raw_id_fields = ("payment",)
+    readonly_fields = ("created", "modified")
+
+
+@admin.register(Broadcast)
+class BroadcastAdmin(admin.ModelAdmin):
+    list_display = (
+        "subject",
+        "event",
+        "kind",
+        "status",
+        "recipients_queued",
+        "recipients_total",
+        "send_after",
+    )
+    list_filter = ("kind", "status", "created")
+    search_fields = ("subject", "event__name")
+    raw_id_fields = ("event", "sender")
+    readonly_fields = ("created", "modified", "finished_at", "next_send_at")
+
+
+@admin.register(EventCancellation)
+class EventCancellationAdmin(admin.ModelAdmin):
+    list_display = (
+        "event",
+        "status",
+        "refunds_requested",
+        "refunds_total",
+        "attendees_notified",
+        "attendees_total",
+        "created",
+    )
+    list_filter = ("status", "created")
+    search_fields = ("event__name",)
+    raw_id_fields = ("event", "requested_by")
+    readonly_fields = ("created", "modified", "finished_at")
+
+
+@admin.register(RevenueLedger)
+class RevenueLedgerAdmin(admin.ModelAdmin):
+    list_display = ("day", "event", "organizer", "revenue", "tickets")
+    list_filter = ("day",)
+    search_fields = ("event__name", "organizer__username")
+    raw_id_fields = ("event", "organizer")
+    readonly_fields = ("created", "modified")
+    date_hierarchy = "day"
+
+
+@admin.register(ReminderSchedule)
+class ReminderScheduleAdmin(admin.ModelAdmin):
+    list_display = ("window", "sent_until", "run_until", "last_user_id", "modified")
+    readonly_fields = ("created", "modified")
+
+
+@admin.register(MediaBlob)
+class MediaBlobAdmin(admin.ModelAdmin):
+    list_display = ("name", "size", "refs", "created")
+    search_fields = ("name", "digest")
+    readonly_fields = ("digest", "name", "size", "refs", "created", "modified")
 
 
 @admin.register(Profile)
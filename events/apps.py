@@ -6,5 +6,6 @@ class EventsConfig(AppConfig):
     name = "events"
 
     def ready(self):
-        # Import signals here to ensure they are connected
-        pass
+        # Registers domain event handlers and the signals bridged onto them
+        from . import handlers  # noqa: F401
+        from . import tasks  # noqa: F401
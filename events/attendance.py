@@ -0,0 +1,113 @@
+"""
+Attendance services for EventMan.
+RSVP rows are the source of truth; Event.participants mirrors attending
+users for the admin and legacy m2m consumers.
+"""
+
+from typing import Dict, Iterable
+
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.utils import timezone
+
+from .constants import BULK_REGISTRATION, RSVPStatus
+from .domain_events import ParticipantAdded, publish
+from .models import RSVP, Event
+
+User = get_user_model()
+
+
+def set_rsvp_status(event: Event, user: User, status: str) -> RSVP:
+    """Record a user's RSVP and keep the participants mirror in step."""
+    with transaction.atomic():
+        rsvp, _ = RSVP.objects.update_or_create(
+            event=event, user=user, defaults={"status": status}
+        )
+        if status == RSVPStatus.ATTENDING:
+            event.participants.add(user)
+        else:
+            event.participants.remove(user)
+    return rsvp
+
+
+def is_attending(event: Event, user: User) -> bool:
+    """Check attendance with a single (event, status) index lookup."""
+    if not user.is_authenticated:
+        return False
+    return RSVP.objects.attending().filter(event=event, user=user).exists()
+
+
+def attend_event(event: Event, user: User) -> bool:
+    """Mark a user attending, unless the event is full; False if it is.
+
+    Seats are counted against a locked event row, so concurrent RSVPs
+    cannot take the last seat twice.
+    """
+    with transaction.atomic():
+        event = Event.objects.select_for_update().get(pk=event.pk)
+        if event.seats_left() == 0 and not is_attending(event, user):
+            return False
+        set_rsvp_status(event, user, RSVPStatus.ATTENDING)
+    return True
+
+
+def register_attendees(event: Event, users: Iterable[User]) -> Dict:
+    """Register a group of users as attending in one transaction.
+
+    Capacity is checked once against a locked event row, new RSVPs are
+    written with bulk_create and the group is published as a single ParticipantAdded.
+    """
+    user_ids = {user.pk for user in users}
+    batch_size = BULK_REGISTRATION["BATCH_SIZE"]
+
+    with transaction.atomic():
+        event = Event.objects.select_for_update().get(pk=event.pk)
+        existing = dict(
+            RSVP.objects.filter(event=event, user_id__in=user_ids).values_list(
+                "user_id", "status"
+            )
+        )
+        already_attending = {
+            pk for pk, status in existing.items() if status == RSVPStatus.ATTENDING
+        }
+        to_update = set(existing) - already_attending
+        to_create = user_ids - set(existing)
+        registered = sorted(to_create | to_update)
+
+        if event.capacity is not None and registered:
+            seats_left = event.seats_left()
+            if len(registered) > seats_left:
+                return {
+                    "success": False,
+                    "error": f"Only {seats_left} seat(s) left for {len(registered)} attendee(s)",
+                }
+
+        RSVP.objects.bulk_create(
+            [
+                RSVP(event=event, user_id=pk, status=RSVPStatus.ATTENDING)
+                for pk in to_create
+            ],
+            batch_size=batch_size,
+        )
+        if to_update:
+            RSVP.objects.filter(event=event, user_id__in=to_update).update(
+                status=RSVPStatus.ATTENDING, modified=timezone.now()
+            )
+
+        # Mirror rows are inserted directly, skipping per-row m2m_changed, and
+        # the whole group is published as one ParticipantAdded
+        through = Event.participants.through
+        through.objects.bulk_create(
+            [through(event_id=event.pk, user_id=pk) for pk in registered],
+            batch_size=batch_size,
+            ignore_conflicts=True,
+        )
+
+        if registered:
+            publish(ParticipantAdded(event.pk, tuple(registered)))
+
+    return {
+        "success": True,
+        "registered": registered,
+        "already_registered": sorted(already_attending),
+    }
@@ -0,0 +1,186 @@
+"""
+Organizer broadcasts and change notices for EventMan.
+A broadcast walks the attendee set in keyset chunks, queueing each chunk in
+the email outbox together with its watermark advance. Sends are spread out
+to BROADCASTS["EMAILS_PER_SECOND"], and quick successive edits of an event
+are merged into a single change notice.
+"""
+
+import logging
+from datetime import timedelta
+from typing import Dict, Optional, Tuple
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.mail import EmailMultiAlternatives
+from django.db import transaction
+from django.db.models import F, Q
+from django.template.loader import render_to_string
+from django.utils import timezone
+from django.utils.html import strip_tags
+
+from .constants import BROADCASTS, DEFAULT_NOREPLY_EMAIL
+from .jobs import enqueue_job
+from .models import RSVP, Broadcast, Event
+from .outbox import enqueue_messages
+
+User = get_user_model()
+logger = logging.getLogger(__name__)
+
+
+def start_broadcast(event: Event, sender, subject: str, message: str) -> Broadcast:
+    """Queue an organizer message to every attendee as a background job."""
+    broadcast = Broadcast.objects.create(
+        event=event, sender=sender, kind="message", subject=subject, message=message
+    )
+    dispatch_broadcast(broadcast.pk)
+    return broadcast
+
+
+def record_event_changes(
+    event: Event, changes: Dict[str, Tuple[str, str]], sender_id: Optional[int] = None
+) -> Optional[Broadcast]:
+    """Schedule a change notice, merging it into one that has not gone out yet.
+
+    Every edit pushes the notice back by CHANGE_DEBOUNCE seconds, and fields
+    edited back to their original value drop out of it.
+    """
+    send_after = timezone.now() + timedelta(seconds=BROADCASTS["CHANGE_DEBOUNCE"])
+    with transaction.atomic():
+        broadcast = (
+            Broadcast.objects.select_for_update()
+            .filter(event=event, kind="change", status="pending")
+            .first()
+        )
+        merged = dict(broadcast.changes) if broadcast else {}
+        for field, (old, new) in changes.items():
+            original = merged.get(field, [old])[0]
+            if original == new:
+                merged.pop(field, None)
+            else:
+                merged[field] = [original, new]
+
+        if broadcast is None:
+            if not merged:
+                return None
+            return Broadcast.objects.create(
+                event=event,
+                sender_id=sender_id,
+                kind="change",
+                subject=f"Update to {event.name}",
+                changes=merged,
+                send_after=send_after,
+            )
+        if not merged:
+            broadcast.delete()
+            return None
+        broadcast.changes = merged
+        broadcast.send_after = send_after
+        broadcast.save(update_fields=["changes", "send_after", "modified"])
+        return broadcast
+
+
+def dispatch_broadcast(broadcast_id: int):
+    """Queue the job running a broadcast, in the caller's transaction."""
+    enqueue_job("broadcasts.run", {"broadcast_id": broadcast_id})
+
+
+def _due_broadcasts():
+    now = timezone.now()
+    stale_before = now - timedelta(seconds=BROADCASTS["STALE_AFTER"])
+    return Broadcast.objects.filter(
+        Q(status="pending", send_after__lte=now)
+        | Q(status="sending", modified__lt=stale_before)
+    )
+
+
+def claim_broadcast(broadcast_id: int) -> Optional[Broadcast]:
+    """Atomically claim a due (or crashed) broadcast."""
+    if not (
+        _due_broadcasts()
+        .filter(pk=broadcast_id)
+        .update(status="sending", modified=timezone.now())
+    ):
+        return None
+    return Broadcast.objects.select_related("event").get(pk=broadcast_id)
+
+
+def build_broadcast_message(broadcast: Broadcast) -> Tuple[str, str]:
+    """Render a broadcast once; every attendee gets the same body."""
+    html_message = render_to_string(
+        "emails/event_broadcast.html",
+        {"broadcast": broadcast, "event": broadcast.event},
+    )
+    return html_message, strip_tags(html_message)
+
+
+def run_broadcast(broadcast_id: int, batch_size: int = None) -> int:
+    """Queue a claimed broadcast for every attendee, chunk by chunk."""
+    broadcast = claim_broadcast(broadcast_id)
+    if broadcast is None:
+        return 0
+
+    batch_size = batch_size or BROADCASTS["BATCH_SIZE"]
+    per_second = BROADCASTS["EMAILS_PER_SECOND"]
+    from_email = getattr(settings, "DEFAULT_FROM_EMAIL", DEFAULT_NOREPLY_EMAIL)
+    html_message, body = build_broadcast_message(broadcast)
+    attendees = RSVP.objects.attending().filter(event=broadcast.event)
+    Broadcast.objects.filter(pk=broadcast.pk).update(recipients_total=attendees.count())
+
+    queued = 0
+    watermark = broadcast.last_user_id
+    next_send_at = broadcast.next_send_at
+    while True:
+        user_ids = list(
+            attendees.filter(user_id__gt=watermark)
+            .order_by("user_id")
+            .values_list("user_id", flat=True)[:batch_size]
+        )
+        if not user_ids:
+            break
+        emails = User.objects.filter(pk__in=user_ids).exclude(email="")
+        messages = []
+        for email in emails.values_list("email", flat=True):
+            message = EmailMultiAlternatives(
+                subject=broadcast.subject,
+                body=body,
+                from_email=from_email,
+                to=[email],
+            )
+            message.attach_alternative(html_message, "text/html")
+            messages.append(message)
+
+        start = max(next_send_at or timezone.now(), timezone.now())
+        with transaction.atomic():
+            # The watermark only moves if this run still owns the broadcast
+            next_send_at = start + timedelta(seconds=len(messages) / per_second)
+            if not Broadcast.objects.filter(
+                pk=broadcast.pk, status="sending", last_user_id=watermark
+            ).update(
+                last_user_id=user_ids[-1],
+                next_send_at=next_send_at,
+                recipients_queued=F("recipients_queued") + len(messages),
+                modified=timezone.now(),
+            ):
+                logger.warning(f"Broadcast {broadcast.pk} taken over, stopping")
+                return queued
+            queued += enqueue_messages(
+                messages, not_before=start, per_second=per_second
+            )
+        watermark = user_ids[-1]
+
+    Broadcast.objects.filter(pk=broadcast.pk, status="sending").update(
+        status="completed", finished_at=timezone.now(), modified=timezone.now()
+    )
+    logger.info(f"Broadcast {broadcast.pk} queued for {queued} attendee(s)")
+    return queued
+
+
+def send_due_broadcasts() -> int:
+    """Run every due broadcast, including debounced change notices."""
+    sent = 0
+    for broadcast_id in (
+        _due_broadcasts().order_by("send_after").values_list("pk", flat=True)
+    ):
+        sent += run_broadcast(broadcast_id)
+    return sent
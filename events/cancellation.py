@@ -0,0 +1,377 @@
+"""
+Event cancellation pipeline for EventMan.
+Cancelling an event only flips its status and records an EventCancellation;
+a background job then requests refunds in parallel, rate-limited batches and
+queues attendee notices on the email outbox, with progress stored on the
+cancellation.
+"""
+
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from typing import List
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.mail import EmailMultiAlternatives
+from django.db import connection as db_connection
+from django.db import transaction
+from django.db.models import F
+from django.template.loader import render_to_string
+from django.utils import timezone
+from django.utils.html import strip_tags
+
+from .constants import CANCELLATION, DEFAULT_NOREPLY_EMAIL
+from .jobs import enqueue_job
+from .jobs import heartbeat as job_heartbeat
+from .models import (RSVP, Event, EventCancellation, Payment, Refund,
+                     RevenueLedger)
+from .outbox import enqueue_messages
+from .payment_gateway import RefundNotProcessed, get_gateway_client
+from .redis_utils import redis_client
+
+User = get_user_model()
+logger = logging.getLogger(__name__)
+
+
+class RateLimiter:
+    """Spaces calls evenly across threads to stay under a per-second rate."""
+
+    def __init__(self, per_second: float):
+        self.interval = 1.0 / per_second
+        self.next_at = time.monotonic()
+        self.lock = threading.Lock()
+
+    def wait(self):
+        with self.lock:
+            now = time.monotonic()
+            start_at = max(now, self.next_at)
+            self.next_at = start_at + self.interval
+        if start_at > now:
+            time.sleep(start_at - now)
+
+
+def start_cancellation(event: Event, user=None, reason: str = "") -> EventCancellation:
+    """Cancel an event and queue its refunds and notices after commit."""
+    with transaction.atomic():
+        event.status = "cancelled"
+        event.save()
+        cancellation, created = EventCancellation.objects.get_or_create(
+            event=event, defaults={"requested_by": user, "reason": reason}
+        )
+        if created:
+            dispatch_cancellation(cancellation.pk)
+    return cancellation
+
+
+def dispatch_cancellation(cancellation_id: int):
+    """Queue the job running a cancellation, in the caller's transaction."""
+    enqueue_job("cancellations.run", {"cancellation_id": cancellation_id})
+
+
+def run_cancellation(cancellation_id: int) -> bool:
+    """Refund and notify for a cancellation; safe to re-run after a crash."""
+    claimed = EventCancellation.objects.filter(
+        pk=cancellation_id, status__in=["pending", "failed"]
+    ).update(status="running", modified=timezone.now())
+    if not claimed:
+        return False
+
+    cancellation = EventCancellation.objects.select_related("event").get(
+        pk=cancellation_id
+    )
+    event = cancellation.event
+    try:
+        redis_client.invalidate_event_caches(event.pk)
+        queue_refunds(cancellation)
+        process_refunds(event_id=event.pk)
+        notify_attendees(cancellation)
+    except Exception as e:
+        logger.error(f"Cancellation of event {event.pk} failed: {e}")
+        EventCancellation.objects.filter(pk=cancellation_id).update(
+            status="failed", modified=timezone.now()
+        )
+        return False
+
+    update_refund_progress(cancellation_id)
+    EventCancellation.objects.filter(pk=cancellation_id).update(
+        status="completed", finished_at=timezone.now(), modified=timezone.now()
+    )
+    logger.info(f"Cancellation of event {event.pk} completed")
+    return True
+
+
+# ===== REFUNDS =====
+
+
+def queue_refunds(cancellation: EventCancellation) -> int:
+    """Create a pending Refund for every valid payment of the event."""
+    last_pk = 0
+    while True:
+        payments = list(
+            Payment.objects.filter(
+                event_id=cancellation.event_id, status="valid", pk__gt=last_pk
+            )
+            .order_by("pk")
+            .values_list("pk", "amount")[: CANCELLATION["BATCH_SIZE"]]
+        )
+        if not payments:
+            break
+        Refund.objects.bulk_create(
+            [Refund(payment_id=pk, amount=amount) for pk, amount in payments],
+            ignore_conflicts=True,
+        )
+        last_pk = payments[-1][0]
+
+    return update_refund_progress(cancellation.pk)
+
+
+def update_refund_progress(cancellation_id: int) -> int:
+    cancellation = EventCancellation.objects.get(pk=cancellation_id)
+    refunds = Refund.objects.filter(payment__event_id=cancellation.event_id)
+    cancellation.refunds_total = refunds.count()
+    cancellation.refunds_requested = refunds.filter(status="requested").count()
+    cancellation.refunds_failed = refunds.filter(status="failed").count()
+    cancellation.save(
+        update_fields=[
+            "refunds_total",
+            "refunds_requested",
+            "refunds_failed",
+            "modified",
+        ]
+    )
+    return cancellation.refunds_total
+
+
+def process_refunds(event_id: int = None, workers: int = None) -> int:
+    """Request pending refunds in parallel batches, retrying failed passes.
+
+    Refunds whose outcome is unknown (a transport error after the request was
+    sent, or a crash mid-request) are checked with the gateway before they
+    are ever requested again.
+    """
+    workers = workers or CANCELLATION["WORKERS"]
+    limiter = RateLimiter(CANCELLATION["REFUNDS_PER_SECOND"])
+    client = get_gateway_client()
+    cancellation = EventCancellation.objects.filter(event_id=event_id).first()
+    requested = 0
+
+    for attempt in range(CANCELLATION["MAX_REFUND_ATTEMPTS"]):
+        refunds = Refund.objects.all()
+        if event_id is not None:
+            refunds = refunds.filter(payment__event_id=event_id)
+        refunds.filter(
+            status="processing",
+            modified__lt=timezone.now()
+            - timedelta(seconds=CANCELLATION["REFUND_STALE_AFTER"]),
+        ).update(status="reconciling", modified=timezone.now())
+        refund_ids = list(
+            refunds.filter(status__in=["pending", "reconciling"])
+            .order_by("pk")
+            .values_list("pk", flat=True)
+        )
+        if not refund_ids:
+            break
+        if attempt:
+            _heartbeat(cancellation)
+            time.sleep(CANCELLATION["RETRY_DELAY"])
+
+        size = CANCELLATION["BATCH_SIZE"]
+        batches = [refund_ids[i : i + size] for i in range(0, len(refund_ids), size)]
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            for batch_requested in pool.map(
+                lambda batch: _refund_batch(batch, client, limiter), batches
+            ):
+                requested += batch_requested
+                _heartbeat(cancellation)
+        if cancellation is not None:
+            update_refund_progress(cancellation.pk)
+    return requested
+
+
+def _heartbeat(cancellation):
+    # Keeps a long healthy run, and the job running it, from being taken for
+    # a crashed one
+    job_heartbeat()
+    if cancellation is not None:
+        EventCancellation.objects.filter(pk=cancellation.pk).update(
+            modified=timezone.now()
+        )
+
+
+def _refund_batch(refund_ids: List[int], client, limiter: RateLimiter) -> int:
+    try:
+        requested = 0
+        for refund_id in refund_ids:
+            limiter.wait()
+            requested += reconcile_refund(refund_id, client) or process_refund(
+                refund_id, client
+            )
+        return requested
+    finally:
+        db_connection.close()
+
+
+def process_refund(refund_id: int, client) -> bool:
+    """Claim one pending refund and request it from the gateway."""
+    claimed = Refund.objects.filter(pk=refund_id, status="pending").update(
+        status="processing", attempts=F("attempts") + 1, modified=timezone.now()
+    )
+    if not claimed:
+        return False
+
+    refund = Refund.objects.select_related("payment__event").get(pk=refund_id)
+    payment = refund.payment
+    try:
+        refund_ref_id = client.refund_transaction(
+            payment.transaction_id,
+            refund.amount,
+            f"Event cancelled: {payment.event.name}",
+        )
+    except RefundNotProcessed as e:
+        logger.warning(f"Refund of {payment.transaction_id} not made: {e}")
+        _retry_or_fail(refund, str(e))
+        return False
+    except Exception as e:
+        # The gateway may have refunded anyway; never request it blindly again
+        logger.warning(f"Refund of {payment.transaction_id} is unknown: {e}")
+        refund.status = "reconciling"
+        refund.last_error = str(e)
+        refund.save(update_fields=["status", "last_error", "modified"])
+        return False
+
+    _complete_refund(refund, refund_ref_id)
+    return True
+
+
+def reconcile_refund(refund_id: int, client) -> bool:
+    """Settle a refund of unknown outcome from the gateway's records.
+
+    Returns True if the gateway did refund it; a refund it has no record of
+    goes back to pending, to be requested again.
+    """
+    claimed = Refund.objects.filter(pk=refund_id, status="reconciling").update(
+        status="processing", modified=timezone.now()
+    )
+    if not claimed:
+        return False
+
+    refund = Refund.objects.select_related("payment").get(pk=refund_id)
+    try:
+        refund_ref_id = client.find_refund(refund.payment.transaction_id)
+    except Exception as e:
+        logger.warning(f"Refund of {refund.payment.transaction_id} unchecked: {e}")
+        refund.status = "reconciling"
+        refund.last_error = str(e)
+        refund.save(update_fields=["status", "last_error", "modified"])
+        return False
+
+    if refund_ref_id is None:
+        _retry_or_fail(refund, refund.last_error)
+        return False
+    _complete_refund(refund, refund_ref_id)
+    return True
+
+
+def _retry_or_fail(refund: Refund, error: str):
+    refund.last_error = error
+    refund.status = (
+        "pending" if refund.attempts < CANCELLATION["MAX_REFUND_ATTEMPTS"] else "failed"
+    )
+    refund.save(update_fields=["status", "last_error", "modified"])
+
+
+def _complete_refund(refund: Refund, refund_ref_id: str):
+    payment = refund.payment
+    with transaction.atomic():
+        refund.status = "requested"
+        refund.refund_ref_id = refund_ref_id
+        refund.last_error = ""
+        refund.save(update_fields=["status", "refund_ref_id", "last_error", "modified"])
+        if Payment.objects.filter(pk=payment.pk, status="valid").update(
+            status="refunded", modified=timezone.now()
+        ):
+            Event.objects.filter(
+                pk=payment.event_id, tickets_sold__gte=payment.quantity
+            ).update(tickets_sold=F("tickets_sold") - payment.quantity)
+            if payment.paid_at:
+                RevenueLedger.objects.filter(
+                    event_id=payment.event_id,
+                    day=timezone.localdate(payment.paid_at),
+                    tickets__gte=payment.quantity,
+                ).update(
+                    revenue=F("revenue") - payment.amount,
+                    tickets=F("tickets") - payment.quantity,
+                    modified=timezone.now(),
+                )
+
+
+# ===== NOTIFICATIONS =====
+
+
+def build_cancellation_notice(event: Event, cancellation, user):
+    html_message = render_to_string(
+        "emails/event_cancelled.html",
+        {"user": user, "event": event, "cancellation": cancellation},
+    )
+    message = EmailMultiAlternatives(
+        subject=f"Event cancelled: {event.name}",
+        body=strip_tags(html_message),
+        from_email=getattr(settings, "DEFAULT_FROM_EMAIL", DEFAULT_NOREPLY_EMAIL),
+        to=[user.email],
+    )
+    message.attach_alternative(html_message, "text/html")
+    return message
+
+
+def notify_attendees(cancellation: EventCancellation) -> int:
+    """Queue a cancellation notice for every attending user, batch by batch.
+
+    Each batch goes on the outbox in the transaction that moves the
+    watermark past it, so a resumed run neither skips nor repeats anyone.
+    """
+    size = CANCELLATION["BATCH_SIZE"]
+    per_second = CANCELLATION["EMAILS_PER_SECOND"]
+    event = cancellation.event
+    attendees = RSVP.objects.attending().filter(event=event)
+
+    EventCancellation.objects.filter(pk=cancellation.pk).update(
+        attendees_total=attendees.count()
+    )
+
+    queued = 0
+    watermark = cancellation.last_notified_user_id
+    next_send_at = timezone.now()
+    while True:
+        user_ids = list(
+            attendees.filter(user_id__gt=watermark)
+            .order_by("user_id")
+            .values_list("user_id", flat=True)[:size]
+        )
+        if not user_ids:
+            break
+        users = User.objects.filter(pk__in=user_ids).exclude(email="")
+        messages = [
+            build_cancellation_notice(event, cancellation, user) for user in users
+        ]
+
+        start = max(next_send_at, timezone.now())
+        with transaction.atomic():
+            # The watermark only moves if this run still owns the cancellation
+            if not EventCancellation.objects.filter(
+                pk=cancellation.pk, last_notified_user_id=watermark
+            ).update(
+                attendees_notified=F("attendees_notified") + len(user_ids),
+                last_notified_user_id=user_ids[-1],
+                modified=timezone.now(),
+            ):
+                logger.warning(f"Cancellation {cancellation.pk} taken over, stopping")
+                return queued
+            queued += enqueue_messages(
+                messages, not_before=start, per_second=per_second
+            )
+        next_send_at = start + timedelta(seconds=len(messages) / per_second)
+        watermark = user_ids[-1]
+    return queued
@@ -0,0 +1,12 @@
+"""
+Deduplicating Cloudinary media storage (see events/media_storage.py).
+Kept apart because importing cloudinary_storage requires credentials.
+"""
+
+from cloudinary_storage.storage import MediaCloudinaryStorage
+
+from .media_storage import DedupStorageMixin
+
+
+class DedupMediaCloudinaryStorage(DedupStorageMixin, MediaCloudinaryStorage):
+    pass
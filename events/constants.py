@@ -18,7 +18,25 @@ DEFAULT_NOREPLY_EMAIL = "noreply@eventman.com"
 CACHE_TIMEOUTS = {
     "DASHBOARD_STATS": 300,  # 5 minutes
     "SEARCH_RESULTS": 600,  # 10 minutes
-    "EVENT_VIEWS": 86400,  # 24 hours
+}
+
+# View tracking: buffered in-process, flushed to Redis, persisted to the DB
+VIEW_TRACKING = {
+    "FLUSH_THRESHOLD": 50,  # buffered views before a Redis flush
+    "FLUSH_INTERVAL": 10,  # seconds between Redis flushes
+    "PERSIST_BATCH_SIZE": 500,  # events per database UPDATE
+}
+
+# Trending leaderboard: exponentially decayed activity scores in a Redis ZSET
+TRENDING = {
+    "HALF_LIFE": 86400,  # seconds for an activity's weight to halve
+    "MAX_TRACKED": 1000,  # events kept in the sorted set
+    "DEFAULT_LIMIT": 6,
+    "WEIGHTS": {
+        "view": 1,
+        "rsvp": 5,
+        "payment": 10,
+    },
 }
 
 # Payment Status Choices
@@ -26,11 +44,297 @@ PAYMENT_STATUS_CHOICES = [
     ("pending", "Pending"),
     ("valid", "Valid"),
     ("failed", "Failed"),
+    ("refunded", "Refunded"),
+]
+
+# Checkout idempotency: repeated submits of one checkout page reuse its session
+CHECKOUT = {
+    "SESSION_TTL": 900,  # seconds a pending gateway session is reused
+    # Seconds a submit may take to start its session before it counts as crashed;
+    # covers a gateway call's connect and read timeouts
+    "IN_FLIGHT_TIMEOUT": 15,
+    "IN_FLIGHT_POLL": 1,  # seconds between a resubmitted page's status checks
+    "MAX_QUANTITY": 10,  # tickets per order
+    "CURRENCY": "BDT",  # charged and required back from the validation API
+}
+
+# Coupons: Redis counters gate redemptions, the database is the source of truth
+COUPON_DISCOUNT_TYPE_CHOICES = [
+    ("percent", "Percent"),
+    ("fixed", "Fixed amount"),
+]
+
+COUPONS = {
+    "COUNTER_TTL": 86400,  # seconds before Redis counters are re-seeded
+}
+
+# Payment notification inbox (IPN and redirect payloads awaiting validation)
+PAYMENT_NOTIFICATION_SOURCE_CHOICES = [
+    ("ipn", "IPN"),
+    ("redirect", "Redirect"),
+]
+
+PAYMENT_NOTIFICATION_STATUS_CHOICES = [
+    ("pending", "Pending"),
+    ("processing", "Processing"),
+    ("processed", "Processed"),
+    ("failed", "Failed"),
+]
+
+PAYMENT_INBOX = {
+    "WORKERS": 4,  # background validation threads per process
+    "MAX_ATTEMPTS": 5,  # gateway errors retried before giving up
+    "STALE_AFTER": 300,  # seconds before a processing claim is retried
+    "POLL_INTERVAL": 2,  # seconds between success page status polls
+}
+
+# Transactional email outbox, sent in batches by a background dispatcher
+OUTBOX_STATUS_CHOICES = [
+    ("pending", "Pending"),
+    ("sending", "Sending"),
+    ("sent", "Sent"),
+    ("failed", "Failed"),
+]
+
+OUTBOX = {
+    "BATCH_SIZE": 100,  # messages sent per SMTP connection
+    "MAX_ATTEMPTS": 5,  # sends tried before a message is marked failed
+    "BACKOFF_BASE": 30,  # seconds before the first retry, doubled per attempt
+    "BACKOFF_MAX": 3600,  # longest wait between retries
+    "STALE_AFTER": 600,  # seconds before a sending claim is retried
+    "POLL_INTERVAL": 5,  # seconds between sweeps of dispatch_outbox --loop
+    "DISPATCH_ON_COMMIT": True,  # kick a background dispatch after each enqueue
+}
+
+# Database-backed background jobs, run by the run_workers command
+JOB_STATUS_CHOICES = [
+    ("queued", "Queued"),
+    ("running", "Running"),
+    ("succeeded", "Succeeded"),
+    ("dead", "Dead"),  # out of attempts, kept for inspection and retry
 ]
 
+JOBS = {
+    "QUEUE": "default",
+    "MAX_ATTEMPTS": 5,  # runs tried before a job is dead-lettered
+    "BACKOFF_BASE": 10,  # seconds before the first retry, doubled per attempt
+    "BACKOFF_MAX": 3600,  # longest wait between retries
+    "STALE_AFTER": 1800,  # seconds before a running claim is retried
+    "BATCH_SIZE": 10,  # jobs claimed per worker round trip
+    "CONCURRENCY": 4,  # worker threads or processes per run_workers
+    "POLL_INTERVAL": 2,  # seconds an idle worker waits before polling again
+    "METRICS_WINDOW": 300,  # seconds of finished jobs used for throughput
+}
+
+# Periodic tasks, enqueued as jobs by the leader-elected scheduler that
+# run_workers starts. "every" and "jitter" are in seconds; a run is skipped
+# while the previous one is still queued or running.
+PERIODIC_TASKS = {
+    "send-due-broadcasts": {"job": "broadcasts.send_due", "every": 60},
+    "dispatch-outbox": {"job": "outbox.dispatch", "every": 60},
+    "flush-event-views": {"job": "views.flush", "every": 60, "jitter": 10},
+    "day-reminders": {
+        "job": "reminders.send",
+        "every": 300,
+        "payload": {"window": "day"},
+    },
+    "hour-reminders": {
+        "job": "reminders.send",
+        "every": 120,
+        "payload": {"window": "hour"},
+    },
+    "reconcile-payments": {"job": "payments.reconcile", "every": 600, "jitter": 60},
+    "rebuild-revenue-ledger": {
+        "job": "revenue.rebuild_recent",
+        "every": 24 * 3600,
+        "jitter": 600,
+    },
+}
+
+SCHEDULER = {
+    "TICK": 5,  # seconds between scheduler passes
+    "LOCK_KEY": "scheduler:leader",  # Redis key of the leader lock
+    "LOCK_TTL": 30,  # seconds a silent leader keeps the Redis lock
+    "ADVISORY_LOCK_ID": 715001,  # Postgres advisory lock id of the leader
+}
+
+# Responsive event image derivatives, generated after upload
+IMAGE_DERIVATIVES = {
+    "WIDTHS": (320, 640, 960, 1280),
+    # Preferred first; formats this Pillow build cannot write are skipped
+    "FORMATS": ("avif", "webp"),
+    "QUALITY": {"avif": 55, "webp": 75},
+    "UPLOAD_DIR": "event_images/derivatives",
+    "WORKERS": 4,  # processes rendering derivatives during a backfill
+    # <img sizes> for each place an event image is shown
+    "SIZES": {
+        "card": "(min-width: 1024px) 33vw, (min-width: 768px) 50vw, 100vw",
+        "detail": "(min-width: 1024px) 66vw, 100vw",
+    },
+}
+
+# Cloudinary delivery transformations used instead of local derivatives when
+# media is stored on Cloudinary; built URLs are memoized in an LRU
+CLOUDINARY_IMAGES = {
+    "TRANSFORMATION": {"fetch_format": "auto", "quality": "auto", "crop": "limit"},
+    "URL_CACHE_SIZE": 4096,
+    # Single-URL fallback under local storage, supported by every browser
+    "LOCAL_FORMAT": "webp",
+}
+
+# Token-bucket rate limits: up to "burst" requests at once, refilled at
+# "rate" requests per "per" seconds. "key" is "user", "ip" or "user_or_ip";
+# only the listed methods (and, with "param", requests carrying it) count.
+RATE_LIMITS = {
+    "contact": {"rate": 5, "per": 600, "burst": 3, "key": "ip", "methods": ("POST",)},
+    "payment": {
+        "rate": 10,
+        "per": 60,
+        "burst": 5,
+        "key": "user",
+        "methods": ("POST",),
+    },
+    "rsvp": {"rate": 30, "per": 60, "burst": 10, "key": "user", "methods": ("POST",)},
+    "search": {
+        "rate": 30,
+        "per": 60,
+        "burst": 15,
+        "key": "user_or_ip",
+        "methods": ("GET",),
+        "param": "q",
+    },
+}
+
+# URL names limited by RateLimitMiddleware, for views without the decorator
+RATE_LIMITED_URLS = {
+    "event_list": "search",
+}
+
+RATE_LIMITING = {
+    "ENABLED": True,
+    "KEY_PREFIX": "ratelimit",
+    # Enable only behind a proxy that appends the client address to
+    # X-Forwarded-For; the client controls every hop before the proxies' own
+    "TRUST_FORWARDED_FOR": False,
+    "TRUSTED_PROXY_HOPS": 1,  # proxies in front, each appending one hop
+    "LOCAL_MAX_KEYS": 10000,  # buckets kept in-process when Redis is down
+}
+
+# In-process domain event bus: handler dispatch modes and instrumentation
+DOMAIN_EVENT_MODES = ("sync", "on_commit", "queued")
+
+DOMAIN_EVENTS = {
+    "QUEUE_WORKERS": 2,  # threads running queued handlers
+    "SLOW_HANDLER_MS": 250,  # handlers slower than this are logged
+}
+
+# Organizer broadcasts and automatic change notices to attendees
+BROADCAST_KIND_CHOICES = [
+    ("message", "Message"),
+    ("change", "Change notice"),
+]
+
+BROADCAST_STATUS_CHOICES = [
+    ("pending", "Pending"),
+    ("sending", "Sending"),
+    ("completed", "Completed"),
+]
+
+BROADCASTS = {
+    "BATCH_SIZE": 500,  # attendees fetched and queued per transaction
+    "EMAILS_PER_SECOND": 20,  # rate the outbox dispatcher sends them at
+    "CHANGE_DEBOUNCE": 300,  # seconds edits are collected into one notice
+    "CHANGE_FIELDS": ("date", "time", "location"),
+    "STALE_AFTER": 600,  # seconds before a sending run is considered crashed
+}
+
+# Event reminder digests: each window reminds attendees once, as events
+# come within that many seconds of starting
+REMINDERS = {
+    "WINDOWS": {
+        "day": 24 * 3600,
+        "hour": 3600,
+    },
+    "BATCH_SIZE": 500,  # attendees whose digests are queued per transaction
+}
+
+# Reconciliation of pending payments whose callbacks never arrived
+PAYMENT_RECONCILIATION = {
+    "STALE_AFTER": 1800,  # seconds a payment may stay pending before a lookup
+    # Seconds after which a pending payment with no settled attempt at the
+    # gateway is abandoned: failed, releasing its tickets and coupon
+    "EXPIRE_AFTER": CHECKOUT["SESSION_TTL"] + 1800,
+    "CHUNK_SIZE": 200,  # payments selected and updated per batch
+    "WORKERS": 8,  # concurrent gateway status lookups
+    "CLIENT": "events.payment_gateway.SSLCommerzGatewayClient",
+}
+
+# Daily revenue ledger rolled up from valid payments
+REVENUE_LEDGER = {
+    "REBUILD_CHUNK_DAYS": 31,  # days recomputed per rebuild transaction
+    "BATCH_SIZE": 500,  # rows per INSERT during rebuilds
+    "DEFAULT_RANGE_DAYS": 30,  # time-series window when no range is given
+    "MAX_RANGE_DAYS": 366,
+    "REBUILD_RECENT_DAYS": 3,  # trailing days the periodic rebuild recomputes
+}
+
+# Gateway HTTP transport: pooled session, timeouts, retries, circuit breaker
+GATEWAY_TRANSPORT = {
+    "CONNECT_TIMEOUT": 3.05,  # seconds to establish a connection
+    "READ_TIMEOUT": 10,  # seconds to wait for a response
+    "POOL_SIZE": 20,  # keep-alive connections per host
+    "MAX_RETRIES": 2,  # extra attempts for idempotent (GET) calls
+    "BACKOFF_BASE": 0.2,  # seconds; retry delays use full jitter
+    "BACKOFF_MAX": 2,
+    "FAILURE_THRESHOLD": 5,  # consecutive failures that open the breaker
+    "RESET_AFTER": 30,  # seconds before a trial call is let through
+}
+
+
+# RSVP Statuses - RSVP rows are the source of truth for attendance
+class RSVPStatus:
+    ATTENDING = "attending"
+    NOT_ATTENDING = "not_attending"
+    MAYBE = "maybe"
+
+
 # RSVP Status Choices
 RSVP_STATUS_CHOICES = [
-    ("attending", "Attending"),
-    ("not_attending", "Not Attending"),
-    ("maybe", "Maybe"),
+    (RSVPStatus.ATTENDING, "Attending"),
+    (RSVPStatus.NOT_ATTENDING, "Not Attending"),
+    (RSVPStatus.MAYBE, "Maybe"),
+]
+
+# Event cancellation: refunds and attendee notices in rate-limited batches
+CANCELLATION_STATUS_CHOICES = [
+    ("pending", "Pending"),
+    ("running", "Running"),
+    ("completed", "Completed"),
+    ("failed", "Failed"),
+]
+
+REFUND_STATUS_CHOICES = [
+    ("pending", "Pending"),
+    ("processing", "Processing"),
+    # The request may or may not have reached the gateway; checked before retrying
+    ("reconciling", "Needs reconciliation"),
+    ("requested", "Requested"),
+    ("failed", "Failed"),
 ]
+
+CANCELLATION = {
+    "BATCH_SIZE": 200,  # payments or attendees per batch
+    "WORKERS": 4,  # batches processed in parallel
+    "REFUNDS_PER_SECOND": 10,  # gateway refund requests across all workers
+    "EMAILS_PER_SECOND": 20,  # rate the outbox sends cancellation notices at
+    "MAX_REFUND_ATTEMPTS": 5,
+    "RETRY_DELAY": 30,  # seconds between refund retry passes
+    "STALE_AFTER": 600,  # seconds without a heartbeat before a run is crashed
+    "REFUND_STALE_AFTER": 300,  # seconds before a processing refund is reconciled
+}
+
+# Bulk group registration
+BULK_REGISTRATION = {
+    "MAX_ATTENDEES": 1000,  # identifiers accepted per request
+    "BATCH_SIZE": 500,  # rows per INSERT
+}
@@ -0,0 +1,132 @@
+"""
+Coupon redemption for EventMan.
+Redis counters reject exhausted coupons in one round trip under load; the
+coupon row's conditional UPDATE stays the source of truth, so a lost or
+flushed Redis can never let a coupon be redeemed past its limits.
+"""
+
+from decimal import Decimal
+from typing import Dict, Iterable
+
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .models import Coupon, CouponRedemption, Event, Payment
+from .redis_utils import redis_client
+
+User = get_user_model()
+
+
+def get_valid_coupon(code: str, event: Event):
+    """Look up an active coupon usable for the event right now."""
+    now = timezone.now()
+    return (
+        Coupon.objects.filter(code=code.strip().upper(), is_active=True)
+        .filter(Q(event__isnull=True) | Q(event=event))
+        .filter(Q(valid_from__isnull=True) | Q(valid_from__lte=now))
+        .filter(Q(valid_until__isnull=True) | Q(valid_until__gt=now))
+        .first()
+    )
+
+
+def _reserve(coupon: Coupon, user: User):
+    """Take a slot from the Redis counters, seeding them from the database."""
+    args = (coupon.pk, user.pk, coupon.max_redemptions, coupon.per_user_limit)
+    reserved = redis_client.reserve_coupon(*args)
+    if reserved == -2:
+        redis_client.seed_coupon_counters(
+            coupon.pk,
+            user.pk,
+            coupon.redemptions_count,
+            CouponRedemption.objects.filter(coupon=coupon, user=user).count(),
+        )
+        reserved = redis_client.reserve_coupon(*args)
+    return reserved
+
+
+def redeem_coupon(code: str, user: User, event: Event, payment: Payment) -> Dict:
+    """Apply a coupon to a pending payment, within the coupon's limits."""
+    coupon = get_valid_coupon(code, event)
+    if coupon is None:
+        return {"success": False, "error": "Invalid or expired coupon code"}
+
+    # A None result means Redis is down; the database checks still apply
+    reserved = _reserve(coupon, user)
+    if reserved == 0:
+        return {"success": False, "error": "This coupon has been fully redeemed"}
+    if reserved == -1:
+        return {"success": False, "error": "You have already used this coupon"}
+
+    try:
+        with transaction.atomic():
+            # Serialises one user's concurrent redemptions without a global lock
+            User.objects.select_for_update().filter(pk=user.pk).exists()
+            used = CouponRedemption.objects.filter(coupon=coupon, user=user).count()
+            if used >= coupon.per_user_limit:
+                result = {
+                    "success": False,
+                    "error": "You have already used this coupon",
+                }
+            elif (
+                Coupon.objects.filter(pk=coupon.pk)
+                .filter(
+                    Q(max_redemptions__isnull=True)
+                    | Q(redemptions_count__lt=F("max_redemptions"))
+                )
+                .update(
+                    redemptions_count=F("redemptions_count") + 1,
+                    modified=timezone.now(),
+                )
+            ):
+                amount = Decimal(str(payment.amount))
+                discount = coupon.discount_for(amount)
+                redemption = CouponRedemption.objects.create(
+                    coupon=coupon, user=user, payment=payment, discount=discount
+                )
+                payment.amount = amount - discount
+                payment.save(update_fields=["amount", "modified"])
+                result = {"success": True, "redemption": redemption}
+            else:
+                result = {
+                    "success": False,
+                    "error": "This coupon has been fully redeemed",
+                }
+    except Exception:
+        if reserved == 1:
+            redis_client.release_coupon(coupon.pk, user.pk)
+        raise
+
+    if not result["success"] and reserved == 1:
+        redis_client.release_coupon(coupon.pk, user.pk)
+    return result
+
+
+def release_redemptions(payment_ids: Iterable[int]) -> int:
+    """Return the coupon slots held by payments that did not go through."""
+    released = []
+    with transaction.atomic():
+        redemptions = list(
+            CouponRedemption.objects.select_for_update().filter(
+                payment_id__in=list(payment_ids)
+            )
+        )
+        for redemption in redemptions:
+            Coupon.objects.filter(
+                pk=redemption.coupon_id, redemptions_count__gt=0
+            ).update(
+                redemptions_count=F("redemptions_count") - 1,
+                modified=timezone.now(),
+            )
+            released.append((redemption.coupon_id, redemption.user_id))
+        CouponRedemption.objects.filter(
+            pk__in=[redemption.pk for redemption in redemptions]
+        ).delete()
+
+    def release_counters():
+        for coupon_id, user_id in released:
+            redis_client.release_coupon(coupon_id, user_id)
+
+    transaction.on_commit(release_counters)
+    return len(released)
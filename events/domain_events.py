@@ -0,0 +1,148 @@
+"""
+Domain event bus for EventMan.
+Services publish typed events saying what happened, and side effects such as
+emails, counters and cache invalidation subscribe to them in events/handlers.py.
+A handler runs "sync" inside the publisher's transaction, "on_commit" once it
+commits, or "queued" on a background thread after commit, and every call is
+timed per handler.
+"""
+
+import logging
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from functools import partial
+from typing import Callable, Dict, List, Optional, Tuple, Type
+
+from django.db import connection as db_connection
+from django.db import transaction
+
+from .constants import DOMAIN_EVENT_MODES, DOMAIN_EVENTS
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class DomainEvent:
+    """Base class for facts published on the bus."""
+
+
+@dataclass(frozen=True)
+class ParticipantAdded(DomainEvent):
+    event_id: int
+    user_ids: Tuple[int, ...]
+
+
+@dataclass(frozen=True)
+class PaymentValidated(DomainEvent):
+    event_id: int
+    payment_ids: Tuple[int, ...]
+    tickets: int
+
+
+@dataclass(frozen=True)
+class EventChanged(DomainEvent):
+    event_id: int
+    # field -> (old, new), as strings
+    changes: Dict[str, Tuple[str, str]] = field(default_factory=dict)
+    user_id: Optional[int] = None
+
+
+Handler = Callable[[DomainEvent], None]
+
+_handlers: Dict[Type[DomainEvent], List[Tuple[Handler, str]]] = defaultdict(list)
+_metrics: Dict[str, Dict[str, float]] = {}
+_metrics_lock = threading.Lock()
+
+executor = ThreadPoolExecutor(
+    max_workers=DOMAIN_EVENTS["QUEUE_WORKERS"], thread_name_prefix="domain-events"
+)
+
+
+def subscribe(event_type: Type[DomainEvent], mode: str = "sync"):
+    """Register the decorated function as a handler of ``event_type``."""
+    if mode not in DOMAIN_EVENT_MODES:
+        raise ValueError(f"Unknown dispatch mode: {mode}")
+
+    def register(handler: Handler) -> Handler:
+        if (handler, mode) not in _handlers[event_type]:
+            _handlers[event_type].append((handler, mode))
+        return handler
+
+    return register
+
+
+def handlers_for(event_type: Type[DomainEvent]) -> List[Tuple[Handler, str]]:
+    return list(_handlers[event_type])
+
+
+def publish(domain_event: DomainEvent):
+    """Run or schedule every handler subscribed to the event's type."""
+    for handler, mode in _handlers[type(domain_event)]:
+        if mode == "sync":
+            # Failures propagate and roll back the publisher's transaction
+            _call(handler, domain_event)
+        elif mode == "on_commit":
+            transaction.on_commit(partial(_call_safely, handler, domain_event))
+        else:
+            transaction.on_commit(
+                partial(executor.submit, _run_queued, handler, domain_event)
+            )
+
+
+def _call(handler: Handler, domain_event: DomainEvent):
+    started = time.perf_counter()
+    failed = True
+    try:
+        handler(domain_event)
+        failed = False
+    finally:
+        _record(handler, (time.perf_counter() - started) * 1000, failed)
+
+
+def _call_safely(handler: Handler, domain_event: DomainEvent):
+    try:
+        _call(handler, domain_event)
+    except Exception as e:
+        logger.error(f"{_name(handler)} failed for {domain_event}: {e}")
+
+
+def _run_queued(handler: Handler, domain_event: DomainEvent):
+    try:
+        _call_safely(handler, domain_event)
+    finally:
+        db_connection.close()
+
+
+def _name(handler: Handler) -> str:
+    return f"{handler.__module__}.{handler.__qualname__}"
+
+
+def _record(handler: Handler, elapsed_ms: float, failed: bool):
+    name = _name(handler)
+    with _metrics_lock:
+        stats = _metrics.setdefault(
+            name, {"calls": 0, "errors": 0, "total_ms": 0.0, "max_ms": 0.0}
+        )
+        stats["calls"] += 1
+        stats["errors"] += int(failed)
+        stats["total_ms"] += elapsed_ms
+        stats["max_ms"] = max(stats["max_ms"], elapsed_ms)
+    if elapsed_ms > DOMAIN_EVENTS["SLOW_HANDLER_MS"]:
+        logger.warning(f"Slow domain event handler {name}: {elapsed_ms:.0f}ms")
+
+
+def handler_metrics() -> Dict[str, Dict[str, float]]:
+    """Per-handler call and error counts with timings in milliseconds."""
+    with _metrics_lock:
+        return {
+            name: {**stats, "avg_ms": stats["total_ms"] / stats["calls"]}
+            for name, stats in _metrics.items()
+        }
+
+
+def reset_metrics():
+    with _metrics_lock:
+        _metrics.clear()
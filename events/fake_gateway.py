@@ -0,0 +1,254 @@
+"""
+Local SSLCommerz stand-in for EventMan.
+Implements session creation, the hosted payment redirect, IPN callbacks,
+the validation APIs and refunds, with configurable latency and failure
+rates, so the checkout flow can be developed and load-tested without the
+sandbox.
+"""
+
+import json
+import logging
+import random
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional
+from urllib.parse import parse_qsl, urlencode, urlsplit
+
+import requests
+
+from .payment_gateway import GATEWAY_PATHS
+
+logger = logging.getLogger(__name__)
+
+PAY_PATH = "/gwprocess/v4/pay/"
+
+
+class FakeGatewayState:
+    """Thread-safe store of sessions and transactions."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.sessions: Dict[str, Dict] = {}
+        self.transactions: Dict[str, List[Dict]] = {}
+        self.validations: Dict[str, Dict] = {}
+
+    def create_session(self, post_body: Dict) -> str:
+        session_key = uuid.uuid4().hex
+        with self.lock:
+            self.sessions[session_key] = post_body
+        return session_key
+
+    def complete_payment(self, session_key: str, approved: bool) -> Optional[Dict]:
+        """Settle a session, as if the customer paid (or was declined)."""
+        with self.lock:
+            session = self.sessions.get(session_key)
+            if session is None:
+                return None
+            transaction = {
+                "tran_id": session.get("tran_id", ""),
+                "val_id": uuid.uuid4().hex,
+                "amount": session.get("total_amount", "0"),
+                "currency": session.get("currency", "BDT"),
+                "status": "VALID" if approved else "FAILED",
+                "sessionkey": session_key,
+                "bank_tran_id": uuid.uuid4().hex,
+            }
+            self.transactions.setdefault(transaction["tran_id"], []).append(transaction)
+            self.validations[transaction["val_id"]] = transaction
+        return transaction
+
+    def refund(self, bank_tran_id: str, amount: str) -> Optional[str]:
+        """Record a refund of a settled transaction, once."""
+        with self.lock:
+            for transactions in self.transactions.values():
+                for transaction in transactions:
+                    if (
+                        transaction["bank_tran_id"] == bank_tran_id
+                        and transaction["status"] == "VALID"
+                        and "refund_ref_id" not in transaction
+                    ):
+                        transaction["refund_ref_id"] = uuid.uuid4().hex
+                        transaction["refund_amount"] = amount
+                        return transaction["refund_ref_id"]
+        return None
+
+
+class FakeGatewayHandler(BaseHTTPRequestHandler):
+    server: "FakeGatewayServer"
+
+    def log_message(self, format, *args):
+        logger.debug(format % args)
+
+    def do_GET(self):
+        self._dispatch()
+
+    def do_POST(self):
+        self._dispatch()
+
+    def _dispatch(self):
+        url = urlsplit(self.path)
+        params = dict(parse_qsl(url.query))
+        if self.command == "POST":
+            length = int(self.headers.get("Content-Length") or 0)
+            params.update(parse_qsl(self.rfile.read(length).decode()))
+
+        self.server.simulate_latency()
+        if self.server.should_fail():
+            # Like an overloaded proxy: an HTML error page, not gateway JSON
+            self._respond(503, "<h1>503 Service Unavailable</h1>", "text/html")
+            return
+
+        if url.path == GATEWAY_PATHS["createSessionUrl"]:
+            self._create_session(params)
+        elif url.path.startswith(PAY_PATH):
+            self._pay(url.path[len(PAY_PATH) :])
+        elif url.path == GATEWAY_PATHS["validation_url"]:
+            self._validate(params)
+        elif url.path == GATEWAY_PATHS["transaction_url"]:
+            if "bank_tran_id" in params:
+                self._refund(params)
+            else:
+                self._query_transaction(params)
+        else:
+            self._respond(404, {"status": "FAILED", "failedreason": "Not found"})
+
+    def _create_session(self, params: Dict):
+        if not params.get("store_id") or not params.get("tran_id"):
+            self._respond(
+                200, {"status": "FAILED", "failedreason": "Missing store or tran_id"}
+            )
+            return
+        session_key = self.server.state.create_session(params)
+        self._respond(
+            200,
+            {
+                "status": "SUCCESS",
+                "sessionkey": session_key,
+                "GatewayPageURL": f"{self.server.base_url}{PAY_PATH}{session_key}",
+            },
+        )
+
+    def _pay(self, session_key: str):
+        approved = random.random() >= self.server.decline_rate
+        transaction = self.server.state.complete_payment(session_key, approved)
+        if transaction is None:
+            self._respond(404, {"status": "FAILED", "failedreason": "Unknown session"})
+            return
+
+        session = self.server.state.sessions[session_key]
+        callback = {
+            key: transaction[key] for key in ("tran_id", "val_id", "amount", "status")
+        }
+        if self.server.ipn_url:
+            threading.Thread(
+                target=self.server.send_ipn, args=(callback,), daemon=True
+            ).start()
+
+        target = session.get("success_url" if approved else "fail_url", "")
+        self.send_response(302)
+        self.send_header("Location", f"{target}?{urlencode(callback)}")
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def _validate(self, params: Dict):
+        transaction = self.server.state.validations.get(params.get("val_id", ""))
+        if transaction is None:
+            self._respond(200, {"status": "INVALID_TRANSACTION"})
+        else:
+            self._respond(200, transaction)
+
+    def _query_transaction(self, params: Dict):
+        transactions = self.server.state.transactions.get(params.get("tran_id", ""))
+        self._respond(
+            200,
+            {
+                "APIConnect": "DONE",
+                "no_of_trans_found": len(transactions or []),
+                "element": transactions or [],
+            },
+        )
+
+    def _refund(self, params: Dict):
+        refund_ref_id = self.server.state.refund(
+            params["bank_tran_id"], params.get("refund_amount", "0")
+        )
+        if refund_ref_id is None:
+            self._respond(
+                200,
+                {
+                    "APIConnect": "DONE",
+                    "status": "failed",
+                    "errorReason": "Transaction not refundable",
+                },
+            )
+        else:
+            self._respond(
+                200,
+                {
+                    "APIConnect": "DONE",
+                    "status": "success",
+                    "bank_tran_id": params["bank_tran_id"],
+                    "refund_ref_id": refund_ref_id,
+                },
+            )
+
+    def _respond(self, status: int, body, content_type="application/json"):
+        if isinstance(body, dict):
+            body = json.dumps(body)
+        content = body.encode()
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+
+class FakeGatewayServer(ThreadingHTTPServer):
+    """Threaded HTTP server holding the fake gateway's configuration."""
+
+    daemon_threads = True
+
+    def __init__(
+        self,
+        address=("127.0.0.1", 0),
+        latency: float = 0.0,
+        jitter: float = 0.0,
+        error_rate: float = 0.0,
+        decline_rate: float = 0.0,
+        ipn_url: str = "",
+    ):
+        super().__init__(address, FakeGatewayHandler)
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.decline_rate = decline_rate
+        self.ipn_url = ipn_url
+        self.state = FakeGatewayState()
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def simulate_latency(self):
+        delay = self.latency + random.uniform(0, self.jitter)
+        if delay > 0:
+            time.sleep(delay)
+
+    def should_fail(self) -> bool:
+        return random.random() < self.error_rate
+
+    def send_ipn(self, callback: Dict):
+        try:
+            requests.post(self.ipn_url, data=callback, timeout=10)
+        except requests.RequestException as e:
+            logger.warning(f"Fake gateway IPN to {self.ipn_url} failed: {e}")
+
+
+def start_fake_gateway(**options) -> FakeGatewayServer:
+    """Start a fake gateway on a background thread; call shutdown() to stop."""
+    server = FakeGatewayServer(**options)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
@@ -3,6 +3,7 @@ from django import forms
 from django.db import models
 from django.utils import timezone
 
+from .constants import RSVP_STATUS_CHOICES
 from .models import Category, Event
 
 
@@ -43,6 +44,13 @@ class EventFilter(django_filters.FilterSet):
         label="To Date",
     )
 
+    attendance = django_filters.ChoiceFilter(
+        choices=RSVP_STATUS_CHOICES,
+        method="filter_by_attendance",
+        widget=forms.Select(attrs={"class": "form-select"}),
+        label="My RSVP",
+    )
+
     class Meta:
         model = Event
         fields = []
@@ -71,6 +79,13 @@ class EventFilter(django_filters.FilterSet):
 
         return queryset.filter(status="published")
 
+    def filter_by_attendance(self, queryset, name, value):
+        """Filter events by the current user's RSVP status"""
+        user = getattr(self.request, "user", None)
+        if not value or user is None or not user.is_authenticated:
+            return queryset
+        return queryset.filter(rsvps__user=user, rsvps__status=value)
+
 
 class CategoryFilter(django_filters.FilterSet):
     """Category filtering"""
@@ -20,6 +20,7 @@ class EventForm(forms.ModelForm):
             "date",
             "time",
             "location",
+            "capacity",
             "category",
             "image",
         ]
@@ -49,7 +50,11 @@ class EventForm(forms.ModelForm):
                 Column("time", css_class="form-group col-md-6 mb-3"),
                 css_class="row",
             ),
-            Field("location", css_class="form-control mb-3"),
+            Row(
+                Column("location", css_class="form-group col-md-8 mb-3"),
+                Column("capacity", css_class="form-group col-md-4 mb-3"),
+                css_class="row",
+            ),
             Field("description", css_class="form-control mb-3"),
             Field("image", css_class="form-control mb-3"),
             HTML(
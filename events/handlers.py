@@ -0,0 +1,105 @@
+"""
+Domain event handlers for EventMan.
+Every side effect of attendance, payments and event edits is registered here;
+Django signals are only bridged onto the bus (events/domain_events.py).
+"""
+
+from django.contrib.auth import get_user_model
+from django.db.models.signals import m2m_changed, post_save
+from django.dispatch import receiver
+
+from .broadcasts import record_event_changes
+from .constants import BROADCASTS
+from .domain_events import (EventChanged, ParticipantAdded, PaymentValidated,
+                            publish, subscribe)
+from .images import schedule_derivatives
+from .models import Event, Payment, Profile
+from .notifications import queue_rsvp_confirmations
+from .redis_utils import redis_client
+from .revenue import record_payments
+from .trending import record_trending_activity
+
+User = get_user_model()
+
+
+@receiver(post_save, sender=User)
+def create_user_profile(sender, instance, created, **kwargs):
+    """Auto-create profile when user is created."""
+    if created:
+        Profile.objects.create(user=instance)
+
+
+@receiver(post_save, sender=User)
+def save_user_profile(sender, instance, **kwargs):
+    """Auto-save profile when user is saved."""
+    if hasattr(instance, "profile") and not kwargs.get("raw", False):
+        instance.profile.save()
+
+
+@receiver(post_save, sender=Event)
+def queue_image_derivatives(sender, instance, raw=False, **kwargs):
+    """Render responsive derivatives of a new or replaced event image."""
+    if not raw:
+        schedule_derivatives(instance)
+
+
+@receiver(m2m_changed, sender=Event.participants.through)
+def publish_participants_added(sender, instance, action, reverse, pk_set, **kwargs):
+    """Publish ParticipantAdded for users newly added to Event.participants."""
+    if action != "post_add" or not pk_set:
+        return
+    if reverse:
+        # user.events_joined.add(...): instance is the user
+        for event_id in sorted(pk_set):
+            publish(ParticipantAdded(event_id, (instance.pk,)))
+    else:
+        publish(ParticipantAdded(instance.pk, tuple(sorted(pk_set))))
+
+
+@subscribe(ParticipantAdded)
+def send_rsvp_confirmations(domain_event: ParticipantAdded):
+    # Written in the RSVP's transaction and sent by the outbox dispatcher
+    event = Event.objects.get(pk=domain_event.event_id)
+    queue_rsvp_confirmations(event, domain_event.user_ids)
+
+
+@subscribe(ParticipantAdded, mode="queued")
+def score_rsvps(domain_event: ParticipantAdded):
+    record_trending_activity(
+        domain_event.event_id, "rsvp", count=len(domain_event.user_ids)
+    )
+
+
+@subscribe(PaymentValidated)
+def add_payments_to_ledger(domain_event: PaymentValidated):
+    record_payments(
+        Payment.objects.filter(pk__in=domain_event.payment_ids).select_related("event")
+    )
+
+
+@subscribe(PaymentValidated, mode="queued")
+def score_payments(domain_event: PaymentValidated):
+    record_trending_activity(
+        domain_event.event_id, "payment", count=domain_event.tickets
+    )
+
+
+@subscribe(EventChanged)
+def schedule_change_notice(domain_event: EventChanged):
+    changes = {
+        field: change
+        for field, change in domain_event.changes.items()
+        if field in BROADCASTS["CHANGE_FIELDS"]
+    }
+    if not changes:
+        return
+    event = Event.objects.filter(pk=domain_event.event_id, status="published").first()
+    if event:
+        # Debounced, so a burst of edits sends attendees one notice
+        record_event_changes(event, changes, sender_id=domain_event.user_id)
+
+
+@subscribe(EventChanged, mode="on_commit")
+def invalidate_event_caches(domain_event: EventChanged):
+    # Dashboard stats, search results and the trending entry may show the event
+    redis_client.invalidate_event_caches(domain_event.event_id)
@@ -0,0 +1,154 @@
+"""
+Responsive event image derivatives for EventMan.
+Each uploaded image is resized to IMAGE_DERIVATIVES["WIDTHS"] in every
+format this Pillow build can write (AVIF, WebP), and the stored names are
+recorded on Event.image_derivatives for the responsive_image template tag.
+Rendering is a pure bytes-to-bytes function, so a background job runs it
+inline and the backfill spreads it over a process pool.
+"""
+
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor
+from io import BytesIO
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import transaction
+from PIL import Image, ImageOps, features
+
+from .constants import IMAGE_DERIVATIVES
+from .jobs import enqueue_job
+from .models import Event
+from .storage_utils import is_cloudinary_storage
+
+logger = logging.getLogger(__name__)
+
+Renditions = Dict[str, Dict[int, bytes]]
+
+
+def supported_formats() -> List[str]:
+    """Configured derivative formats this Pillow build can encode."""
+    return [fmt for fmt in IMAGE_DERIVATIVES["FORMATS"] if features.check(fmt)]
+
+
+def render_derivatives(
+    data: bytes, widths: Iterable[int], formats: Iterable[str]
+) -> Renditions:
+    """Resize an image to each width narrower than it, in each format."""
+    with Image.open(BytesIO(data)) as source:
+        image = ImageOps.exif_transpose(source)
+        image = image.convert("RGBA" if "A" in image.getbands() else "RGB")
+    # Never upscale; an image narrower than every width gets its own size
+    sizes = sorted({min(width, image.width) for width in widths})
+
+    renditions: Renditions = {fmt: {} for fmt in formats}
+    for width in sizes:
+        height = max(1, round(image.height * width / image.width))
+        resized = image.resize((width, height), Image.Resampling.LANCZOS)
+        for fmt in formats:
+            buffer = BytesIO()
+            resized.save(buffer, fmt.upper(), quality=IMAGE_DERIVATIVES["QUALITY"][fmt])
+            renditions[fmt][width] = buffer.getvalue()
+    return renditions
+
+
+def current_derivatives(event: Event) -> Dict[str, Dict[str, str]]:
+    """Stored derivative names by format and width, if they match the image."""
+    derivatives = event.image_derivatives or {}
+    if not event.image or derivatives.get("source") != event.image.name:
+        # Not rendered yet, or rendered for an image since replaced
+        return {}
+    return derivatives.get("formats", {})
+
+
+def schedule_derivatives(event: Event):
+    """Queue derivative generation if the event's image has none yet."""
+    if is_cloudinary_storage():
+        # Cloudinary resizes on delivery (see storage_utils.transformation_url)
+        return
+    if event.image and not current_derivatives(event):
+        enqueue_job("images.derivatives", {"event_id": event.pk})
+
+
+def _read_source(event: Event) -> Optional[Tuple[str, bytes]]:
+    if not event.image:
+        return None
+    with event.image.open("rb") as image_file:
+        return event.image.name, image_file.read()
+
+
+def store_derivatives(event_id: int, source: str, renditions: Renditions) -> bool:
+    """Save renditions and record them, unless the image changed meanwhile."""
+    stem = os.path.splitext(os.path.basename(source))[0]
+    formats = {}
+    for fmt, by_width in renditions.items():
+        formats[fmt] = {
+            str(width): default_storage.save(
+                f"{IMAGE_DERIVATIVES['UPLOAD_DIR']}/{event_id}/{stem}-{width}w.{fmt}",
+                ContentFile(data),
+            )
+            for width, data in by_width.items()
+        }
+
+    with transaction.atomic():
+        recorded = Event.objects.filter(pk=event_id, image=source).update(
+            image_derivatives={"source": source, "formats": formats}
+        )
+    if not recorded:
+        # Replaced or deleted while rendering; its own job covers the new one
+        for names in formats.values():
+            for name in names.values():
+                default_storage.delete(name)
+    return bool(recorded)
+
+
+def generate_derivatives(event_id: int) -> bool:
+    """Render and store the derivatives of one event's current image."""
+    event = Event.objects.filter(pk=event_id).first()
+    source = _read_source(event) if event else None
+    if source is None:
+        return False
+    name, data = source
+    renditions = render_derivatives(
+        data, IMAGE_DERIVATIVES["WIDTHS"], supported_formats()
+    )
+    return store_derivatives(event_id, name, renditions)
+
+
+def backfill_derivatives(
+    event_ids: Iterable[int], workers: int = None
+) -> Dict[str, int]:
+    """Generate derivatives for many events, rendering in a process pool."""
+    workers = workers or IMAGE_DERIVATIVES["WORKERS"]
+    widths, formats = IMAGE_DERIVATIVES["WIDTHS"], supported_formats()
+    event_ids = list(event_ids)
+    # A few images per process in flight bounds the bytes held in memory
+    chunk_size = workers * 2
+    totals = {"generated": 0, "failed": 0}
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for start in range(0, len(event_ids), chunk_size):
+            pending = {}
+            for event in Event.objects.filter(
+                pk__in=event_ids[start : start + chunk_size]
+            ).only("pk", "image", "image_derivatives"):
+                try:
+                    source = _read_source(event)
+                except Exception as e:
+                    logger.warning(f"Cannot read image of event {event.pk}: {e}")
+                    totals["failed"] += 1
+                    continue
+                if source is not None:
+                    name, data = source
+                    future = pool.submit(render_derivatives, data, widths, formats)
+                    pending[future] = (event.pk, name)
+
+            for future, (event_id, name) in pending.items():
+                try:
+                    if store_derivatives(event_id, name, future.result()):
+                        totals["generated"] += 1
+                except Exception as e:
+                    logger.warning(f"Derivatives of event {event_id} failed: {e}")
+                    totals["failed"] += 1
+    return totals
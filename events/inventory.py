@@ -0,0 +1,75 @@
+"""
+Ticket inventory for EventMan.
+A checkout reserves its whole order in one conditional UPDATE, so concurrent
+orders can never oversell capacity; validation moves the reservation to
+tickets_sold and a failed payment gives it back.
+"""
+
+from collections import Counter
+from typing import Dict, Iterable
+
+from django.db.models import F, Q
+from django.db.models.functions import Greatest
+
+from .coupons import release_redemptions
+from .models import Event, Payment
+
+
+class TicketsUnavailable(Exception):
+    """Raised when an order asks for more tickets than are left."""
+
+    def __init__(self, available):
+        self.available = available
+        super().__init__(f"Only {available} ticket(s) left")
+
+
+def tickets_available(event: Event):
+    """Tickets neither sold nor reserved, or None when capacity is unlimited."""
+    if event.capacity is None:
+        return None
+    return max(event.capacity - event.tickets_sold - event.tickets_reserved, 0)
+
+
+def reserve_tickets(event: Event, quantity: int):
+    """Hold ``quantity`` tickets for a pending order, or raise TicketsUnavailable."""
+    reserved = (
+        Event.objects.filter(pk=event.pk)
+        .filter(
+            Q(capacity__isnull=True)
+            | Q(capacity__gte=F("tickets_sold") + F("tickets_reserved") + quantity)
+        )
+        .update(tickets_reserved=F("tickets_reserved") + quantity)
+    )
+    if not reserved:
+        event.refresh_from_db(fields=["tickets_sold", "tickets_reserved", "capacity"])
+        raise TicketsUnavailable(tickets_available(event))
+
+
+def commit_tickets(quantities: Dict[int, int]):
+    """Turn reservations into sold tickets, one UPDATE per event."""
+    for event_id, quantity in quantities.items():
+        # Clamped, as payments from before reservations existed hold none
+        Event.objects.filter(pk=event_id).update(
+            tickets_sold=F("tickets_sold") + quantity,
+            tickets_reserved=Greatest(F("tickets_reserved") - quantity, 0),
+        )
+
+
+def release_tickets(payment_ids: Iterable[int]):
+    """Give back the tickets held by payments that did not go through."""
+    quantities = Counter()
+    for event_id, quantity in Payment.objects.filter(
+        pk__in=list(payment_ids)
+    ).values_list("event_id", "quantity"):
+        quantities[event_id] += quantity
+    for event_id, quantity in quantities.items():
+        Event.objects.filter(pk=event_id).update(
+            tickets_reserved=Greatest(F("tickets_reserved") - quantity, 0)
+        )
+
+
+def release_payment_holds(payment_ids: Iterable[int]):
+    """Release everything a failed payment held: tickets and coupon slots."""
+    payment_ids = list(payment_ids)
+    release_tickets(payment_ids)
+    release_redemptions(payment_ids)
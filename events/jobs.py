@@ -0,0 +1,253 @@
+"""
+Database-backed background jobs for EventMan.
+Jobs are rows written in the caller's transaction and run by run_workers
+processes, without a separate broker. Workers claim due jobs with
+SELECT ... FOR UPDATE SKIP LOCKED where the database supports it, and a
+conditional UPDATE keeps claims atomic where it does not (SQLite). Failures
+are retried with exponential back-off and dead-lettered after max_attempts.
+"""
+
+import logging
+import threading
+import uuid
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Callable, Dict, Iterable, List, Optional
+
+from django.db import connection as db_connection
+from django.db import transaction
+from django.db.models import Avg, Count, DurationField, ExpressionWrapper, F, Q
+from django.utils import timezone
+
+from .constants import JOBS
+from .models import Job
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class JobSpec:
+    func: Callable
+    queue: str
+    priority: int
+    max_attempts: int
+
+
+_registry: Dict[str, JobSpec] = {}
+# The job each worker thread is running, for heartbeat()
+_running = threading.local()
+
+
+def job(
+    name: str, queue: str = None, priority: int = 0, max_attempts: int = None
+) -> Callable:
+    """Register the decorated function to run as job ``name``."""
+
+    def register(func: Callable) -> Callable:
+        _registry[name] = JobSpec(
+            func=func,
+            queue=queue or JOBS["QUEUE"],
+            priority=priority,
+            max_attempts=max_attempts or JOBS["MAX_ATTEMPTS"],
+        )
+        return func
+
+    return register
+
+
+def enqueue_job(
+    name: str,
+    payload: Optional[Dict] = None,
+    priority: Optional[int] = None,
+    run_at: Optional[datetime] = None,
+) -> Job:
+    """Queue a registered job; workers see it once the transaction commits."""
+    if name not in _registry:
+        raise ValueError(f"Unknown job: {name}")
+    spec = _registry[name]
+    return Job.objects.create(
+        name=name,
+        queue=spec.queue,
+        payload=payload or {},
+        priority=spec.priority if priority is None else priority,
+        max_attempts=spec.max_attempts,
+        run_at=run_at or timezone.now(),
+    )
+
+
+def _due_jobs(queues: Optional[Iterable[str]] = None):
+    now = timezone.now()
+    stale_before = now - timedelta(seconds=JOBS["STALE_AFTER"])
+    jobs = Job.objects.filter(
+        Q(status="queued", run_at__lte=now)
+        | Q(status="running", modified__lt=stale_before)
+    )
+    if queues:
+        jobs = jobs.filter(queue__in=list(queues))
+    return jobs
+
+
+def claim_jobs(queues: Optional[Iterable[str]] = None, limit: int = None) -> List[Job]:
+    """Atomically claim the most urgent due jobs of ``queues`` (all if None)."""
+    limit = limit or JOBS["BATCH_SIZE"]
+    ordering = ("-priority", "run_at", "pk")
+    token = uuid.uuid4().hex
+    now = timezone.now()
+    with transaction.atomic():
+        # SKIP LOCKED lets concurrent workers take different rows on Postgres;
+        # SQLite ignores it and relies on the conditional UPDATE below
+        job_ids = list(
+            _due_jobs(queues)
+            .select_for_update(skip_locked=True)
+            .order_by(*ordering)
+            .values_list("pk", flat=True)[:limit]
+        )
+        if not job_ids:
+            return []
+        _due_jobs(queues).filter(pk__in=job_ids).update(
+            status="running",
+            claim_token=token,
+            attempts=F("attempts") + 1,
+            started_at=now,
+            modified=now,
+        )
+    return list(
+        Job.objects.filter(claim_token=token, status="running").order_by(*ordering)
+    )
+
+
+def renew_claim(job: Job) -> bool:
+    """Restart a claimed job's stale clock; False if it was reclaimed meanwhile."""
+    now = timezone.now()
+    # Jobs wait behind the rest of their batch, so a claim can go stale and
+    # be retaken before the job starts; this worker must then skip it
+    return bool(
+        Job.objects.filter(
+            pk=job.pk, claim_token=job.claim_token, status="running"
+        ).update(started_at=now, modified=now)
+    )
+
+
+def heartbeat() -> bool:
+    """Called from inside a long job so its claim never looks stale.
+
+    False if the job was reclaimed meanwhile; outside a job it is a no-op.
+    """
+    running = getattr(_running, "job", None)
+    if running is None:
+        return True
+    return bool(
+        Job.objects.filter(
+            pk=running.pk, claim_token=running.claim_token, status="running"
+        ).update(modified=timezone.now())
+    )
+
+
+def retry_delay(attempts: int) -> timedelta:
+    """Exponential back-off before the next run of a failed job."""
+    seconds = JOBS["BACKOFF_BASE"] * 2 ** max(attempts - 1, 0)
+    return timedelta(seconds=min(seconds, JOBS["BACKOFF_MAX"]))
+
+
+def run_job(job: Job) -> bool:
+    """Run one claimed job and record its outcome; True if it succeeded."""
+    spec = _registry.get(job.name)
+    _running.job = job
+    try:
+        if spec is None:
+            raise LookupError(f"Unknown job: {job.name}")
+        spec.func(**job.payload)
+    except Exception as e:
+        now = timezone.now()
+        dead = job.attempts >= job.max_attempts
+        log = logger.error if dead else logger.warning
+        log(f"Job {job.pk} ({job.name}) failed on attempt {job.attempts}: {e}")
+        Job.objects.filter(pk=job.pk, claim_token=job.claim_token).update(
+            status="dead" if dead else "queued",
+            run_at=now + retry_delay(job.attempts),
+            finished_at=now if dead else None,
+            last_error=str(e),
+            claim_token="",
+            modified=now,
+        )
+        return False
+    finally:
+        _running.job = None
+
+    now = timezone.now()
+    Job.objects.filter(pk=job.pk, claim_token=job.claim_token).update(
+        status="succeeded", finished_at=now, last_error="", claim_token="", modified=now
+    )
+    return True
+
+
+def run_pending_jobs(
+    queues: Optional[Iterable[str]] = None,
+    batch_size: int = None,
+    max_batches: int = None,
+) -> Dict[str, int]:
+    """Claim and run due jobs until none are left or max_batches is reached."""
+    totals = {"succeeded": 0, "failed": 0}
+    batches = 0
+    while max_batches is None or batches < max_batches:
+        claimed = claim_jobs(queues, batch_size)
+        if not claimed:
+            break
+        for claimed_job in claimed:
+            if not renew_claim(claimed_job):
+                continue
+            totals["succeeded" if run_job(claimed_job) else "failed"] += 1
+        batches += 1
+    return totals
+
+
+def work(
+    queues: Optional[Iterable[str]] = None,
+    batch_size: int = None,
+    stop: Optional[threading.Event] = None,
+):
+    """Worker loop: run due jobs, waiting POLL_INTERVAL whenever idle."""
+    stop = stop or threading.Event()
+    try:
+        while not stop.is_set():
+            try:
+                totals = run_pending_jobs(queues, batch_size, max_batches=1)
+            except Exception as e:
+                logger.error(f"Job worker round failed: {e}")
+                totals = {}
+            if not any(totals.values()):
+                stop.wait(JOBS["POLL_INTERVAL"])
+    finally:
+        db_connection.close()
+
+
+def queue_metrics(window: int = None) -> Dict[str, Dict]:
+    """Backlog, dead letters and recent throughput of every queue."""
+    window = window or JOBS["METRICS_WINDOW"]
+    since = timezone.now() - timedelta(seconds=window)
+    recent = Q(finished_at__gte=since)
+    rows = Job.objects.values("queue").annotate(
+        queued=Count("pk", filter=Q(status="queued")),
+        running=Count("pk", filter=Q(status="running")),
+        dead=Count("pk", filter=Q(status="dead")),
+        succeeded=Count("pk", filter=recent & Q(status="succeeded")),
+        avg_run=Avg(
+            ExpressionWrapper(
+                F("finished_at") - F("started_at"), output_field=DurationField()
+            ),
+            filter=recent & Q(status="succeeded"),
+        ),
+    )
+    return {
+        row["queue"]: {
+            "queued": row["queued"],
+            "running": row["running"],
+            "dead": row["dead"],
+            "succeeded": row["succeeded"],
+            "per_minute": row["succeeded"] * 60 / window,
+            "avg_seconds": (
+                row["avg_run"].total_seconds() if row["avg_run"] is not None else None
+            ),
+        }
+        for row in rows.order_by("queue")
+    }
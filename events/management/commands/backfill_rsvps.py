@@ -0,0 +1,61 @@
+from django.core.management.base import BaseCommand
+
+from events.constants import RSVPStatus
+from events.models import RSVP, Event
+
+
+class Command(BaseCommand):
+    help = "Copies Event.participants rows into attending RSVPs in batches."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=1000,
+            help="Number of participant rows copied per batch.",
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"]
+        through = Event.participants.through
+        last_pk = 0
+        copied = 0
+
+        # Keyset pagination over the through table keeps each batch an
+        # index range scan regardless of table size.
+        while True:
+            rows = list(
+                through.objects.filter(pk__gt=last_pk)
+                .order_by("pk")
+                .values_list("pk", "event_id", "user_id")[:batch_size]
+            )
+            if not rows:
+                break
+
+            pairs = {(event_id, user_id) for _, event_id, user_id in rows}
+            # bulk_create returns every object with ignore_conflicts, so the
+            # rows that already had an RSVP are counted out beforehand
+            existing = set(
+                RSVP.objects.filter(
+                    event_id__in={event_id for event_id, _ in pairs},
+                    user_id__in={user_id for _, user_id in pairs},
+                ).values_list("event_id", "user_id")
+            )
+            RSVP.objects.bulk_create(
+                [
+                    RSVP(
+                        event_id=event_id, user_id=user_id, status=RSVPStatus.ATTENDING
+                    )
+                    for event_id, user_id in pairs - existing
+                ],
+                ignore_conflicts=True,
+            )
+            copied += len(pairs - existing)
+            last_pk = rows[-1][0]
+            self.stdout.write(f"Processed participant rows up to id {last_pk}.")
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Backfill complete: {copied} participant row(s) copied."
+            )
+        )
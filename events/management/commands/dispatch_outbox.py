@@ -0,0 +1,36 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from events.constants import OUTBOX
+from events.outbox import dispatch_outbox
+
+
+class Command(BaseCommand):
+    help = "Sends queued outbox emails in batches over one SMTP connection each."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=OUTBOX["BATCH_SIZE"],
+            help="Emails sent per SMTP connection.",
+        )
+        parser.add_argument(
+            "--loop",
+            action="store_true",
+            help="Keep polling for due emails instead of exiting when none are left.",
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            totals = dispatch_outbox(batch_size=options["batch_size"])
+            if totals["sent"] or totals["failed"] or not options["loop"]:
+                self.stdout.write(
+                    self.style.SUCCESS(
+                        f"Sent {totals['sent']} email(s); {totals['failed']} failed."
+                    )
+                )
+            if not options["loop"]:
+                break
+            time.sleep(OUTBOX["POLL_INTERVAL"])
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from events.view_tracking import persist_pending_views, view_counter
+
+
+class Command(BaseCommand):
+    help = "Persists buffered event view counts from Redis to the database."
+
+    def handle(self, *args, **options):
+        view_counter.flush()
+        updated = persist_pending_views()
+        self.stdout.write(
+            self.style.SUCCESS(f"Persisted view counts for {updated} event(s).")
+        )
@@ -0,0 +1,47 @@
+from django.core.management.base import BaseCommand
+
+from events.constants import IMAGE_DERIVATIVES
+from events.images import backfill_derivatives, supported_formats
+from events.models import Event
+
+
+class Command(BaseCommand):
+    help = (
+        "Renders responsive AVIF/WebP derivatives of event images across a "
+        "process pool, for images uploaded before derivatives existed."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=IMAGE_DERIVATIVES["WORKERS"],
+            help="Number of processes rendering images.",
+        )
+        parser.add_argument(
+            "--all",
+            action="store_true",
+            help="Regenerate every event image, not only those missing derivatives.",
+        )
+
+    def handle(self, *args, **options):
+        if not supported_formats():
+            self.stderr.write("This Pillow build cannot encode AVIF or WebP.")
+            return
+
+        rows = Event.objects.exclude(image="").values_list(
+            "pk", "image", "image_derivatives__source"
+        )
+        event_ids = [
+            pk
+            for pk, image, source in rows.iterator()
+            if options["all"] or source != image
+        ]
+        self.stdout.write(f"Rendering derivatives for {len(event_ids)} event(s).")
+
+        totals = backfill_derivatives(event_ids, options["workers"])
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Generated {totals['generated']} image(s); {totals['failed']} failed."
+            )
+        )
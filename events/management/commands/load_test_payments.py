@@ -0,0 +1,250 @@
+import math
+import threading
+import time
+import uuid
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qsl, urlsplit
+
+import requests
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection as db_connection
+from django.db.models import Count
+from django.test import Client
+from django.urls import reverse
+from django.utils import timezone
+
+from events.fake_gateway import start_fake_gateway
+from events.jobs import run_pending_jobs, work
+from events.models import Category, Event, Payment
+from events.payment_utils import payment_handler
+
+User = get_user_model()
+
+STAGES = ("initiate", "gateway", "ipn", "redirect")
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[max(math.ceil(pct / 100 * len(ordered)) - 1, 0)]
+
+
+class Command(BaseCommand):
+    help = (
+        "Drives concurrent initiate_payment -> IPN -> payment_success flows "
+        "against a fake gateway and reports per-stage latency. Callbacks are "
+        "validated by job workers started in-process on the payments queue, "
+        "or with --workers 0 by draining that queue once the flows finish."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--flows", type=int, default=1000)
+        parser.add_argument("--concurrency", type=int, default=50)
+        parser.add_argument(
+            "--gateway-url",
+            default="",
+            help="Use a running run_fake_gateway instead of an in-process one.",
+        )
+        parser.add_argument("--latency", type=float, default=0.05)
+        parser.add_argument("--jitter", type=float, default=0.05)
+        parser.add_argument("--error-rate", type=float, default=0.0)
+        parser.add_argument("--decline-rate", type=float, default=0.0)
+        parser.add_argument(
+            "--host",
+            default="localhost",
+            help="Host header for requests; must be in ALLOWED_HOSTS.",
+        )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=4,
+            help="Job worker threads validating callbacks during the run; "
+            "0 drains the payments queue in-process after the flows.",
+        )
+        parser.add_argument(
+            "--settle-timeout",
+            type=float,
+            default=60,
+            help="Seconds to wait for background validation to drain.",
+        )
+        parser.add_argument(
+            "--keep-data",
+            action="store_true",
+            help="Keep the generated event, users and payments.",
+        )
+
+    def handle(self, *args, **options):
+        server = None
+        gateway_url = options["gateway_url"]
+        if not gateway_url:
+            server = start_fake_gateway(
+                latency=options["latency"],
+                jitter=options["jitter"],
+                error_rate=options["error_rate"],
+                decline_rate=options["decline_rate"],
+            )
+            gateway_url = server.base_url
+
+        previous_urls = {
+            name: getattr(payment_handler.sslcz, name)
+            for name in ("createSessionUrl", "validation_url", "transaction_url")
+        }
+        payment_handler.sslcz.set_api_url(gateway_url)
+        event, users = self.create_fixtures(options["flows"])
+        stop = threading.Event()
+        workers = [
+            threading.Thread(target=work, args=(["payments"],), kwargs={"stop": stop})
+            for _ in range(options["workers"])
+        ]
+
+        try:
+            for worker in workers:
+                worker.start()
+            started = time.monotonic()
+            timings = defaultdict(list)
+            errors = defaultdict(int)
+            with ThreadPoolExecutor(max_workers=options["concurrency"]) as pool:
+                for result in pool.map(
+                    lambda user: self.run_flow(event, user, options["host"]), users
+                ):
+                    for stage, elapsed in result["timings"].items():
+                        timings[stage].append(elapsed)
+                    if result["error"]:
+                        errors[result["error"]] += 1
+            elapsed = time.monotonic() - started
+            settle_time = self.wait_for_settlement(
+                event, options["settle_timeout"], drain=not workers
+            )
+            self.report(event, len(users), elapsed, settle_time, timings, errors)
+        finally:
+            stop.set()
+            for worker in workers:
+                worker.join()
+            for name, url in previous_urls.items():
+                setattr(payment_handler.sslcz, name, url)
+            if server is not None:
+                server.shutdown()
+                server.server_close()
+            if not options["keep_data"]:
+                event.delete()
+                User.objects.filter(
+                    pk__in=[user.pk for user in users] + [event.organizer_id]
+                ).delete()
+
+    def create_fixtures(self, flows):
+        run_id = uuid.uuid4().hex[:8]
+        organizer = User.objects.create_user(username=f"loadtest_{run_id}_organizer")
+        category, _ = Category.objects.get_or_create(name="Load Test")
+        event = Event.objects.create(
+            name=f"Load test {run_id}",
+            description="Generated by load_test_payments.",
+            date=timezone.localdate(),
+            time=timezone.localtime().time(),
+            location="Localhost",
+            category=category,
+            organizer=organizer,
+            status="published",
+            ticket_price=100,
+        )
+        users = User.objects.bulk_create(
+            [
+                User(
+                    username=f"loadtest_{run_id}_{i}",
+                    email=f"loadtest_{run_id}_{i}@example.com",
+                )
+                for i in range(flows)
+            ]
+        )
+        return event, users
+
+    def run_flow(self, event, user, host):
+        timings = {}
+        client = Client(HTTP_HOST=host)
+        client.force_login(user)
+
+        def timed(stage, call):
+            started = time.monotonic()
+            response = call()
+            timings[stage] = time.monotonic() - started
+            return response
+
+        try:
+            response = timed(
+                "initiate",
+                lambda: client.post(reverse("initiate_payment", args=[event.pk])),
+            )
+            if response.status_code != 302:
+                return {"timings": timings, "error": "initiate"}
+
+            response = timed(
+                "gateway",
+                lambda: requests.get(
+                    response["Location"], allow_redirects=False, timeout=30
+                ),
+            )
+            if response.status_code != 302:
+                return {"timings": timings, "error": "gateway"}
+            callback_url = urlsplit(response.headers["Location"])
+            callback = dict(parse_qsl(callback_url.query))
+
+            response = timed(
+                "ipn", lambda: client.post(reverse("payment_ipn"), callback)
+            )
+            if response.status_code != 200:
+                return {"timings": timings, "error": "ipn"}
+
+            response = timed(
+                "redirect", lambda: client.get(callback_url.path, callback)
+            )
+            if response.status_code != 200:
+                return {"timings": timings, "error": "redirect"}
+            return {"timings": timings, "error": None}
+        except Exception as e:
+            self.stderr.write(f"Flow for {user.username} crashed: {e}")
+            return {"timings": timings, "error": "exception"}
+        finally:
+            db_connection.close()
+
+    def wait_for_settlement(self, event, timeout, drain=False):
+        started = time.monotonic()
+        while time.monotonic() - started < timeout:
+            if drain:
+                run_pending_jobs(["payments"])
+            if not Payment.objects.filter(event=event, status="pending").exists():
+                break
+            time.sleep(0.25)
+        return time.monotonic() - started
+
+    def report(self, event, flows, elapsed, settle_time, timings, errors):
+        statuses = dict(
+            Payment.objects.filter(event=event)
+            .values_list("status")
+            .annotate(count=Count("pk"))
+        )
+        self.stdout.write(
+            f"{flows} flow(s) in {elapsed:.2f}s ({flows / elapsed:.1f} flows/s); "
+            f"background validation drained {settle_time:.2f}s later."
+        )
+        self.stdout.write(f"Payments by status: {statuses}")
+        self.stdout.write(
+            f"{'stage':<10}{'count':>8}{'mean':>10}{'p50':>10}{'p95':>10}"
+            f"{'p99':>10}{'max':>10}  (ms)"
+        )
+        for stage in STAGES:
+            samples = timings.get(stage)
+            if not samples:
+                continue
+            row = [sum(samples) / len(samples)] + [
+                percentile(samples, pct) for pct in (50, 95, 99, 100)
+            ]
+            self.stdout.write(
+                f"{stage:<10}{len(samples):>8}"
+                + "".join(f"{value * 1000:>10.1f}" for value in row)
+            )
+        if errors:
+            self.stdout.write(
+                self.style.WARNING(f"Failed flows by stage: {dict(errors)}")
+            )
+        else:
+            self.stdout.write(self.style.SUCCESS("All flows completed."))
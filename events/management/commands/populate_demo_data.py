@@ -7,6 +7,8 @@ from django.core.files.base import ContentFile
 from django.core.management.base import BaseCommand
 from django.utils import timezone
 
+from events.attendance import set_rsvp_status
+from events.constants import RSVPStatus
 from events.models import Category, Event, Payment
 
 User = get_user_model()
@@ -238,7 +240,8 @@ class Command(BaseCommand):
                 },
             )
             if created:
-                event.participants.add(*event_data["participants"])
+                for participant in event_data["participants"]:
+                    set_rsvp_status(event, participant, RSVPStatus.ATTENDING)
 
             # Ensure event image exists
             if not event.image.name or "default_event.webp" in event.image.name:
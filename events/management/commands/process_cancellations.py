@@ -0,0 +1,45 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+from django.utils import timezone
+
+from events.cancellation import process_refunds, run_cancellation
+from events.constants import CANCELLATION
+from events.models import EventCancellation
+
+
+class Command(BaseCommand):
+    help = "Resumes unfinished event cancellations and retries pending refunds."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--stale-after",
+            type=int,
+            default=CANCELLATION["STALE_AFTER"],
+            help=(
+                "Seconds without progress after which a running cancellation is "
+                "considered crashed."
+            ),
+        )
+
+    def handle(self, *args, **options):
+        stale_before = timezone.now() - timedelta(seconds=options["stale_after"])
+        # Healthy runs refresh modified after every batch, so a run this quiet
+        # has crashed; reset it so run_cancellation can claim it again
+        EventCancellation.objects.filter(
+            status="running", modified__lt=stale_before
+        ).update(status="failed")
+
+        resumed = 0
+        for cancellation_id in EventCancellation.objects.filter(
+            Q(status="pending") | Q(status="failed")
+        ).values_list("pk", flat=True):
+            resumed += run_cancellation(cancellation_id)
+
+        requested = process_refunds()
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Completed {resumed} cancellation(s); requested {requested} refund(s)."
+            )
+        )
@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand
+
+from events.constants import PAYMENT_INBOX
+from events.payment_inbox import process_pending_notifications
+
+
+class Command(BaseCommand):
+    help = "Validates pending payment notifications with a worker pool."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--limit",
+            type=int,
+            default=500,
+            help="Maximum number of notifications to process in this run.",
+        )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=PAYMENT_INBOX["WORKERS"],
+            help="Number of concurrent validation threads.",
+        )
+
+    def handle(self, *args, **options):
+        settled = process_pending_notifications(
+            limit=options["limit"], workers=options["workers"]
+        )
+        self.stdout.write(
+            self.style.SUCCESS(f"Settled {settled} payment notification(s).")
+        )
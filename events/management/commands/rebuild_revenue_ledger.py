@@ -0,0 +1,37 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from events.constants import REVENUE_LEDGER
+from events.revenue import rebuild_ledger
+
+
+class Command(BaseCommand):
+    help = "Rebuilds the daily revenue ledger from valid payments in chunks of days."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--since",
+            help="First day to rebuild (YYYY-MM-DD); defaults to the first payment.",
+        )
+        parser.add_argument(
+            "--until", help="Last day to rebuild (YYYY-MM-DD); defaults to today."
+        )
+        parser.add_argument(
+            "--chunk-days",
+            type=int,
+            default=REVENUE_LEDGER["REBUILD_CHUNK_DAYS"],
+            help="Number of days recomputed per transaction.",
+        )
+
+    def handle(self, *args, **options):
+        try:
+            since = date.fromisoformat(options["since"]) if options["since"] else None
+            until = date.fromisoformat(options["until"]) if options["until"] else None
+        except ValueError as e:
+            raise CommandError(f"Invalid date: {e}")
+
+        written = rebuild_ledger(since, until, chunk_days=options["chunk_days"])
+        self.stdout.write(
+            self.style.SUCCESS(f"Revenue ledger rebuilt: {written} row(s) written.")
+        )
@@ -0,0 +1,49 @@
+from django.core.management.base import BaseCommand
+
+from events.constants import PAYMENT_RECONCILIATION
+from events.payment_gateway import get_gateway_client
+from events.reconciliation import reconcile_payments
+
+
+class Command(BaseCommand):
+    help = "Settles stale pending payments by querying the gateway concurrently."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--older-than",
+            type=int,
+            default=PAYMENT_RECONCILIATION["STALE_AFTER"],
+            help="Only check payments pending for at least this many seconds.",
+        )
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=PAYMENT_RECONCILIATION["CHUNK_SIZE"],
+            help="Number of payments looked up and updated per batch.",
+        )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=PAYMENT_RECONCILIATION["WORKERS"],
+            help="Number of concurrent gateway lookups.",
+        )
+        parser.add_argument(
+            "--client",
+            default=None,
+            help="Dotted path of the gateway client class to use.",
+        )
+
+    def handle(self, *args, **options):
+        totals = reconcile_payments(
+            older_than=options["older_than"],
+            chunk_size=options["chunk_size"],
+            workers=options["workers"],
+            client=get_gateway_client(options["client"]),
+        )
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Checked {totals['checked']} payment(s): "
+                f"{totals['valid']} valid, {totals['failed']} failed, "
+                f"{totals['expired']} expired."
+            )
+        )
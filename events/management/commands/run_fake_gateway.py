@@ -0,0 +1,58 @@
+from django.core.management.base import BaseCommand
+
+from events.fake_gateway import FakeGatewayServer
+
+
+class Command(BaseCommand):
+    help = (
+        "Runs a local SSLCommerz stand-in. Point the app at it with "
+        "SSLCOMMERZ_API_URL."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--host", default="127.0.0.1")
+        parser.add_argument("--port", type=int, default=8765)
+        parser.add_argument(
+            "--latency", type=float, default=0.0, help="Base delay in seconds."
+        )
+        parser.add_argument(
+            "--jitter", type=float, default=0.0, help="Random extra delay in seconds."
+        )
+        parser.add_argument(
+            "--error-rate",
+            type=float,
+            default=0.0,
+            help="Fraction of requests answered with HTTP 503.",
+        )
+        parser.add_argument(
+            "--decline-rate",
+            type=float,
+            default=0.0,
+            help="Fraction of payments declined at the payment page.",
+        )
+        parser.add_argument(
+            "--ipn-url",
+            default="",
+            help="URL that receives IPN callbacks, e.g. http://127.0.0.1:8000/payment_ipn/.",
+        )
+
+    def handle(self, *args, **options):
+        server = FakeGatewayServer(
+            (options["host"], options["port"]),
+            latency=options["latency"],
+            jitter=options["jitter"],
+            error_rate=options["error_rate"],
+            decline_rate=options["decline_rate"],
+            ipn_url=options["ipn_url"],
+        )
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Fake SSLCommerz gateway listening on {server.base_url}"
+            )
+        )
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
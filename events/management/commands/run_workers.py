@@ -0,0 +1,115 @@
+import multiprocessing
+import threading
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from events.constants import JOBS
+from events.jobs import queue_metrics, run_pending_jobs, work
+from events.scheduler import run_scheduler, schedule_due_tasks
+
+
+class Command(BaseCommand):
+    help = (
+        "Runs background jobs from the jobs table with threads or processes, "
+        "plus the periodic task scheduler."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--queue",
+            action="append",
+            dest="queues",
+            help="Queue to work on; repeat for several. Defaults to every queue.",
+        )
+        parser.add_argument(
+            "--concurrency",
+            type=int,
+            default=JOBS["CONCURRENCY"],
+            help="Number of worker threads or processes.",
+        )
+        parser.add_argument(
+            "--mode",
+            choices=["thread", "process"],
+            default="thread",
+            help="Run workers as threads of this process or as child processes.",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=JOBS["BATCH_SIZE"],
+            help="Jobs a worker claims per round trip.",
+        )
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Enqueue due periodic tasks and run the jobs due now, then exit.",
+        )
+        parser.add_argument(
+            "--no-scheduler",
+            action="store_true",
+            help="Do not run the periodic task scheduler in this instance.",
+        )
+        parser.add_argument(
+            "--metrics",
+            action="store_true",
+            help="Print per-queue backlog and throughput, then exit.",
+        )
+
+    def handle(self, *args, **options):
+        queues = options["queues"]
+        if options["metrics"]:
+            for queue, stats in queue_metrics().items():
+                avg = stats["avg_seconds"]
+                self.stdout.write(
+                    f"{queue}: {stats['queued']} queued, {stats['running']} running, "
+                    f"{stats['dead']} dead, {stats['per_minute']:.1f}/min"
+                    + (f", {avg:.2f}s avg" if avg is not None else "")
+                )
+            return
+
+        if options["once"]:
+            if not options["no_scheduler"]:
+                schedule_due_tasks()
+            totals = run_pending_jobs(queues, options["batch_size"])
+            self.stdout.write(
+                self.style.SUCCESS(
+                    f"Ran {totals['succeeded']} job(s); {totals['failed']} failed."
+                )
+            )
+            return
+
+        stop = threading.Event()
+        args = (queues, options["batch_size"])
+        if options["mode"] == "process":
+            # Children must open their own connections rather than share ours
+            connections.close_all()
+            workers = [
+                multiprocessing.Process(target=work, args=args, daemon=True)
+                for _ in range(options["concurrency"])
+            ]
+        else:
+            workers = [
+                threading.Thread(target=work, args=args + (stop,), daemon=True)
+                for _ in range(options["concurrency"])
+            ]
+        if not options["no_scheduler"]:
+            # Every instance runs one; only the elected leader enqueues
+            workers.append(
+                threading.Thread(target=run_scheduler, args=(stop,), daemon=True)
+            )
+        for worker in workers:
+            worker.start()
+        self.stdout.write(
+            f"Started {options['concurrency']} {options['mode']} worker(s) on "
+            f"{', '.join(queues) if queues else 'every queue'}."
+        )
+        try:
+            for worker in workers:
+                worker.join()
+        except KeyboardInterrupt:
+            # Threads finish their current job; child processes get the
+            # interrupt themselves
+            stop.set()
+            for worker in workers:
+                worker.join()
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from events.broadcasts import send_due_broadcasts
+
+
+class Command(BaseCommand):
+    help = "Sends due broadcasts and change notices, resuming crashed runs."
+
+    def handle(self, *args, **options):
+        queued = send_due_broadcasts()
+        self.stdout.write(
+            self.style.SUCCESS(f"Queued {queued} broadcast email(s) in the outbox.")
+        )
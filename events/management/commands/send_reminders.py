@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+
+from events.constants import REMINDERS
+from events.reminders import send_reminders
+
+
+class Command(BaseCommand):
+    help = "Queues reminder digests for events starting within each window."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--window",
+            choices=list(REMINDERS["WINDOWS"]),
+            action="append",
+            help="Reminder window to run; may be repeated. Defaults to all.",
+        )
+
+    def handle(self, *args, **options):
+        for window in options["window"] or REMINDERS["WINDOWS"]:
+            queued = send_reminders(window)
+            self.stdout.write(
+                self.style.SUCCESS(f"Queued {queued} {window} reminder digest(s).")
+            )
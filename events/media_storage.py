@@ -0,0 +1,78 @@
+"""
+Content-addressed media storage for EventMan.
+Uploads are hashed chunk by chunk before they are sent anywhere; bytes that
+are already stored are not transferred again, and the save returns the name
+of the existing copy. MediaBlob reference-counts each copy so the file is
+only deleted once nothing refers to it. Files stored before deduplication
+have no MediaBlob and are deleted as usual.
+The Cloudinary variant lives in events/cloudinary_media.py, because
+cloudinary_storage refuses to import without Cloudinary credentials.
+"""
+
+import hashlib
+from typing import Optional, Tuple
+
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage
+from django.db import IntegrityError, transaction
+from django.db.models import F
+
+from .models import MediaBlob
+
+
+def content_digest(content: File) -> Tuple[str, int]:
+    """SHA-256 and size of an upload, read in chunks; rewinds it after."""
+    digest, size = hashlib.sha256(), 0
+    for chunk in content.chunks():
+        digest.update(chunk)
+        size += len(chunk)
+    content.seek(0)
+    return digest.hexdigest(), size
+
+
+class DedupStorageMixin:
+    """Stores each distinct file once; identical saves share its name."""
+
+    def save(self, name, content, max_length=None):
+        if name is None:
+            name = content.name
+        if not hasattr(content, "chunks"):
+            content = File(content, name)
+        digest, size = content_digest(content)
+        existing = self._add_reference(digest)
+        if existing:
+            return existing
+
+        stored = super().save(name, content, max_length=max_length)
+        try:
+            with transaction.atomic():
+                MediaBlob.objects.create(digest=digest, name=stored, size=size)
+        except IntegrityError:
+            # The same bytes were stored concurrently; keep only their copy
+            existing = self._add_reference(digest)
+            if not existing:
+                raise
+            super().delete(stored)
+            return existing
+        return stored
+
+    def _add_reference(self, digest: str) -> Optional[str]:
+        blobs = MediaBlob.objects.filter(digest=digest)
+        # A blob whose last reference is being deleted no longer matches
+        if blobs.update(refs=F("refs") + 1):
+            return blobs.values_list("name", flat=True).first()
+        return None
+
+    def delete(self, name):
+        with transaction.atomic():
+            blob = MediaBlob.objects.select_for_update().filter(name=name).first()
+            if blob is not None and blob.refs > 1:
+                MediaBlob.objects.filter(pk=blob.pk).update(refs=F("refs") - 1)
+                return None
+            if blob is not None:
+                blob.delete()
+        return super().delete(name)
+
+
+class DedupFileSystemStorage(DedupStorageMixin, FileSystemStorage):
+    pass
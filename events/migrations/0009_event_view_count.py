@@ -0,0 +1,26 @@
+# Generated by Django 5.2.7 on 2026-10-19 05:15
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("events", "0008_alter_payment_status_alter_rsvp_status"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="event",
+            name="view_count",
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddIndex(
+            model_name="event",
+            index=models.Index(
+                fields=["status", "view_count"], name="events_even_status_c66cf9_idx"
+            ),
+        ),
+    ]
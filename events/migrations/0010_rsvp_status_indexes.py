@@ -0,0 +1,27 @@
+# Generated by Django 5.2.7 on 2026-10-19 05:19
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("events", "0009_event_view_count"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="rsvp",
+            index=models.Index(
+                fields=["event", "status"], name="events_rsvp_event_i_6bb8a2_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="rsvp",
+            index=models.Index(
+                fields=["user", "status"], name="events_rsvp_user_id_292645_idx"
+            ),
+        ),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 5.2.7 on 2026-10-19 05:23
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("events", "0010_rsvp_status_indexes"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="event",
+            name="capacity",
+            field=models.PositiveIntegerField(
+                blank=True, help_text="Leave blank for unlimited attendees.", null=True
+            ),
+        ),
+    ]
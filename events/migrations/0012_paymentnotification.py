@@ -0,0 +1,79 @@
+# Generated by Django 5.2.7 on 2026-10-19 05:27
+
+import django.utils.timezone
+import model_utils.fields
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("events", "0011_event_capacity"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="PaymentNotification",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "created",
+                    model_utils.fields.AutoCreatedField(
+                        default=django.utils.timezone.now,
+                        editable=False,
+                        verbose_name="created",
+                    ),
+                ),
+                (
+                    "modified",
+                    model_utils.fields.AutoLastModifiedField(
+                        default=django.utils.timezone.now,
+                        editable=False,
+                        verbose_name="modified",
+                    ),
+                ),
+                (
+                    "source",
+                    models.CharField(
+                        choices=[("ipn", "IPN"), ("redirect", "Redirect")],
+                        max_length=20,
+                    ),
+                ),
+                ("transaction_id", models.CharField(db_index=True, max_length=100)),
+                ("payload", models.JSONField(default=dict)),
+                (
+                    "status",
+                    models.CharField(
+                        choices=[
+                            ("pending", "Pending"),
+                            ("processing", "Processing"),
+                            ("processed", "Processed"),
+                            ("failed", "Failed"),
+                        ],
+                        default="pending",
+                        max_length=20,
+                    ),
+                ),
+                ("attempts", models.PositiveSmallIntegerField(default=0)),
+                ("last_error", models.TextField(blank=True, default="")),
+                ("processed_at", models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                "ordering": ["created"],
+                "indexes": [
+                    models.Index(
+                        fields=["status", "modified"],
+                        name="events_paym_status_50f62a_idx",
+                    )
+                ],
+            },
+        ),
+    ]
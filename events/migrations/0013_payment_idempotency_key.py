@@ -0,0 +1,32 @@
+# Generated by Django 5.2.7 on 2026-10-19 05:40
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("events", "0012_paymentnotification"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="payment",
+            name="gateway_url",
+            field=models.URLField(blank=True, max_length=500),
+        ),
+        migrations.AddField(
+            model_name="payment",
+            name="idempotency_key",
+            field=models.CharField(blank=True, max_length=64, null=True),
+        ),
+        migrations.AddConstraint(
+            model_name="payment",
+            constraint=models.UniqueConstraint(
+                fields=("user", "event", "idempotency_key"),
+                name="unique_payment_idempotency_key",
+            ),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.7 on 2026-10-19 06:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("events", "0022_periodictask"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="event",
+            name="image_derivatives",
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.7 on 2026-10-19 07:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("events", "0024_media_blob"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="refund",
+            name="status",
+            field=models.CharField(
+                choices=[
+                    ("pending", "Pending"),
+                    ("processing", "Processing"),
+                    ("reconciling", "Needs reconciliation"),
+                    ("requested", "Requested"),
+                    ("failed", "Failed"),
+                ],
+                default="pending",
+                max_length=20,
+            ),
+        ),
+    ]
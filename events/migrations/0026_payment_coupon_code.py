@@ -0,0 +1,18 @@
+# Generated by Django 5.2.7 on 2026-10-19 07:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("events", "0025_refund_reconciling"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="payment",
+            name="coupon_code",
+            field=models.CharField(blank=True, max_length=50),
+        ),
+    ]
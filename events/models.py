@@ -1,12 +1,19 @@
+from decimal import Decimal
+
 from django.contrib.auth import get_user_model
 from django.db import models
-from django.db.models.signals import post_save
-from django.dispatch import receiver
 from django.utils import timezone
 from model_utils import Choices
 from model_utils.models import StatusModel, TimeStampedModel
 
-from .constants import PAYMENT_STATUS_CHOICES, RSVP_STATUS_CHOICES
+from .constants import (BROADCAST_KIND_CHOICES, BROADCAST_STATUS_CHOICES,
+                        CANCELLATION_STATUS_CHOICES,
+                        COUPON_DISCOUNT_TYPE_CHOICES, JOB_STATUS_CHOICES,
+                        OUTBOX_STATUS_CHOICES,
+                        PAYMENT_NOTIFICATION_SOURCE_CHOICES,
+                        PAYMENT_NOTIFICATION_STATUS_CHOICES,
+                        PAYMENT_STATUS_CHOICES, REFUND_STATUS_CHOICES,
+                        RSVP_STATUS_CHOICES, RSVPStatus)
 
 User = get_user_model()
 
@@ -43,6 +50,8 @@ class Event(TimeStampedModel, StatusModel):
         Category, on_delete=models.SET_NULL, null=True, blank=True
     )
     image = models.ImageField(upload_to="event_images/")
+    # {"source": image name, "formats": {fmt: {width: storage name}}}
+    image_derivatives = models.JSONField(default=dict, blank=True, editable=False)
     participants = models.ManyToManyField(
         User, related_name="events_joined", blank=True
     )
@@ -55,12 +64,20 @@ class Event(TimeStampedModel, StatusModel):
     )
     ticket_price = models.DecimalField(max_digits=10, decimal_places=2, default=0.00)
     tickets_sold = models.PositiveIntegerField(default=0)
+    # Held by pending checkouts; released when their payment fails
+    tickets_reserved = models.PositiveIntegerField(default=0)
+    capacity = models.PositiveIntegerField(
+        null=True, blank=True, help_text="Leave blank for unlimited attendees."
+    )
+    view_count = models.PositiveIntegerField(default=0)
 
     class Meta:
         ordering = ["date", "time"]
         indexes = [
             models.Index(fields=["date", "status"]),
             models.Index(fields=["category", "status"]),
+            models.Index(fields=["status", "view_count"]),
+            models.Index(fields=["date", "time"]),
         ]
 
     def __str__(self):
@@ -81,8 +98,20 @@ class Event(TimeStampedModel, StatusModel):
         return self.date == timezone.localdate()
 
     def participant_count(self):
-        """Get participant count efficiently."""
-        return self.participants.count()
+        """Get attending participant count from the indexed RSVP rows."""
+        return self.rsvps.attending().count()
+
+    def seats_left(self):
+        """Remaining attending seats, or None when capacity is unlimited."""
+        if self.capacity is None:
+            return None
+        return max(self.capacity - self.participant_count(), 0)
+
+    def attendees(self):
+        """Users with an attending RSVP for this event."""
+        return User.objects.filter(
+            rsvps__event=self, rsvps__status=RSVPStatus.ATTENDING
+        )
 
 
 class Payment(TimeStampedModel):
@@ -91,20 +120,371 @@ class Payment(TimeStampedModel):
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="payments")
     event = models.ForeignKey(Event, on_delete=models.CASCADE, related_name="payments")
     amount = models.DecimalField(max_digits=10, decimal_places=2)
+    quantity = models.PositiveIntegerField(default=1)
     transaction_id = models.CharField(max_length=100, unique=True)
     status = models.CharField(
         max_length=20,
         choices=PAYMENT_STATUS_CHOICES,
         default="pending",
     )
+    # Checkout page token; repeated submits reuse this payment's session
+    idempotency_key = models.CharField(max_length=64, null=True, blank=True)
+    # The coupon the order was submitted with; resubmits must match it
+    coupon_code = models.CharField(max_length=50, blank=True)
+    gateway_url = models.URLField(max_length=500, blank=True)
+    paid_at = models.DateTimeField(null=True, blank=True)
 
     class Meta:
         ordering = ["-created"]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["user", "event", "idempotency_key"],
+                name="unique_payment_idempotency_key",
+            )
+        ]
 
     def __str__(self):
         return f"Payment {self.transaction_id} for {self.event.name}"
 
 
+class PaymentItem(TimeStampedModel):
+    """Line item of a payment's order"""
+
+    payment = models.ForeignKey(Payment, on_delete=models.CASCADE, related_name="items")
+    description = models.CharField(max_length=255)
+    unit_price = models.DecimalField(max_digits=10, decimal_places=2)
+    quantity = models.PositiveIntegerField(default=1)
+
+    class Meta:
+        ordering = ["pk"]
+
+    def __str__(self):
+        return f"{self.quantity} x {self.description}"
+
+    def total(self):
+        return self.unit_price * self.quantity
+
+
+class Coupon(TimeStampedModel):
+    """Discount code for one event, or for every event when no event is set"""
+
+    code = models.CharField(max_length=50, unique=True)
+    event = models.ForeignKey(
+        Event,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name="coupons",
+    )
+    discount_type = models.CharField(
+        max_length=10, choices=COUPON_DISCOUNT_TYPE_CHOICES, default="percent"
+    )
+    value = models.DecimalField(max_digits=10, decimal_places=2)
+    # Empty means unlimited redemptions
+    max_redemptions = models.PositiveIntegerField(null=True, blank=True)
+    per_user_limit = models.PositiveIntegerField(default=1)
+    # Source of truth for the total; only ever changed with conditional updates
+    redemptions_count = models.PositiveIntegerField(default=0)
+    valid_from = models.DateTimeField(null=True, blank=True)
+    valid_until = models.DateTimeField(null=True, blank=True)
+    is_active = models.BooleanField(default=True)
+
+    class Meta:
+        ordering = ["-created"]
+
+    def __str__(self):
+        return self.code
+
+    def save(self, *args, **kwargs):
+        self.code = self.code.strip().upper()
+        super().save(*args, **kwargs)
+
+    def discount_for(self, amount):
+        """Discount this coupon gives on an amount, never more than the amount."""
+        if self.discount_type == "percent":
+            discount = (amount * self.value / 100).quantize(Decimal("0.01"))
+        else:
+            discount = self.value
+        return min(discount, amount)
+
+
+class CouponRedemption(TimeStampedModel):
+    """One use of a coupon, tied to the payment it discounted"""
+
+    coupon = models.ForeignKey(
+        Coupon, on_delete=models.CASCADE, related_name="redemptions"
+    )
+    user = models.ForeignKey(
+        User, on_delete=models.CASCADE, related_name="coupon_redemptions"
+    )
+    payment = models.OneToOneField(
+        Payment, on_delete=models.CASCADE, related_name="coupon_redemption"
+    )
+    discount = models.DecimalField(max_digits=10, decimal_places=2)
+
+    class Meta:
+        ordering = ["-created"]
+        indexes = [models.Index(fields=["coupon", "user"])]
+
+    def __str__(self):
+        return f"{self.coupon.code} on {self.payment.transaction_id}"
+
+
+class RevenueLedger(TimeStampedModel):
+    """Daily revenue and tickets per event, rolled up from valid payments"""
+
+    event = models.ForeignKey(
+        Event, on_delete=models.CASCADE, related_name="revenue_ledger"
+    )
+    organizer = models.ForeignKey(
+        User,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="revenue_ledger",
+    )
+    day = models.DateField()
+    revenue = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    tickets = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        ordering = ["day"]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["event", "day"], name="unique_revenue_ledger_event_day"
+            )
+        ]
+        indexes = [
+            models.Index(fields=["day"]),
+            models.Index(fields=["organizer", "day"]),
+        ]
+
+    def __str__(self):
+        return f"{self.event.name} on {self.day}: {self.revenue}"
+
+
+class Refund(TimeStampedModel):
+    """Gateway refund of a valid payment"""
+
+    payment = models.OneToOneField(
+        Payment, on_delete=models.CASCADE, related_name="refund"
+    )
+    amount = models.DecimalField(max_digits=10, decimal_places=2)
+    status = models.CharField(
+        max_length=20, choices=REFUND_STATUS_CHOICES, default="pending"
+    )
+    refund_ref_id = models.CharField(max_length=100, blank=True)
+    attempts = models.PositiveIntegerField(default=0)
+    last_error = models.TextField(blank=True)
+
+    class Meta:
+        ordering = ["created"]
+        indexes = [models.Index(fields=["status", "modified"])]
+
+    def __str__(self):
+        return f"Refund of {self.payment.transaction_id} ({self.status})"
+
+
+class EventCancellation(TimeStampedModel):
+    """Progress of an event cancellation's refunds and attendee notices"""
+
+    event = models.OneToOneField(
+        Event, on_delete=models.CASCADE, related_name="cancellation"
+    )
+    requested_by = models.ForeignKey(
+        User, on_delete=models.SET_NULL, null=True, blank=True, related_name="+"
+    )
+    reason = models.TextField(blank=True)
+    status = models.CharField(
+        max_length=20, choices=CANCELLATION_STATUS_CHOICES, default="pending"
+    )
+    refunds_total = models.PositiveIntegerField(default=0)
+    refunds_requested = models.PositiveIntegerField(default=0)
+    refunds_failed = models.PositiveIntegerField(default=0)
+    attendees_total = models.PositiveIntegerField(default=0)
+    attendees_notified = models.PositiveIntegerField(default=0)
+    # Keyset watermark, so a resumed run does not notify anyone twice
+    last_notified_user_id = models.PositiveIntegerField(default=0)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"Cancellation of {self.event.name} ({self.status})"
+
+    def progress(self):
+        """Percentage of refunds and notices handled so far."""
+        total = self.refunds_total + self.attendees_total
+        if not total:
+            return 100 if self.status == "completed" else 0
+        done = self.refunds_requested + self.refunds_failed + self.attendees_notified
+        return min(round(done * 100 / total), 100)
+
+
+class Broadcast(TimeStampedModel):
+    """Message or change notice fanned out to an event's attendees"""
+
+    event = models.ForeignKey(
+        Event, on_delete=models.CASCADE, related_name="broadcasts"
+    )
+    sender = models.ForeignKey(
+        User, on_delete=models.SET_NULL, null=True, blank=True, related_name="+"
+    )
+    kind = models.CharField(
+        max_length=20, choices=BROADCAST_KIND_CHOICES, default="message"
+    )
+    subject = models.CharField(max_length=200)
+    message = models.TextField(blank=True)
+    # Change notices: field -> [old, new], merged across quick edits
+    changes = models.JSONField(default=dict, blank=True)
+    status = models.CharField(
+        max_length=20, choices=BROADCAST_STATUS_CHOICES, default="pending"
+    )
+    send_after = models.DateTimeField(default=timezone.now)
+    recipients_total = models.PositiveIntegerField(default=0)
+    recipients_queued = models.PositiveIntegerField(default=0)
+    # Keyset watermark, so a resumed run does not message anyone twice
+    last_user_id = models.PositiveIntegerField(default=0)
+    # Where the throttled send schedule continues from
+    next_send_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ["-created"]
+        indexes = [models.Index(fields=["status", "send_after"])]
+
+    def __str__(self):
+        return f"{self.subject} to {self.event.name} ({self.status})"
+
+
+class PaymentNotification(TimeStampedModel):
+    """Inbox of gateway callbacks, acknowledged at once and validated later"""
+
+    source = models.CharField(
+        max_length=20, choices=PAYMENT_NOTIFICATION_SOURCE_CHOICES
+    )
+    transaction_id = models.CharField(max_length=100, db_index=True)
+    payload = models.JSONField(default=dict)
+    status = models.CharField(
+        max_length=20,
+        choices=PAYMENT_NOTIFICATION_STATUS_CHOICES,
+        default="pending",
+    )
+    attempts = models.PositiveSmallIntegerField(default=0)
+    last_error = models.TextField(blank=True, default="")
+    processed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ["created"]
+        indexes = [
+            models.Index(fields=["status", "modified"]),
+        ]
+
+    def __str__(self):
+        return f"{self.get_source_display()} notification for {self.transaction_id}"
+
+
+class OutboxEmail(TimeStampedModel):
+    """Email queued in the sender's transaction and sent by the dispatcher"""
+
+    subject = models.CharField(max_length=255)
+    body = models.TextField()
+    html_body = models.TextField(blank=True)
+    from_email = models.CharField(max_length=255)
+    recipients = models.JSONField(default=list)
+    reply_to = models.JSONField(default=list, blank=True)
+    status = models.CharField(
+        max_length=20, choices=OUTBOX_STATUS_CHOICES, default="pending"
+    )
+    attempts = models.PositiveIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    # Identifies the dispatcher run holding a sending claim
+    claim_token = models.CharField(max_length=32, blank=True)
+    last_error = models.TextField(blank=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ["created"]
+        indexes = [models.Index(fields=["status", "next_attempt_at"])]
+
+    def __str__(self):
+        return f"{self.subject} to {', '.join(self.recipients)} ({self.status})"
+
+
+class Job(TimeStampedModel):
+    """Background job claimed and run by a run_workers process"""
+
+    name = models.CharField(max_length=100)
+    queue = models.CharField(max_length=50, default="default")
+    payload = models.JSONField(default=dict, blank=True)
+    # Higher runs first among due jobs of a queue
+    priority = models.SmallIntegerField(default=0)
+    status = models.CharField(
+        max_length=20, choices=JOB_STATUS_CHOICES, default="queued"
+    )
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=5)
+    run_at = models.DateTimeField(default=timezone.now)
+    # Identifies the worker round trip holding a running claim
+    claim_token = models.CharField(max_length=32, blank=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+
+    class Meta:
+        ordering = ["created"]
+        indexes = [
+            models.Index(fields=["queue", "status", "priority", "run_at"]),
+            models.Index(fields=["status", "finished_at"]),
+        ]
+
+    def __str__(self):
+        return f"{self.name} on {self.queue} ({self.status})"
+
+
+class PeriodicTask(TimeStampedModel):
+    """Last-run bookkeeping of one entry of PERIODIC_TASKS"""
+
+    name = models.CharField(max_length=100, unique=True)
+    next_run_at = models.DateTimeField(default=timezone.now)
+    last_run_at = models.DateTimeField(null=True, blank=True)
+    # The job of the latest run; a new run waits until it has finished
+    last_job = models.ForeignKey(
+        Job, on_delete=models.SET_NULL, null=True, blank=True, related_name="+"
+    )
+    runs = models.PositiveIntegerField(default=0)
+    skips = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.name} (next run {self.next_run_at})"
+
+
+class MediaBlob(TimeStampedModel):
+    """One stored copy of identical uploads, shared by every reference to it"""
+
+    # SHA-256 of the file's bytes
+    digest = models.CharField(max_length=64, unique=True)
+    name = models.CharField(max_length=255, db_index=True)
+    size = models.PositiveBigIntegerField()
+    # Saves sharing this copy; the file is deleted when the last one is
+    refs = models.PositiveIntegerField(default=1)
+
+    def __str__(self):
+        return f"{self.name} ({self.refs} reference(s))"
+
+
+class ReminderSchedule(TimeStampedModel):
+    """Watermarks of one reminder window, so reruns never remind twice"""
+
+    window = models.CharField(max_length=20, unique=True)
+    # Events starting up to this moment have been reminded
+    sent_until = models.DateTimeField(null=True, blank=True)
+    # Upper bound of an unfinished run, resumed after last_user_id
+    run_until = models.DateTimeField(null=True, blank=True)
+    last_user_id = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.window} reminders sent until {self.sent_until}"
+
+
 class Profile(TimeStampedModel):
     """User profile with auto timestamps"""
 
@@ -124,6 +504,19 @@ class Profile(TimeStampedModel):
         return f"{self.user.username} Profile"
 
 
+class RSVPQuerySet(models.QuerySet):
+    """Status lookups served by the (event, status) and (user, status) indexes"""
+
+    def attending(self):
+        return self.filter(status=RSVPStatus.ATTENDING)
+
+    def maybe(self):
+        return self.filter(status=RSVPStatus.MAYBE)
+
+    def not_attending(self):
+        return self.filter(status=RSVPStatus.NOT_ATTENDING)
+
+
 class RSVP(TimeStampedModel):
     """RSVP model to track user attendance for events"""
 
@@ -132,28 +525,20 @@ class RSVP(TimeStampedModel):
     status = models.CharField(
         max_length=20,
         choices=RSVP_STATUS_CHOICES,
-        default="attending",
+        default=RSVPStatus.ATTENDING,
     )
 
+    objects = RSVPQuerySet.as_manager()
+
     class Meta:
         unique_together = ["user", "event"]
         ordering = ["-created"]
+        indexes = [
+            models.Index(fields=["event", "status"]),
+            models.Index(fields=["user", "status"]),
+        ]
         verbose_name = "RSVP"
         verbose_name_plural = "RSVPs"
 
     def __str__(self):
         return f"{self.user.username} - {self.event.name} ({self.status})"
-
-
-@receiver(post_save, sender=User)
-def create_user_profile(sender, instance, created, **kwargs):
-    """Auto-create profile when user is created."""
-    if created:
-        Profile.objects.create(user=instance)
-
-
-@receiver(post_save, sender=User)
-def save_user_profile(sender, instance, **kwargs):
-    """Auto-save profile when user is saved."""
-    if hasattr(instance, "profile") and not kwargs.get("raw", False):
-        instance.profile.save()
@@ -0,0 +1,40 @@
+"""
+Batched email notifications for EventMan.
+Messages for a batch are rendered up front and queued in the email outbox,
+which sends them over one SMTP connection.
+"""
+
+from typing import Iterable
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.mail import EmailMultiAlternatives
+from django.template.loader import render_to_string
+from django.utils.html import strip_tags
+
+from .constants import DEFAULT_NOREPLY_EMAIL
+from .models import Event
+from .outbox import enqueue_messages
+
+User = get_user_model()
+
+
+def build_rsvp_confirmation(event: Event, user) -> EmailMultiAlternatives:
+    """Build the RSVP confirmation email for one attendee."""
+    html_message = render_to_string(
+        "emails/rsvp_confirmation.html", {"user": user, "event": event}
+    )
+    message = EmailMultiAlternatives(
+        subject=f"RSVP Confirmation for: {event.name}",
+        body=strip_tags(html_message),
+        from_email=getattr(settings, "DEFAULT_FROM_EMAIL", DEFAULT_NOREPLY_EMAIL),
+        to=[user.email],
+    )
+    message.attach_alternative(html_message, "text/html")
+    return message
+
+
+def queue_rsvp_confirmations(event: Event, user_ids: Iterable[int]) -> int:
+    """Queue RSVP confirmations in the outbox, in the caller's transaction."""
+    users = User.objects.filter(pk__in=list(user_ids)).exclude(email="")
+    return enqueue_messages(build_rsvp_confirmation(event, user) for user in users)
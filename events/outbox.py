@@ -0,0 +1,218 @@
+"""
+Transactional email outbox for EventMan.
+Emails are written as rows in the caller's transaction, so a rolled back
+request never mails anyone, and a dispatcher sends them in batches over one
+reused SMTP connection, retrying failures with exponential back-off.
+"""
+
+import logging
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional
+
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.db import connection as db_connection
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+from django.utils.html import strip_tags
+
+from .constants import DEFAULT_NOREPLY_EMAIL, OUTBOX
+from .models import OutboxEmail
+
+logger = logging.getLogger(__name__)
+
+# One background dispatcher per process; the dispatch_outbox command sweeps
+# retries and anything a restarted process left behind.
+executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="email-outbox")
+_dispatch_lock = threading.Lock()
+_dispatch_queued = False
+
+
+def enqueue_email(
+    subject: str,
+    recipients: List[str],
+    body: str = "",
+    html_message: str = "",
+    from_email: Optional[str] = None,
+    reply_to: Optional[List[str]] = None,
+) -> OutboxEmail:
+    """Queue one email; it is sent once the surrounding transaction commits."""
+    email = OutboxEmail.objects.create(
+        subject=subject,
+        body=body or strip_tags(html_message),
+        html_body=html_message,
+        from_email=from_email or _default_from_email(),
+        recipients=list(recipients),
+        reply_to=list(reply_to or []),
+    )
+    transaction.on_commit(schedule_dispatch)
+    return email
+
+
+def enqueue_messages(
+    messages: Iterable[EmailMultiAlternatives],
+    not_before: Optional[datetime] = None,
+    per_second: Optional[float] = None,
+) -> int:
+    """Queue already built messages with a single INSERT.
+
+    With ``per_second`` the messages are spread out from ``not_before``, so
+    the dispatcher sends them at that rate instead of in one burst.
+    """
+    not_before = not_before or timezone.now()
+    rows = [
+        OutboxEmail(
+            subject=message.subject,
+            body=message.body,
+            html_body=next(
+                (
+                    content
+                    for content, mimetype in getattr(message, "alternatives", [])
+                    if mimetype == "text/html"
+                ),
+                "",
+            ),
+            from_email=message.from_email or _default_from_email(),
+            recipients=list(message.to),
+            reply_to=list(message.reply_to),
+        )
+        for message in messages
+        if message.to
+    ]
+    for index, row in enumerate(rows):
+        delay = index / per_second if per_second else 0
+        row.next_attempt_at = not_before + timedelta(seconds=delay)
+    OutboxEmail.objects.bulk_create(rows, batch_size=OUTBOX["BATCH_SIZE"])
+    if rows:
+        transaction.on_commit(schedule_dispatch)
+    return len(rows)
+
+
+def _default_from_email() -> str:
+    return getattr(settings, "DEFAULT_FROM_EMAIL", DEFAULT_NOREPLY_EMAIL)
+
+
+def schedule_dispatch():
+    """Wake the background dispatcher, unless a run is already queued."""
+    global _dispatch_queued
+    if not OUTBOX["DISPATCH_ON_COMMIT"]:
+        return
+    with _dispatch_lock:
+        if _dispatch_queued:
+            return
+        _dispatch_queued = True
+    executor.submit(_run_dispatcher)
+
+
+def _run_dispatcher():
+    global _dispatch_queued
+    with _dispatch_lock:
+        _dispatch_queued = False
+    try:
+        dispatch_outbox()
+    except Exception as e:
+        logger.error(f"Email outbox dispatch crashed: {e}")
+    finally:
+        db_connection.close()
+
+
+def _due_emails():
+    now = timezone.now()
+    stale_before = now - timedelta(seconds=OUTBOX["STALE_AFTER"])
+    return OutboxEmail.objects.filter(
+        Q(status="pending", next_attempt_at__lte=now)
+        | Q(status="sending", modified__lt=stale_before)
+    )
+
+
+def claim_batch(batch_size: int = None) -> List[OutboxEmail]:
+    """Atomically claim a batch of due emails for this dispatcher run."""
+    batch_size = batch_size or OUTBOX["BATCH_SIZE"]
+    email_ids = list(
+        _due_emails().order_by("pk").values_list("pk", flat=True)[:batch_size]
+    )
+    if not email_ids:
+        return []
+
+    token = uuid.uuid4().hex
+    # Rows another dispatcher claimed first no longer match _due_emails()
+    _due_emails().filter(pk__in=email_ids).update(
+        status="sending",
+        claim_token=token,
+        attempts=F("attempts") + 1,
+        modified=timezone.now(),
+    )
+    return list(OutboxEmail.objects.filter(claim_token=token, status="sending"))
+
+
+def retry_delay(attempts: int) -> timedelta:
+    """Exponential back-off before the next try of a failed send."""
+    seconds = OUTBOX["BACKOFF_BASE"] * 2 ** max(attempts - 1, 0)
+    return timedelta(seconds=min(seconds, OUTBOX["BACKOFF_MAX"]))
+
+
+def build_message(email: OutboxEmail) -> EmailMultiAlternatives:
+    message = EmailMultiAlternatives(
+        subject=email.subject,
+        body=email.body,
+        from_email=email.from_email,
+        to=email.recipients,
+        reply_to=email.reply_to or None,
+    )
+    if email.html_body:
+        message.attach_alternative(email.html_body, "text/html")
+    return message
+
+
+def send_batch(emails: List[OutboxEmail]) -> Dict[str, int]:
+    """Send claimed emails over one SMTP connection and record each outcome."""
+    sent, failed = [], {}
+    try:
+        with get_connection() as connection:
+            for email in emails:
+                try:
+                    if connection.send_messages([build_message(email)]):
+                        sent.append(email.pk)
+                    else:
+                        failed[email] = "Not accepted by the mail server"
+                except Exception as e:
+                    failed[email] = str(e)
+    except Exception as e:
+        # Could not connect: every unsent email in the batch is retried
+        logger.warning(f"Email outbox connection failed: {e}")
+        failed.update({email: str(e) for email in emails if email.pk not in sent})
+
+    now = timezone.now()
+    OutboxEmail.objects.filter(pk__in=sent).update(
+        status="sent", sent_at=now, last_error="", claim_token="", modified=now
+    )
+    for email, error in failed.items():
+        retry = email.attempts < OUTBOX["MAX_ATTEMPTS"]
+        OutboxEmail.objects.filter(pk=email.pk).update(
+            status="pending" if retry else "failed",
+            next_attempt_at=now + retry_delay(email.attempts),
+            last_error=error,
+            claim_token="",
+            modified=now,
+        )
+        logger.warning(f"Email {email.pk} to {email.recipients} failed: {error}")
+    return {"sent": len(sent), "failed": len(failed)}
+
+
+def dispatch_outbox(batch_size: int = None, max_batches: int = None) -> Dict[str, int]:
+    """Send due emails batch by batch until none are left."""
+    totals = {"sent": 0, "failed": 0}
+    batches = 0
+    while max_batches is None or batches < max_batches:
+        emails = claim_batch(batch_size)
+        if not emails:
+            break
+        result = send_batch(emails)
+        totals["sent"] += result["sent"]
+        totals["failed"] += result["failed"]
+        batches += 1
+    return totals
@@ -0,0 +1,324 @@
+"""
+Payment gateway clients for EventMan.
+Gateway calls share one keep-alive session with strict timeouts, jittered
+retries for idempotent requests and a circuit breaker. Clients normalize
+transaction lookups to payment statuses, so reconciliation can run against
+SSLCommerz or a local stand-in.
+"""
+
+import logging
+import random
+import threading
+import time
+from decimal import Decimal, InvalidOperation
+from typing import Dict, Optional
+
+import requests
+from decouple import config
+from django.utils.module_loading import import_string
+from requests.adapters import HTTPAdapter
+from sslcommerz_lib import SSLCOMMERZ
+
+from .constants import GATEWAY_TRANSPORT, PAYMENT_RECONCILIATION
+
+logger = logging.getLogger(__name__)
+
+# SSLCommerz transaction statuses mapped to Payment.status
+GATEWAY_STATUS_MAP = {
+    "VALID": "valid",
+    "VALIDATED": "valid",
+    "FAILED": "failed",
+    "CANCELLED": "failed",
+    "EXPIRED": "failed",
+    "UNATTEMPTED": "failed",
+}
+
+
+# API paths relative to the gateway host
+GATEWAY_PATHS = {
+    "createSessionUrl": "/gwprocess/v4/api.php",
+    "validation_url": "/validator/api/validationserverAPI.php",
+    "transaction_url": "/validator/api/merchantTransIDvalidationAPI.php",
+}
+
+
+def matches_order(record: Dict, amount: Decimal = None, currency: str = None) -> bool:
+    """Whether a gateway transaction record is for exactly this sum."""
+    # currency_type/currency_amount are what the customer was charged in
+    # when the store converts; otherwise currency/amount
+    if (
+        currency is not None
+        and (record.get("currency_type") or record.get("currency")) != currency
+    ):
+        return False
+    if amount is not None:
+        try:
+            paid = Decimal(str(record.get("currency_amount") or record.get("amount")))
+        except InvalidOperation:
+            return False
+        return paid == Decimal(amount)
+    return True
+
+
+class GatewayUnavailable(ConnectionError):
+    """The gateway could not be reached or the circuit breaker is open."""
+
+
+class RefundNotProcessed(Exception):
+    """A refund certainly not made: it was never sent, or the gateway refused it.
+
+    Any other error from a refund request leaves its outcome unknown.
+    """
+
+
+class CircuitBreaker:
+    """Fails fast after repeated gateway failures.
+
+    After ``failure_threshold`` consecutive failures the breaker opens and
+    calls are rejected without touching the network. Once ``reset_after``
+    seconds pass, a single trial call is let through; its outcome closes
+    or re-opens the breaker.
+    """
+
+    def __init__(self, failure_threshold: int = None, reset_after: float = None):
+        self.failure_threshold = (
+            failure_threshold or GATEWAY_TRANSPORT["FAILURE_THRESHOLD"]
+        )
+        self.reset_after = (
+            reset_after if reset_after is not None else GATEWAY_TRANSPORT["RESET_AFTER"]
+        )
+        self.failures = 0
+        self.opened_at = None
+        self.trial_in_flight = False
+        self.lock = threading.Lock()
+
+    @property
+    def is_open(self) -> bool:
+        return self.opened_at is not None
+
+    def allow(self) -> bool:
+        with self.lock:
+            if self.opened_at is None:
+                return True
+            if self.trial_in_flight:
+                return False
+            if time.monotonic() - self.opened_at >= self.reset_after:
+                self.trial_in_flight = True
+                return True
+            return False
+
+    def record_success(self):
+        with self.lock:
+            self.failures = 0
+            self.opened_at = None
+            self.trial_in_flight = False
+
+    def record_failure(self):
+        with self.lock:
+            self.failures += 1
+            if self.trial_in_flight or self.failures >= self.failure_threshold:
+                if self.opened_at is None:
+                    logger.warning("Payment gateway circuit breaker opened")
+                self.opened_at = time.monotonic()
+                self.trial_in_flight = False
+
+
+class GatewayTransport:
+    """Pooled keep-alive HTTP transport for gateway API calls."""
+
+    def __init__(self, breaker: CircuitBreaker = None, max_retries: int = None):
+        self.breaker = breaker or CircuitBreaker()
+        self.max_retries = (
+            max_retries if max_retries is not None else GATEWAY_TRANSPORT["MAX_RETRIES"]
+        )
+        self.timeout = (
+            GATEWAY_TRANSPORT["CONNECT_TIMEOUT"],
+            GATEWAY_TRANSPORT["READ_TIMEOUT"],
+        )
+        self.session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=GATEWAY_TRANSPORT["POOL_SIZE"],
+            pool_maxsize=GATEWAY_TRANSPORT["POOL_SIZE"],
+            max_retries=0,
+        )
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    def backoff(self, attempt: int) -> float:
+        """Full-jitter exponential backoff for the given retry attempt."""
+        ceiling = min(
+            GATEWAY_TRANSPORT["BACKOFF_MAX"],
+            GATEWAY_TRANSPORT["BACKOFF_BASE"] * 2**attempt,
+        )
+        return random.uniform(0, ceiling)
+
+    def request(self, method: str, url: str, payload: Dict, idempotent: bool) -> Dict:
+        """Send a request and return its JSON body, or raise GatewayUnavailable.
+
+        Only idempotent calls are retried; a session creation POST that timed
+        out may have succeeded at the gateway.
+        """
+        attempts = 1 + (self.max_retries if idempotent else 0)
+        for attempt in range(attempts):
+            if not self.breaker.allow():
+                raise GatewayUnavailable("Payment gateway circuit breaker is open")
+            try:
+                if method == "GET":
+                    response = self.session.get(
+                        url, params=payload, timeout=self.timeout
+                    )
+                else:
+                    response = self.session.request(
+                        method, url, data=payload, timeout=self.timeout
+                    )
+                if response.status_code >= 500:
+                    raise GatewayUnavailable(
+                        f"Gateway returned HTTP {response.status_code}"
+                    )
+                body = response.json()
+            except (requests.RequestException, ValueError, GatewayUnavailable) as e:
+                self.breaker.record_failure()
+                logger.warning(
+                    f"Gateway {method} {url} failed (attempt {attempt + 1}): {e}"
+                )
+                if attempt + 1 < attempts:
+                    time.sleep(self.backoff(attempt))
+                    continue
+                raise GatewayUnavailable(str(e)) from e
+
+            self.breaker.record_success()
+            return body
+
+
+class SSLCommerzClient(SSLCOMMERZ):
+    """SSLCOMMERZ with a configurable API host and val_id based validation.
+
+    API calls go through a shared GatewayTransport instead of one-off
+    ``requests`` calls without timeouts.
+    """
+
+    def __init__(self, config: Dict, api_url: str = "", transport=None):
+        super().__init__(config)
+        self.transport = transport or GatewayTransport()
+        if api_url:
+            self.set_api_url(api_url)
+
+    def call_api(self, method, url, payload):
+        return self.transport.request(method, url, payload, idempotent=method == "GET")
+
+    def init_refund(self, bank_tran_id, refund_amount, refund_remarks):
+        # A GET, but not idempotent: never retry it
+        params = {
+            "bank_tran_id": bank_tran_id,
+            "refund_amount": refund_amount,
+            "refund_remarks": refund_remarks,
+            "store_id": self.store_id,
+            "store_passwd": self.store_pass,
+            "format": "json",
+        }
+        return self.transport.request(
+            "GET", self.transaction_url, params, idempotent=False
+        )
+
+    def set_api_url(self, api_url: str):
+        """Point every endpoint at another host, e.g. the local fake gateway."""
+        for attribute, path in GATEWAY_PATHS.items():
+            setattr(self, attribute, api_url.rstrip("/") + path)
+
+    def validationResponse(
+        self, payment_data: Dict, amount: Decimal = None, currency: str = None
+    ) -> bool:
+        """Confirm a callback's val_id with the gateway validation API.
+
+        With ``amount`` and ``currency``, the validated payment must also be
+        for exactly that sum, so a tampered or partial payment is refused.
+        """
+        val_id = payment_data.get("val_id")
+        if not val_id:
+            return False
+
+        response = self.validationTransactionOrder(val_id)
+        if response.get("status") not in ("VALID", "VALIDATED") or response.get(
+            "tran_id"
+        ) != payment_data.get("tran_id"):
+            return False
+        return matches_order(response, amount, currency)
+
+
+class SSLCommerzGatewayClient:
+    """Looks up transactions through the SSLCommerz transaction query API."""
+
+    def __init__(self, sslcz=None):
+        if sslcz is None:
+            from .payment_utils import payment_handler
+
+            sslcz = payment_handler.sslcz
+        self.sslcz = sslcz
+
+    def query_transaction(
+        self, tran_id: str, amount: Decimal = None, currency: str = None
+    ) -> Optional[str]:
+        """Return "valid", "failed" or None when the outcome is not final.
+
+        With ``amount`` and ``currency``, a successful attempt only counts as
+        valid when it paid exactly that sum; one that did not is failed.
+        """
+        response = self.sslcz.transaction_query_tranid(tran_id) or {}
+        if response.get("APIConnect") != "DONE":
+            raise ConnectionError(f"Transaction query failed for {tran_id}")
+
+        statuses = set()
+        for element in response.get("element") or []:
+            status = GATEWAY_STATUS_MAP.get(str(element.get("status", "")).upper())
+            if status == "valid" and not matches_order(element, amount, currency):
+                logger.warning(f"Transaction {tran_id} paid the wrong amount")
+                status = "failed"
+            statuses.add(status)
+        # A single successful attempt settles the payment
+        if "valid" in statuses:
+            return "valid"
+        if statuses == {"failed"}:
+            return "failed"
+        return None
+
+    def refund_transaction(self, tran_id: str, amount, remarks: str) -> str:
+        """Request a refund of a settled transaction; returns the refund ref id."""
+        try:
+            response = self.sslcz.transaction_query_tranid(tran_id) or {}
+        except ConnectionError as e:
+            raise RefundNotProcessed(f"Transaction query failed for {tran_id}") from e
+        bank_tran_ids = [
+            element.get("bank_tran_id")
+            for element in response.get("element") or []
+            if GATEWAY_STATUS_MAP.get(str(element.get("status", "")).upper()) == "valid"
+        ]
+        if not bank_tran_ids:
+            raise RefundNotProcessed(f"No settled transaction to refund for {tran_id}")
+
+        # Errors from here on may come after the gateway acted on the request
+        result = self.sslcz.init_refund(bank_tran_ids[0], str(amount), remarks) or {}
+        if result.get("APIConnect") == "DONE" and result.get("status") != "success":
+            raise RefundNotProcessed(
+                f"Refund refused for {tran_id}: {result.get('errorReason', result)}"
+            )
+        if result.get("status") != "success":
+            raise ConnectionError(f"Refund request failed for {tran_id}: {result}")
+        return result.get("refund_ref_id", "")
+
+    def find_refund(self, tran_id: str) -> Optional[str]:
+        """Ref id of a refund already made for ``tran_id``, or None if there is none."""
+        response = self.sslcz.transaction_query_tranid(tran_id) or {}
+        if response.get("APIConnect") != "DONE":
+            raise ConnectionError(f"Transaction query failed for {tran_id}")
+        for element in response.get("element") or []:
+            if element.get("refund_ref_id"):
+                return element["refund_ref_id"]
+        return None
+
+
+def get_gateway_client(path: Optional[str] = None):
+    """Instantiate the configured gateway client class."""
+    path = path or config(
+        "PAYMENT_GATEWAY_CLIENT", default=PAYMENT_RECONCILIATION["CLIENT"]
+    )
+    return import_string(path)()
@@ -0,0 +1,107 @@
+"""
+Payment notification inbox for EventMan.
+Gateway callbacks are stored and acknowledged immediately, and a background
+job validates them so request latency does not depend on gateway latency.
+"""
+
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from typing import Dict, Optional
+
+from django.db import connection as db_connection
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .constants import PAYMENT_INBOX
+from .jobs import enqueue_job
+from .models import PaymentNotification
+from .payment_utils import payment_handler
+
+logger = logging.getLogger(__name__)
+
+
+def enqueue_notification(source: str, payload: Dict) -> PaymentNotification:
+    """Store a gateway callback and queue its validation job."""
+    notification = PaymentNotification.objects.create(
+        source=source,
+        transaction_id=payload.get("tran_id", ""),
+        payload=dict(payload.items()),
+    )
+    dispatch_notification(notification.pk)
+    return notification
+
+
+def dispatch_notification(notification_id: int):
+    """Queue a job validating the notification, in the caller's transaction."""
+    enqueue_job("payments.process_notification", {"notification_id": notification_id})
+
+
+def claim_notification(notification_id: int) -> Optional[PaymentNotification]:
+    """Atomically claim a pending (or stale processing) notification."""
+    stale_before = timezone.now() - timedelta(seconds=PAYMENT_INBOX["STALE_AFTER"])
+    claimed = (
+        PaymentNotification.objects.filter(pk=notification_id)
+        .filter(Q(status="pending") | Q(status="processing", modified__lt=stale_before))
+        .update(
+            status="processing", attempts=F("attempts") + 1, modified=timezone.now()
+        )
+    )
+    if not claimed:
+        return None
+    return PaymentNotification.objects.get(pk=notification_id)
+
+
+def process_notification(notification_id: int) -> bool:
+    """Validate one claimed notification; returns True when it is settled."""
+    notification = claim_notification(notification_id)
+    if notification is None:
+        return False
+
+    result = payment_handler.validate_payment(notification.payload)
+
+    if result["success"]:
+        notification.status = "processed"
+        notification.last_error = ""
+    elif (
+        result.get("retryable")
+        and notification.attempts < PAYMENT_INBOX["MAX_ATTEMPTS"]
+    ):
+        notification.status = "pending"
+        notification.last_error = result.get("error", "")
+    else:
+        notification.status = "failed"
+        notification.last_error = result.get("error", "")
+
+    if notification.status != "pending":
+        notification.processed_at = timezone.now()
+    notification.save(
+        update_fields=["status", "last_error", "processed_at", "modified"]
+    )
+    return notification.status != "pending"
+
+
+def process_pending_notifications(limit: int = 100, workers: int = None) -> int:
+    """Validate pending and stale notifications concurrently."""
+    stale_before = timezone.now() - timedelta(seconds=PAYMENT_INBOX["STALE_AFTER"])
+    notification_ids = list(
+        PaymentNotification.objects.filter(
+            Q(status="pending") | Q(status="processing", modified__lt=stale_before)
+        )
+        .order_by("created")
+        .values_list("pk", flat=True)[:limit]
+    )
+    if not notification_ids:
+        return 0
+
+    workers = workers or PAYMENT_INBOX["WORKERS"]
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        results = list(pool.map(_process_and_close, notification_ids))
+    return sum(results)
+
+
+def _process_and_close(notification_id: int) -> bool:
+    try:
+        return process_notification(notification_id)
+    finally:
+        db_connection.close()
@@ -3,18 +3,27 @@ Secure payment utilities for EventMan.
 Centralized payment logic with proper security measures.
 """
 
+import json
 import logging
-from typing import Dict
+import uuid
+from datetime import timedelta
+from typing import Dict, Optional, Tuple
 
 from decouple import config
 from django.contrib.auth import get_user_model
+from django.db import IntegrityError, transaction
 from django.http import HttpRequest
-from django.shortcuts import get_object_or_404
 from django.urls import reverse
 from django.utils import timezone
-from sslcommerz_lib import SSLCOMMERZ
 
-from .models import Event, Payment
+from .attendance import set_rsvp_status
+from .constants import CHECKOUT, RSVPStatus
+from .coupons import redeem_coupon
+from .domain_events import PaymentValidated, publish
+from .inventory import (TicketsUnavailable, commit_tickets,
+                        release_payment_holds, reserve_tickets)
+from .models import Event, Payment, PaymentItem, Refund
+from .payment_gateway import SSLCommerzClient
 
 User = get_user_model()
 logger = logging.getLogger(__name__)
@@ -27,32 +36,60 @@ class PaymentHandler:
         self.store_id = config("SSLCOMMERZ_STORE_ID")
         self.store_pass = config("SSLCOMMERZ_STORE_PASS")
         self.is_sandbox = config("SSLCOMMERZ_IS_SANDBOX", default=True, cast=bool)
+        # Overrides the gateway host, e.g. to run against run_fake_gateway
+        self.api_url = config("SSLCOMMERZ_API_URL", default="")
 
-        self.sslcz = SSLCOMMERZ(
+        self.sslcz = SSLCommerzClient(
             {
                 "store_id": self.store_id,
                 "store_pass": self.store_pass,
                 "issandbox": self.is_sandbox,
-            }
+            },
+            api_url=self.api_url,
         )
 
     def create_payment_session(
-        self, request: HttpRequest, event: Event, user: User
+        self,
+        request: HttpRequest,
+        event: Event,
+        user: User,
+        idempotency_key: Optional[str] = None,
+        coupon_code: Optional[str] = None,
+        quantity: int = 1,
     ) -> Dict:
-        """Create a secure payment session."""
-        # Create payment record
-        payment = Payment.objects.create(
-            user=user,
-            event=event,
-            amount=event.ticket_price,
-            status="pending",
-            transaction_id=f"txn_{event.id}_{user.id}_{int(timezone.now().timestamp())}",
-        )
+        """Create a secure payment session for an order of ``quantity`` tickets.
+
+        Submits that repeat an idempotency key reuse the pending session the
+        first submit started, without another gateway call, as long as they
+        are for the same order. A coupon code is redeemed against the new
+        payment before the gateway sees its amount.
+        """
+        try:
+            if idempotency_key:
+                payment, created = self._claim_idempotency_key(
+                    event, user, quantity, idempotency_key, coupon_code
+                )
+                if not created:
+                    return self._reuse_payment_session(payment, quantity, coupon_code)
+            else:
+                payment = self._create_payment(
+                    event, user, quantity, coupon_code=coupon_code
+                )
+        except TicketsUnavailable as e:
+            return {"success": False, "error": str(e)}
+
+        if coupon_code:
+            redeemed = redeem_coupon(coupon_code, user, event, payment)
+            if not redeemed["success"]:
+                self._fail_unsent_payment(payment)
+                return redeemed
+            if payment.amount <= 0:
+                return self._complete_free_payment(payment)
 
         # Build payment data
         post_body = {
-            "total_amount": str(event.ticket_price),
-            "currency": "BDT",
+            "total_amount": str(payment.amount),
+            "currency": CHECKOUT["CURRENCY"],
             "tran_id": payment.transaction_id,
             "success_url": request.build_absolute_uri(reverse("payment_success")),
             "fail_url": request.build_absolute_uri(reverse("payment_fail")),
@@ -70,8 +107,14 @@ class PaymentHandler:
             "cus_country": "Bangladesh",
             "shipping_method": "NO",
             "multi_card_name": "",
-            "num_of_item": 1,
+            "num_of_item": payment.quantity,
             "product_name": event.name,
+            "cart": json.dumps(
+                [
+                    {"product": item.description, "amount": str(item.total())}
+                    for item in payment.items.all()
+                ]
+            ),
             "product_category": event.category.name if event.category else "Event",
             "product_profile": "general",
         }
@@ -82,76 +125,287 @@ class PaymentHandler:
                 logger.info(
                     f"Payment session created for user {user.id}, event {event.id}"
                 )
+                payment.gateway_url = response.get("GatewayPageURL")
+                payment.save(update_fields=["gateway_url", "modified"])
                 return {
                     "success": True,
-                    "gateway_url": response.get("GatewayPageURL"),
+                    "gateway_url": payment.gateway_url,
                     "payment": payment,
                 }
             else:
                 logger.error(
                     f"Payment session failed for user {user.id}, event {event.id}: {response}"
                 )
-                payment.status = "failed"
-                payment.save()
+                self._fail_unsent_payment(payment)
                 return {"success": False, "error": "Failed to create payment session"}
         except Exception as e:
             logger.error(
                 f"Payment session exception for user {user.id}, event {event.id}: {e}"
             )
-            payment.status = "failed"
-            payment.save()
+            self._fail_unsent_payment(payment)
             return {"success": False, "error": str(e)}
 
+    def _fail_unsent_payment(self, payment: Payment):
+        payment.status = "failed"
+        payment.save()
+        release_payment_holds([payment.pk])
+
+    def _complete_free_payment(self, payment: Payment) -> Dict:
+        """Settle a payment a coupon fully covered, without the gateway."""
+        if self._mark_payment_valid(payment):
+            logger.info(f"Free checkout completed: {payment.transaction_id}")
+        payment.status = "valid"
+        return {
+            "success": True,
+            "gateway_url": f"{reverse('payment_success')}?tran_id={payment.transaction_id}",
+            "payment": payment,
+        }
+
+    def _create_payment(
+        self,
+        event: Event,
+        user: User,
+        quantity: int,
+        idempotency_key: Optional[str] = None,
+        coupon_code: Optional[str] = None,
+    ) -> Payment:
+        """Reserve the order's tickets and record it with its line item."""
+        with transaction.atomic():
+            reserve_tickets(event, quantity)
+            # Random transaction ids cannot collide the way timestamps did
+            payment = Payment.objects.create(
+                user=user,
+                event=event,
+                amount=event.ticket_price * quantity,
+                quantity=quantity,
+                status="pending",
+                transaction_id=f"txn_{event.id}_{uuid.uuid4().hex}",
+                idempotency_key=idempotency_key,
+                coupon_code=coupon_code or "",
+            )
+            PaymentItem.objects.create(
+                payment=payment,
+                description=event.name,
+                unit_price=event.ticket_price,
+                quantity=quantity,
+            )
+        return payment
+
+    def _claim_idempotency_key(
+        self,
+        event: Event,
+        user: User,
+        quantity: int,
+        idempotency_key: str,
+        coupon_code: Optional[str] = None,
+    ) -> Tuple[Payment, bool]:
+        """Create the key's payment, or return the live one already holding it."""
+        for _ in range(2):
+            try:
+                with transaction.atomic():
+                    payment = self._create_payment(
+                        event, user, quantity, idempotency_key, coupon_code
+                    )
+                    return payment, True
+            except IntegrityError:
+                existing = Payment.objects.filter(
+                    user=user, event=event, idempotency_key=idempotency_key
+                ).first()
+                if existing is None:
+                    continue
+                if self._is_reusable(existing):
+                    return existing, False
+                # Expired or failed: release the key for a fresh session
+                Payment.objects.filter(
+                    pk=existing.pk, idempotency_key=idempotency_key
+                ).update(idempotency_key=None)
+
+        return (
+            self._create_payment(event, user, quantity, coupon_code=coupon_code),
+            True,
+        )
+
+    def _is_reusable(self, payment: Payment) -> bool:
+        age = timezone.now() - payment.created
+        if payment.status != "pending":
+            return False
+        if not payment.gateway_url:
+            # Still being created by a concurrent submit, unless it crashed
+            return age < timedelta(seconds=CHECKOUT["IN_FLIGHT_TIMEOUT"])
+        return age < timedelta(seconds=CHECKOUT["SESSION_TTL"])
+
+    def _reuse_payment_session(
+        self, payment: Payment, quantity: int, coupon_code: Optional[str]
+    ) -> Dict:
+        """Return the session an earlier submit of the same order started."""
+        if (payment.quantity, payment.coupon_code) != (quantity, coupon_code or ""):
+            return {
+                "success": False,
+                "error": "This checkout was already submitted for a different order",
+                "conflict": True,
+            }
+        return self._session_result(payment)
+
+    def checkout_status(self, event: Event, user: User, idempotency_key: str) -> Dict:
+        """Where a submitted checkout stands, for a page polling an in-flight one."""
+        payment = Payment.objects.filter(
+            event=event, user=user, idempotency_key=idempotency_key
+        ).first()
+        if payment is not None and payment.status == "valid":
+            # Settled without the gateway, e.g. fully covered by a coupon
+            return {
+                "success": True,
+                "gateway_url": f"{reverse('payment_success')}?tran_id={payment.transaction_id}",
+                "payment": payment,
+            }
+        if payment is None or not self._is_reusable(payment):
+            return {"success": False, "error": "Payment session is not available"}
+        return self._session_result(payment)
+
+    def _session_result(self, payment: Payment) -> Dict:
+        # A submit still creating the session is reported, never waited for,
+        # so the client polls instead of holding a worker
+        if not payment.gateway_url:
+            return {"success": False, "in_flight": True, "payment": payment}
+        logger.info(f"Reusing payment session {payment.transaction_id}")
+        return {
+            "success": True,
+            "gateway_url": payment.gateway_url,
+            "payment": payment,
+            "reused": True,
+        }
+
     def validate_payment(self, payment_data: Dict) -> Dict:
-        """Validate payment response from SSLCommerz."""
+        """Validate payment response from SSLCommerz.
+
+        Safe to call repeatedly for the same transaction: already valid
+        payments skip the gateway, and the pending -> valid transition is a
+        conditional UPDATE so tickets are granted exactly once. Refunded
+        payments are never revived, and a genuine payment arriving after its
+        order failed or expired must win its tickets back against capacity.
+        """
         tran_id = payment_data.get("tran_id")
         if not tran_id:
             return {"success": False, "error": "Missing transaction ID"}
 
         try:
-            payment = get_object_or_404(Payment, transaction_id=tran_id)
+            payment = Payment.objects.select_related("event", "user").get(
+                transaction_id=tran_id
+            )
 
-            # Validate with SSLCommerz
-            if self.sslcz.validationResponse(payment_data):
-                # Update payment status
-                payment.status = "valid"
-                payment.save()
+            # Fast path: already processed by the redirect or the IPN
+            if payment.status == "valid":
+                logger.info(f"Payment already validated: {tran_id}")
+                return self._validated_result(payment)
+            if payment.status == "refunded":
+                logger.warning(f"Callback for refunded payment ignored: {tran_id}")
+                return {"success": False, "error": "Payment has been refunded"}
 
-                # Update event and add participant
-                event = payment.event
-                event.tickets_sold += 1
-                event.participants.add(payment.user)
-                event.save()
+            # Validate with SSLCommerz
+            if not self.sslcz.validationResponse(
+                payment_data, payment.amount, CHECKOUT["CURRENCY"]
+            ):
+                logger.warning(f"Payment validation failed: {tran_id}")
+                if Payment.objects.filter(pk=payment.pk, status="pending").update(
+                    status="failed", modified=timezone.now()
+                ):
+                    release_payment_holds([payment.pk])
+                return {"success": False, "error": "Payment validation failed"}
 
+            if self._mark_payment_valid(payment):
                 logger.info(f"Payment validated successfully: {tran_id}")
-                return {
-                    "success": True,
-                    "payment": payment,
-                    "event": event,
-                    "user": payment.user,
-                }
+            elif self._accept_late_payment(payment):
+                logger.info(f"Late payment validated: {tran_id}")
             else:
-                logger.warning(f"Payment validation failed: {tran_id}")
-                payment.status = "failed"
-                payment.save()
-                return {"success": False, "error": "Payment validation failed"}
+                payment.refresh_from_db(fields=["status"])
+                if payment.status != "valid":
+                    return {
+                        "success": False,
+                        "error": "Tickets are no longer available; "
+                        "the payment will be refunded",
+                    }
+                logger.info(f"Payment validated concurrently: {tran_id}")
+
+            payment.status = "valid"
+            payment.event.refresh_from_db(fields=["tickets_sold"])
+            return self._validated_result(payment)
 
         except Payment.DoesNotExist:
             logger.error(f"Payment not found: {tran_id}")
             return {"success": False, "error": "Payment record not found"}
         except Exception as e:
             logger.error(f"Payment validation exception for {tran_id}: {e}")
-            return {"success": False, "error": str(e)}
+            return {"success": False, "error": str(e), "retryable": True}
+
+    def _mark_payment_valid(self, payment: Payment) -> bool:
+        """Atomically move a payment to valid and grant its tickets once."""
+        with transaction.atomic():
+            payment.paid_at = timezone.now()
+            claimed = Payment.objects.filter(pk=payment.pk, status="pending").update(
+                status="valid", paid_at=payment.paid_at, modified=timezone.now()
+            )
+            if not claimed:
+                return False
+            self._grant_tickets(payment)
+        return True
+
+    def _accept_late_payment(self, payment: Payment) -> bool:
+        """Validate a payment whose order failed or expired before it arrived.
+
+        Its tickets were released with the order, so they are reserved again
+        against capacity; when the event has sold out meanwhile the payment
+        stays failed and a refund is queued for it instead.
+        """
+        try:
+            with transaction.atomic():
+                payment.paid_at = timezone.now()
+                # A payment already queued for refund is never revived
+                claimed = Payment.objects.filter(
+                    pk=payment.pk, status="failed", refund__isnull=True
+                ).update(
+                    status="valid", paid_at=payment.paid_at, modified=timezone.now()
+                )
+                if not claimed:
+                    return False
+                reserve_tickets(payment.event, payment.quantity)
+                self._grant_tickets(payment)
+        except TicketsUnavailable:
+            Refund.objects.get_or_create(
+                payment=payment, defaults={"amount": payment.amount}
+            )
+            logger.warning(
+                f"Late payment {payment.transaction_id} has no tickets left; "
+                "queued for refund"
+            )
+            return False
+        return True
+
+    def _grant_tickets(self, payment: Payment):
+        commit_tickets({payment.event_id: payment.quantity})
+        set_rsvp_status(payment.event, payment.user, RSVPStatus.ATTENDING)
+        publish(PaymentValidated(payment.event_id, (payment.pk,), payment.quantity))
+
+    def _validated_result(self, payment: Payment) -> Dict:
+        return {
+            "success": True,
+            "payment": payment,
+            "event": payment.event,
+            "user": payment.user,
+        }
 
     def handle_failed_payment(self, payment_data: Dict) -> Dict:
         """Handle failed payment."""
         tran_id = payment_data.get("tran_id")
         if tran_id:
             try:
-                payment = get_object_or_404(Payment, transaction_id=tran_id)
-                payment.status = "failed"
-                payment.save()
-                logger.info(f"Payment marked as failed: {tran_id}")
+                payment = Payment.objects.get(transaction_id=tran_id)
+                # Never downgrade a payment that has already been validated
+                if Payment.objects.filter(pk=payment.pk, status="pending").update(
+                    status="failed", modified=timezone.now()
+                ):
+                    payment.status = "failed"
+                    release_payment_holds([payment.pk])
+                    logger.info(f"Payment marked as failed: {tran_id}")
                 return {"success": True, "payment": payment}
             except Payment.DoesNotExist:
                 logger.error(f"Payment not found for failure: {tran_id}")
@@ -0,0 +1,140 @@
+"""
+Rate limiting for EventMan.
+Expensive endpoints take a token from a per-client bucket (RATE_LIMITS) held
+in Redis and updated by one Lua script, so every instance shares the limit.
+When Redis is unavailable each process falls back to its own buckets.
+Rejected requests get a 429 with Retry-After, and HTMX requests also get an
+HX-Trigger message instead of a page.
+"""
+
+import json
+import math
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+from typing import Optional, Tuple
+
+from django.http import HttpResponse
+from django.template.loader import render_to_string
+
+from .constants import RATE_LIMITED_URLS, RATE_LIMITING, RATE_LIMITS
+from .redis_utils import redis_client
+
+
+class LocalTokenBuckets:
+    """In-process token buckets, least recently used evicted first."""
+
+    def __init__(self, max_keys: int = None):
+        self.max_keys = max_keys or RATE_LIMITING["LOCAL_MAX_KEYS"]
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+
+    def take(self, key, capacity, rate, cost=1) -> Tuple[bool, float]:
+        now = time.monotonic()
+        with self._lock:
+            tokens, ts = self._buckets.pop(key, (capacity, now))
+            tokens = min(capacity, tokens + (now - ts) * rate)
+            allowed = tokens >= cost
+            if allowed:
+                tokens -= cost
+            self._buckets[key] = (tokens, now)
+            while len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        return allowed, 0.0 if allowed else (cost - tokens) / rate
+
+    def clear(self):
+        with self._lock:
+            self._buckets.clear()
+
+
+local_buckets = LocalTokenBuckets()
+
+
+def reset_rate_limits():
+    """Refill every bucket, shared and in-process."""
+    redis_client.clear_rate_limits(RATE_LIMITING["KEY_PREFIX"])
+    local_buckets.clear()
+
+
+def client_ip(request) -> str:
+    forwarded = request.META.get("HTTP_X_FORWARDED_FOR", "")
+    hops = [hop.strip() for hop in forwarded.split(",") if hop.strip()]
+    trusted = RATE_LIMITING["TRUSTED_PROXY_HOPS"]
+    if RATE_LIMITING["TRUST_FORWARDED_FOR"] and trusted and len(hops) >= trusted:
+        # The hop our outermost proxy added; those left of it are client input
+        return hops[-trusted]
+    return request.META.get("REMOTE_ADDR", "")
+
+
+def client_key(request, scope: str) -> str:
+    user = getattr(request, "user", None)
+    if scope != "ip" and user is not None and user.is_authenticated:
+        return f"user:{user.pk}"
+    return f"ip:{client_ip(request)}"
+
+
+def check_rate_limit(request, name: str) -> Optional[float]:
+    """Take a token for ``name``; returns seconds to wait if over the limit."""
+    limit = RATE_LIMITS[name]
+    if not RATE_LIMITING["ENABLED"] or request.method not in limit["methods"]:
+        return None
+    if limit.get("param") and not request.GET.get(limit["param"]):
+        return None
+
+    key = f"{RATE_LIMITING['KEY_PREFIX']}:{name}:{client_key(request, limit['key'])}"
+    rate = limit["rate"] / limit["per"]
+    result = redis_client.take_token(key, limit["burst"], rate)
+    if result is None:
+        result = local_buckets.take(key, limit["burst"], rate)
+    allowed, retry_after = result
+    return None if allowed else retry_after
+
+
+def rate_limited_response(request, retry_after: float) -> HttpResponse:
+    message = "Too many requests. Please wait a moment and try again."
+    if getattr(request, "htmx", False):
+        response = HttpResponse(status=429)
+        response["HX-Trigger"] = json.dumps({"showMessage": message})
+    else:
+        response = HttpResponse(
+            render_to_string("429.html", {"message": message}, request=request),
+            status=429,
+        )
+    response["Retry-After"] = str(max(1, math.ceil(retry_after)))
+    return response
+
+
+def rate_limit(name: str):
+    """Decorator limiting a view by the RATE_LIMITS entry ``name``."""
+
+    def decorator(view_func):
+        @wraps(view_func)
+        def wrapped(request, *args, **kwargs):
+            retry_after = check_rate_limit(request, name)
+            if retry_after is not None:
+                return rate_limited_response(request, retry_after)
+            return view_func(request, *args, **kwargs)
+
+        return wrapped
+
+    return decorator
+
+
+class RateLimitMiddleware:
+    """Applies RATE_LIMITED_URLS to views that are not decorated."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        return self.get_response(request)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        name = RATE_LIMITED_URLS.get(request.resolver_match.url_name)
+        if name is None:
+            return None
+        retry_after = check_rate_limit(request, name)
+        if retry_after is not None:
+            return rate_limited_response(request, retry_after)
+        return None
@@ -0,0 +1,159 @@
+"""
+Payment reconciliation for EventMan.
+Pending payments whose callbacks were lost are looked up at the gateway
+concurrently and settled with batched updates. Payments the gateway still
+has no outcome for are failed once they outlive PAYMENT_RECONCILIATION
+["EXPIRE_AFTER"], so abandoned checkouts give their tickets back.
+"""
+
+import logging
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from decimal import Decimal
+from typing import Dict, Iterable, Optional
+
+from django.db import transaction
+from django.utils import timezone
+
+from .attendance import set_rsvp_status
+from .constants import CHECKOUT, PAYMENT_RECONCILIATION, RSVPStatus
+from .domain_events import PaymentValidated, publish
+from .inventory import commit_tickets, release_payment_holds
+from .models import Payment
+from .payment_gateway import get_gateway_client
+
+logger = logging.getLogger(__name__)
+
+
+# Lookup errors say nothing about the payment, unlike an unsettled outcome
+LOOKUP_FAILED = object()
+
+
+def _lookup(client, tran_id: str, amount: Decimal):
+    try:
+        return client.query_transaction(tran_id, amount, CHECKOUT["CURRENCY"])
+    except Exception as e:
+        logger.warning(f"Transaction lookup failed for {tran_id}: {e}")
+        return LOOKUP_FAILED
+
+
+def query_gateway(
+    client, amounts: Dict[str, Decimal], workers: int
+) -> Dict[str, Optional[str]]:
+    """Look up transactions concurrently, keyed by the amount each must pay.
+
+    Unsettled transactions map to None; failed lookups are omitted.
+    """
+    tran_ids = list(amounts)
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        outcomes = pool.map(
+            lambda tran_id: _lookup(client, tran_id, amounts[tran_id]), tran_ids
+        )
+        return {
+            tran_id: outcome
+            for tran_id, outcome in zip(tran_ids, outcomes)
+            if outcome is not LOOKUP_FAILED
+        }
+
+
+def mark_payments_failed(payment_ids: Iterable[int]) -> int:
+    """Fail pending payments in one UPDATE, releasing what they held."""
+    with transaction.atomic():
+        failed = list(
+            Payment.objects.select_for_update()
+            .filter(pk__in=list(payment_ids), status="pending")
+            .values_list("pk", flat=True)
+        )
+        Payment.objects.filter(pk__in=failed).update(
+            status="failed", modified=timezone.now()
+        )
+        release_payment_holds(failed)
+    return len(failed)
+
+
+def mark_payments_valid(payment_ids: Iterable[int]) -> int:
+    """Validate pending payments and grant their tickets in one transaction."""
+    with transaction.atomic():
+        payments = list(
+            Payment.objects.select_for_update()
+            .filter(pk__in=list(payment_ids), status="pending")
+            .select_related("event", "user")
+        )
+        if not payments:
+            return 0
+
+        paid_at = timezone.now()
+        Payment.objects.filter(pk__in=[payment.pk for payment in payments]).update(
+            status="valid", paid_at=paid_at, modified=paid_at
+        )
+        tickets = Counter()
+        by_event = defaultdict(list)
+        for payment in payments:
+            tickets[payment.event_id] += payment.quantity
+            by_event[payment.event_id].append(payment.pk)
+        commit_tickets(tickets)
+        for payment in payments:
+            set_rsvp_status(payment.event, payment.user, RSVPStatus.ATTENDING)
+        for event_id, payment_ids in by_event.items():
+            publish(PaymentValidated(event_id, tuple(payment_ids), tickets[event_id]))
+    return len(payments)
+
+
+def reconcile_payments(
+    older_than: int = None,
+    chunk_size: int = None,
+    workers: int = None,
+    client=None,
+    expire_after: int = None,
+) -> Dict[str, int]:
+    """Settle payments left pending longer than ``older_than`` seconds.
+
+    Those pending longer than ``expire_after`` seconds without a successful
+    attempt at the gateway are failed as abandoned.
+    """
+    older_than = older_than or PAYMENT_RECONCILIATION["STALE_AFTER"]
+    chunk_size = chunk_size or PAYMENT_RECONCILIATION["CHUNK_SIZE"]
+    workers = workers or PAYMENT_RECONCILIATION["WORKERS"]
+    expire_after = expire_after or PAYMENT_RECONCILIATION["EXPIRE_AFTER"]
+    client = client or get_gateway_client()
+
+    now = timezone.now()
+    cutoff = now - timedelta(seconds=older_than)
+    expire_before = now - timedelta(seconds=expire_after)
+    totals = {"checked": 0, "valid": 0, "failed": 0, "expired": 0}
+    last_pk = 0
+
+    # Keyset pagination; settled rows drop out of the pending filter anyway
+    while True:
+        chunk = list(
+            Payment.objects.filter(status="pending", created__lt=cutoff, pk__gt=last_pk)
+            .order_by("pk")
+            .values_list("pk", "transaction_id", "amount", "created")[:chunk_size]
+        )
+        if not chunk:
+            break
+        last_pk = chunk[-1][0]
+
+        outcomes = query_gateway(
+            client, {tran_id: amount for _, tran_id, amount, _ in chunk}, workers
+        )
+        valid_ids, failed_ids, expired_ids = [], [], []
+        for pk, tran_id, _, created in chunk:
+            if tran_id not in outcomes:
+                continue
+            if outcomes[tran_id] == "valid":
+                valid_ids.append(pk)
+            elif outcomes[tran_id] == "failed":
+                failed_ids.append(pk)
+            elif created < expire_before:
+                # No attempts, or none finished, long after the session ended
+                expired_ids.append(pk)
+
+        totals["checked"] += len(chunk)
+        totals["valid"] += mark_payments_valid(valid_ids) if valid_ids else 0
+        totals["failed"] += mark_payments_failed(failed_ids) if failed_ids else 0
+        totals["expired"] += mark_payments_failed(expired_ids) if expired_ids else 0
+
+    logger.info(f"Payment reconciliation finished: {totals}")
+    return totals
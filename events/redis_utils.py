@@ -4,20 +4,128 @@ Redis utilities for EventMan - Real-time features and caching
 
 import json
 import logging
+import time
 
 from django_redis import get_redis_connection
 from redis.exceptions import ConnectionError, RedisError
 
-from .constants import CACHE_TIMEOUTS
+from .constants import CACHE_TIMEOUTS, COUPONS, TRENDING
 
 logger = logging.getLogger(__name__)
 
+EVENT_VIEWS_PENDING_KEY = "event_views:pending"
+TRENDING_KEY = "trending:events"
+TRENDING_EPOCH_KEY = "trending:epoch"
+
+# Scores are stored as weight * 2^((now - epoch) / half_life) so older
+# activity decays relative to newer activity without rewriting the set.
+# The set is rescaled and the epoch moved forward before values grow large.
+TRENDING_INCREMENT_SCRIPT = """
+local now = tonumber(ARGV[1])
+local half_life = tonumber(ARGV[2])
+local max_tracked = tonumber(ARGV[3])
+local epoch = tonumber(redis.call('GET', KEYS[2]))
+if not epoch then
+    epoch = now
+    redis.call('SET', KEYS[2], epoch)
+end
+local exponent = (now - epoch) / half_life
+if exponent > 32 then
+    local weight = tostring(math.pow(2, -exponent))
+    redis.call('ZUNIONSTORE', KEYS[1], 1, KEYS[1], 'WEIGHTS', weight)
+    redis.call('SET', KEYS[2], now)
+    exponent = 0
+end
+local multiplier = math.pow(2, exponent)
+for i = 4, #ARGV, 2 do
+    redis.call('ZINCRBY', KEYS[1], tonumber(ARGV[i + 1]) * multiplier, ARGV[i])
+end
+redis.call('ZREMRANGEBYRANK', KEYS[1], 0, -(max_tracked + 1))
+return 1
+"""
+
+
+# Reserves one coupon redemption against the total and per-user counters.
+# Returns 1 when reserved, 0 when the coupon is used up, -1 when the user
+# hit their limit and -2 when the counters have not been seeded yet.
+COUPON_RESERVE_SCRIPT = """
+if redis.call('EXISTS', KEYS[1]) == 0 or redis.call('EXISTS', KEYS[2]) == 0 then
+    return -2
+end
+local max_total = tonumber(ARGV[1])
+local total = redis.call('INCR', KEYS[1])
+if max_total >= 0 and total > max_total then
+    redis.call('DECR', KEYS[1])
+    return 0
+end
+if redis.call('INCR', KEYS[2]) > tonumber(ARGV[2]) then
+    redis.call('DECR', KEYS[2])
+    redis.call('DECR', KEYS[1])
+    return -1
+end
+return 1
+"""
+
+
+# Takes a lock, or extends it when this holder already has it
+LOCK_HOLD_SCRIPT = """
+if redis.call('SET', KEYS[1], ARGV[1], 'NX', 'PX', ARGV[2]) then
+    return 1
+end
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    redis.call('PEXPIRE', KEYS[1], ARGV[2])
+    return 1
+end
+return 0
+"""
+
+LOCK_RELEASE_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+
+# Takes ``cost`` tokens from a bucket refilled at ARGV[2] tokens per second.
+# Returns {allowed, seconds until enough tokens}; floats travel as strings.
+TOKEN_BUCKET_SCRIPT = """
+local capacity = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local now = tonumber(ARGV[3])
+local cost = tonumber(ARGV[4])
+local bucket = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(bucket[1]) or capacity
+local ts = tonumber(bucket[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - ts) * rate)
+local allowed = 0
+local wait = 0
+if tokens >= cost then
+    tokens = tokens - cost
+    allowed = 1
+else
+    wait = (cost - tokens) / rate
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', tostring(now))
+redis.call('PEXPIRE', KEYS[1], math.ceil(capacity / rate * 1000) + 1000)
+return {allowed, tostring(wait)}
+"""
+
+
+def coupon_counter_keys(coupon_id, user_id):
+    return f"coupon:{coupon_id}:redeemed", f"coupon:{coupon_id}:user:{user_id}"
+
 
 class EventManRedis:
     """Redis utilities for real-time features"""
 
     def __init__(self):
         self.redis = get_redis_connection("default")
+        self._trending_increment = self.redis.register_script(TRENDING_INCREMENT_SCRIPT)
+        self._coupon_reserve = self.redis.register_script(COUPON_RESERVE_SCRIPT)
+        self._lock_hold = self.redis.register_script(LOCK_HOLD_SCRIPT)
+        self._token_bucket = self.redis.register_script(TOKEN_BUCKET_SCRIPT)
+        self._lock_release = self.redis.register_script(LOCK_RELEASE_SCRIPT)
 
     def is_available(self):
         """Check if Redis is available"""
@@ -69,29 +177,185 @@ class EventManRedis:
             logger.error(f"Failed to get cached search: {e}")
             return None
 
-    def increment_event_views(self, event_id):
-        """Track event view counts"""
+    def invalidate_event_caches(self, event_id):
+        """Drop every cached value that can include an event, in one round trip"""
+        try:
+            if self.redis:
+                pipe = self.redis.pipeline(transaction=False)
+                pipe.delete("dashboard_stats")
+                pipe.zrem(TRENDING_KEY, event_id)
+                # Search results are keyed by query, so any of them may hold it
+                for key in self.redis.scan_iter(match="search:*", count=500):
+                    pipe.unlink(key)
+                pipe.execute()
+            return True
+        except (ConnectionError, RedisError) as e:
+            logger.error(f"Failed to invalidate caches for event {event_id}: {e}")
+            return False
+
+    def reserve_coupon(self, coupon_id, user_id, max_total, per_user):
+        """Reserve a redemption in one round trip; None if Redis is unavailable"""
+        try:
+            if self.redis:
+                return int(
+                    self._coupon_reserve(
+                        keys=coupon_counter_keys(coupon_id, user_id),
+                        args=[-1 if max_total is None else max_total, per_user],
+                    )
+                )
+        except (ConnectionError, RedisError) as e:
+            logger.error(f"Failed to reserve coupon {coupon_id}: {e}")
+        return None
+
+    def seed_coupon_counters(self, coupon_id, user_id, total, user_count):
+        """Initialise missing coupon counters from database counts"""
+        try:
+            if self.redis:
+                total_key, user_key = coupon_counter_keys(coupon_id, user_id)
+                ttl = COUPONS["COUNTER_TTL"]
+                pipe = self.redis.pipeline(transaction=False)
+                pipe.set(total_key, total, nx=True, ex=ttl)
+                pipe.set(user_key, user_count, nx=True, ex=ttl)
+                pipe.execute()
+                return True
+        except (ConnectionError, RedisError) as e:
+            logger.error(f"Failed to seed coupon {coupon_id} counters: {e}")
+        return False
+
+    def release_coupon(self, coupon_id, user_id):
+        """Give back a reserved redemption"""
+        try:
+            if self.redis:
+                pipe = self.redis.pipeline(transaction=False)
+                for key in coupon_counter_keys(coupon_id, user_id):
+                    pipe.decr(key)
+                pipe.execute()
+                return True
+        except (ConnectionError, RedisError) as e:
+            logger.error(f"Failed to release coupon {coupon_id}: {e}")
+        return False
+
+    def take_token(self, key, capacity, rate, cost=1):
+        """Take from a token bucket in one round trip.
+
+        Returns (allowed, retry_after_seconds), or None if Redis is unavailable.
+        """
+        try:
+            if self.redis:
+                allowed, wait = self._token_bucket(
+                    keys=[key], args=[capacity, rate, time.time(), cost]
+                )
+                return bool(int(allowed)), float(wait)
+        except (ConnectionError, RedisError, ValueError) as e:
+            logger.error(f"Failed to take rate limit token {key}: {e}")
+        return None
+
+    def clear_rate_limits(self, prefix):
+        """Delete every token bucket under ``prefix``"""
+        try:
+            if self.redis:
+                pipe = self.redis.pipeline(transaction=False)
+                for key in self.redis.scan_iter(match=f"{prefix}:*", count=500):
+                    pipe.unlink(key)
+                pipe.execute()
+            return True
+        except (ConnectionError, RedisError) as e:
+            logger.error(f"Failed to clear rate limits: {e}")
+            return False
+
+    def hold_lock(self, key, token, ttl):
+        """Take or extend a lock for ``ttl`` seconds; None if Redis is unavailable"""
+        try:
+            if self.redis:
+                return bool(self._lock_hold(keys=[key], args=[token, int(ttl * 1000)]))
+        except (ConnectionError, RedisError) as e:
+            logger.error(f"Failed to hold lock {key}: {e}")
+        return None
+
+    def release_lock(self, key, token):
+        """Release a lock, only if ``token`` still holds it"""
         try:
-            key = f"event_views:{event_id}"
             if self.redis:
-                # Set expiry for view tracking
-                result = self.redis.incr(key)
-                self.redis.expire(key, CACHE_TIMEOUTS["EVENT_VIEWS"])
-                return result
+                return bool(self._lock_release(keys=[key], args=[token]))
+        except (ConnectionError, RedisError) as e:
+            logger.error(f"Failed to release lock {key}: {e}")
+        return False
+
+    def flush_event_views(self, view_counts):
+        """Add buffered view counts to the pending hash in one pipeline"""
+        try:
+            if self.redis and view_counts:
+                pipe = self.redis.pipeline(transaction=False)
+                for event_id, count in view_counts.items():
+                    pipe.hincrby(EVENT_VIEWS_PENDING_KEY, event_id, count)
+                view_weight = TRENDING["WEIGHTS"]["view"]
+                self._add_trending_scores(
+                    {pk: count * view_weight for pk, count in view_counts.items()},
+                    client=pipe,
+                )
+                pipe.execute()
+                return True
         except (ConnectionError, RedisError) as e:
-            logger.error(f"Failed to increment views: {e}")
-            return 0
+            logger.error(f"Failed to flush views: {e}")
+        return False
+
+    def pop_pending_event_views(self):
+        """Atomically read and clear the pending view counts"""
+        try:
+            if self.redis:
+                pipe = self.redis.pipeline(transaction=True)
+                pipe.hgetall(EVENT_VIEWS_PENDING_KEY)
+                pipe.delete(EVENT_VIEWS_PENDING_KEY)
+                pending, _ = pipe.execute()
+                return {int(k): int(v) for k, v in pending.items()}
+        except (ConnectionError, RedisError, ValueError) as e:
+            logger.error(f"Failed to read pending views: {e}")
+        return {}
 
     def get_event_views(self, event_id):
-        """Get event view count"""
+        """Get view count not yet persisted to the database"""
         try:
-            key = f"event_views:{event_id}"
             if self.redis:
-                views = self.redis.get(key)
+                views = self.redis.hget(EVENT_VIEWS_PENDING_KEY, event_id)
                 return int(views) if views else 0
         except (ConnectionError, RedisError, ValueError) as e:
             logger.error(f"Failed to get views: {e}")
-            return 0
+        return 0
+
+    def _add_trending_scores(self, scores, client=None):
+        """Run the decayed ZINCRBY script for {event_id: weight}"""
+        args = [int(time.time()), TRENDING["HALF_LIFE"], TRENDING["MAX_TRACKED"]]
+        for event_id, weight in scores.items():
+            args.extend([event_id, weight])
+        self._trending_increment(
+            keys=[TRENDING_KEY, TRENDING_EPOCH_KEY], args=args, client=client
+        )
+
+    def add_trending_scores(self, scores):
+        """Add activity weights to the trending leaderboard"""
+        try:
+            if self.redis and scores:
+                self._add_trending_scores(scores)
+                return True
+        except (ConnectionError, RedisError) as e:
+            logger.error(f"Failed to update trending scores: {e}")
+        return False
+
+    def get_trending(self, limit):
+        """Get the top (event_id, score) pairs, or None if Redis is unavailable"""
+        try:
+            if self.redis:
+                pipe = self.redis.pipeline(transaction=False)
+                pipe.get(TRENDING_EPOCH_KEY)
+                pipe.zrevrange(TRENDING_KEY, 0, limit - 1, withscores=True)
+                epoch, ranked = pipe.execute()
+                if not epoch:
+                    return []
+                decay = 2 ** -((time.time() - float(epoch)) / TRENDING["HALF_LIFE"])
+                return [(int(member), score * decay) for member, score in ranked]
+        except (ConnectionError, RedisError, ValueError) as e:
+            logger.error(f"Failed to get trending events: {e}")
+        return None
 
 
 # Global Redis instance
@@ -0,0 +1,144 @@
+"""
+Event reminder digests for EventMan.
+Each window finds events coming within range of their start with one range
+scan on (date, time), and queues one digest per attendee covering all of
+their events. A per-window watermark makes runs restartable: events before
+sent_until were already reminded, and an interrupted run resumes after the
+last attendee it queued.
+"""
+
+import logging
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Dict, List
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.mail import EmailMultiAlternatives
+from django.db import transaction
+from django.db.models import Q
+from django.template.loader import render_to_string
+from django.utils import timezone
+from django.utils.html import strip_tags
+from django.utils.safestring import mark_safe
+
+from .constants import DEFAULT_NOREPLY_EMAIL, REMINDERS
+from .models import RSVP, Event, ReminderSchedule
+from .outbox import enqueue_messages
+
+User = get_user_model()
+logger = logging.getLogger(__name__)
+
+
+def events_starting_between(start: datetime, end: datetime):
+    """Published events starting after ``start`` and no later than ``end``."""
+    start, end = timezone.localtime(start), timezone.localtime(end)
+    return Event.objects.filter(
+        Q(date__gt=start.date()) | Q(date=start.date(), time__gt=start.time()),
+        Q(date__lt=end.date()) | Q(date=end.date(), time__lte=end.time()),
+        # Bounds on the leading column keep this a range scan of the index
+        date__gte=start.date(),
+        date__lte=end.date(),
+        status="published",
+    ).order_by("date", "time")
+
+
+def build_digest(user, event_html: List[str], events: List[Event]):
+    html_message = render_to_string(
+        "emails/event_reminder_digest.html", {"user": user, "events": event_html}
+    )
+    if len(events) == 1:
+        subject = f"Reminder: {events[0].name} starts soon"
+    else:
+        subject = f"Reminder: {len(events)} of your events start soon"
+    message = EmailMultiAlternatives(
+        subject=subject,
+        body=strip_tags(html_message),
+        from_email=getattr(settings, "DEFAULT_FROM_EMAIL", DEFAULT_NOREPLY_EMAIL),
+        to=[user.email],
+    )
+    message.attach_alternative(html_message, "text/html")
+    return message
+
+
+def _start_run(window: str, lead: int, now: datetime) -> ReminderSchedule:
+    """Load the window's schedule, opening a new run unless one is unfinished."""
+    schedule, _ = ReminderSchedule.objects.get_or_create(window=window)
+    if schedule.run_until is None:
+        # A new window starts from now rather than reminding about the past
+        schedule.sent_until = schedule.sent_until or now
+        schedule.run_until = max(now + timedelta(seconds=lead), schedule.sent_until)
+        schedule.last_user_id = 0
+        schedule.save(
+            update_fields=["sent_until", "run_until", "last_user_id", "modified"]
+        )
+    return schedule
+
+
+def send_reminders(window: str, now: datetime = None, batch_size: int = None) -> int:
+    """Queue reminder digests for one window; returns the number queued."""
+    lead = REMINDERS["WINDOWS"][window]
+    batch_size = batch_size or REMINDERS["BATCH_SIZE"]
+    schedule = _start_run(window, lead, now or timezone.now())
+
+    events = {
+        event.pk: event
+        for event in events_starting_between(schedule.sent_until, schedule.run_until)
+    }
+    # Each event is rendered once and shared by every digest that lists it
+    event_html = {
+        pk: mark_safe(render_to_string("emails/_reminder_event.html", {"event": event}))
+        for pk, event in events.items()
+    }
+    attendees = RSVP.objects.attending().filter(event_id__in=list(events))
+
+    queued = 0
+    watermark = schedule.last_user_id
+    while events:
+        user_ids = list(
+            attendees.filter(user_id__gt=watermark)
+            .order_by("user_id")
+            .values_list("user_id", flat=True)
+            .distinct()[:batch_size]
+        )
+        if not user_ids:
+            break
+        user_events: Dict[int, List[int]] = defaultdict(list)
+        for user_id, event_id in attendees.filter(user_id__in=user_ids).values_list(
+            "user_id", "event_id"
+        ):
+            user_events[user_id].append(event_id)
+
+        with transaction.atomic():
+            # Claims this batch; a concurrent run of the window moves on
+            if not ReminderSchedule.objects.filter(
+                pk=schedule.pk, last_user_id=watermark
+            ).update(last_user_id=user_ids[-1], modified=timezone.now()):
+                logger.warning(f"Reminder run for {window} taken over, stopping")
+                return queued
+            digests = []
+            for user in User.objects.filter(pk__in=user_ids).exclude(email=""):
+                digest_events = sorted(
+                    (events[pk] for pk in user_events[user.pk]),
+                    key=lambda event: (event.date, event.time),
+                )
+                digests.append(
+                    build_digest(
+                        user,
+                        [event_html[event.pk] for event in digest_events],
+                        digest_events,
+                    )
+                )
+            queued += enqueue_messages(digests)
+        watermark = user_ids[-1]
+
+    ReminderSchedule.objects.filter(pk=schedule.pk, last_user_id=watermark).update(
+        sent_until=schedule.run_until,
+        run_until=None,
+        last_user_id=0,
+        modified=timezone.now(),
+    )
+    logger.info(
+        f"Queued {queued} {window} reminder digest(s) for {len(events)} event(s)"
+    )
+    return queued
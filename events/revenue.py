@@ -0,0 +1,134 @@
+"""
+Revenue ledger for EventMan.
+Valid payments are rolled up into one RevenueLedger row per event and day,
+so dashboards chart revenue without scanning the payments table.
+"""
+
+from collections import defaultdict
+from datetime import date, timedelta
+from decimal import Decimal
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from django.db import transaction
+from django.db.models import DateTimeField, F, Min, Sum
+from django.db.models.functions import Coalesce, TruncDate
+from django.utils import timezone
+
+from .constants import REVENUE_LEDGER
+from .models import Payment, RevenueLedger
+
+LedgerKey = Tuple[int, Optional[int], date]
+
+
+def add_to_ledger(totals: Dict[LedgerKey, Tuple[Decimal, int]]):
+    """Add (revenue, tickets) to ledger rows keyed by (event, organizer, day)."""
+    if not totals:
+        return
+    with transaction.atomic():
+        # Create missing rows first so the increments below are plain UPDATEs
+        RevenueLedger.objects.bulk_create(
+            [
+                RevenueLedger(event_id=event_id, organizer_id=organizer_id, day=day)
+                for event_id, organizer_id, day in totals
+            ],
+            ignore_conflicts=True,
+        )
+        for (event_id, _, day), (revenue, tickets) in totals.items():
+            RevenueLedger.objects.filter(event_id=event_id, day=day).update(
+                revenue=F("revenue") + revenue,
+                tickets=F("tickets") + tickets,
+                modified=timezone.now(),
+            )
+
+
+def record_payments(payments: Iterable[Payment]):
+    """Roll newly validated payments into the ledger."""
+    totals = defaultdict(lambda: (Decimal("0"), 0))
+    for payment in payments:
+        paid_at = payment.paid_at or timezone.now()
+        key = (
+            payment.event_id,
+            payment.event.organizer_id,
+            timezone.localdate(paid_at),
+        )
+        revenue, tickets = totals[key]
+        totals[key] = (revenue + payment.amount, tickets + payment.quantity)
+    add_to_ledger(dict(totals))
+
+
+def rebuild_ledger(
+    start: Optional[date] = None, end: Optional[date] = None, chunk_days: int = None
+) -> int:
+    """Recompute ledger rows from valid payments, one chunk of days at a time."""
+    chunk_days = chunk_days or REVENUE_LEDGER["REBUILD_CHUNK_DAYS"]
+    valid = Payment.objects.filter(status="valid").annotate(
+        day=TruncDate(Coalesce("paid_at", "modified", output_field=DateTimeField()))
+    )
+    if start is None:
+        start = valid.aggregate(first=Min("day"))["first"]
+        if start is None:
+            return 0
+    end = end or timezone.localdate()
+
+    written = 0
+    chunk_start = start
+    while chunk_start <= end:
+        chunk_end = min(chunk_start + timedelta(days=chunk_days - 1), end)
+        rows = (
+            valid.filter(day__range=(chunk_start, chunk_end))
+            .values("event_id", "event__organizer_id", "day")
+            .annotate(revenue=Sum("amount"), tickets=Sum("quantity"))
+            .order_by()
+        )
+        with transaction.atomic():
+            RevenueLedger.objects.filter(day__range=(chunk_start, chunk_end)).delete()
+            created = RevenueLedger.objects.bulk_create(
+                [
+                    RevenueLedger(
+                        event_id=row["event_id"],
+                        organizer_id=row["event__organizer_id"],
+                        day=row["day"],
+                        revenue=row["revenue"],
+                        tickets=row["tickets"],
+                    )
+                    for row in rows
+                ],
+                batch_size=REVENUE_LEDGER["BATCH_SIZE"],
+            )
+        written += len(created)
+        chunk_start = chunk_end + timedelta(days=1)
+    return written
+
+
+def revenue_series(
+    start: date,
+    end: date,
+    organizer_id: Optional[int] = None,
+    event_id: Optional[int] = None,
+) -> List[Dict]:
+    """Daily revenue and tickets between two dates, with zero-filled gaps."""
+    ledger = RevenueLedger.objects.filter(day__range=(start, end))
+    if organizer_id is not None:
+        ledger = ledger.filter(organizer_id=organizer_id)
+    if event_id is not None:
+        ledger = ledger.filter(event_id=event_id)
+
+    totals = {
+        row["day"]: row
+        for row in ledger.values("day")
+        .annotate(revenue=Sum("revenue"), tickets=Sum("tickets"))
+        .order_by()
+    }
+    series = []
+    day = start
+    while day <= end:
+        row = totals.get(day, {})
+        series.append(
+            {
+                "day": day,
+                "revenue": row.get("revenue") or Decimal("0"),
+                "tickets": row.get("tickets") or 0,
+            }
+        )
+        day += timedelta(days=1)
+    return series
@@ -0,0 +1,136 @@
+"""
+Periodic task scheduler for EventMan.
+run_workers starts a scheduler thread in every instance, and only the leader
+(holder of a Postgres advisory lock, or of a Redis lock elsewhere) enqueues
+the PERIODIC_TASKS that are due as jobs. Each run claims its slot with a
+conditional UPDATE of next_run_at, so a task is enqueued once per interval
+even if two schedulers briefly both think they lead.
+"""
+
+import logging
+import random
+import threading
+import uuid
+from datetime import datetime, timedelta
+from typing import List, Optional
+
+from django.db import connection as db_connection
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .constants import PERIODIC_TASKS, SCHEDULER
+from .jobs import enqueue_job
+from .models import PeriodicTask
+from .redis_utils import redis_client
+
+logger = logging.getLogger(__name__)
+
+
+class LeaderLock:
+    """Scheduler leadership held across ticks and renewed on each one."""
+
+    def __init__(self):
+        self.token = uuid.uuid4().hex
+        self.held = False
+
+    def acquire(self) -> bool:
+        """Take or keep leadership; True while this scheduler leads."""
+        if db_connection.vendor == "postgresql":
+            self.held = self._hold_advisory_lock()
+            return self.held
+        held = redis_client.hold_lock(
+            SCHEDULER["LOCK_KEY"], self.token, SCHEDULER["LOCK_TTL"]
+        )
+        # Without Redis (a single local instance) this scheduler leads; the
+        # slot claims still keep every run exactly-once
+        self.held = True if held is None else held
+        return self.held
+
+    def _hold_advisory_lock(self) -> bool:
+        lock_id = SCHEDULER["ADVISORY_LOCK_ID"]
+        with db_connection.cursor() as cursor:
+            if self.held:
+                # A dropped connection silently loses the session lock
+                cursor.execute(
+                    "SELECT EXISTS (SELECT 1 FROM pg_locks WHERE locktype = 'advisory'"
+                    " AND objid = %s AND pid = pg_backend_pid() AND granted)",
+                    [lock_id],
+                )
+                if cursor.fetchone()[0]:
+                    return True
+            cursor.execute("SELECT pg_try_advisory_lock(%s)", [lock_id])
+            return cursor.fetchone()[0]
+
+    def release(self):
+        if not self.held:
+            return
+        if db_connection.vendor == "postgresql":
+            with db_connection.cursor() as cursor:
+                cursor.execute(
+                    "SELECT pg_advisory_unlock(%s)", [SCHEDULER["ADVISORY_LOCK_ID"]]
+                )
+        else:
+            redis_client.release_lock(SCHEDULER["LOCK_KEY"], self.token)
+        self.held = False
+
+
+def _jitter(spec) -> timedelta:
+    return timedelta(seconds=random.uniform(0, spec.get("jitter", 0)))
+
+
+def _sync_tasks(now: datetime):
+    """Create bookkeeping rows for newly declared tasks."""
+    PeriodicTask.objects.bulk_create(
+        [
+            PeriodicTask(name=name, next_run_at=now + _jitter(spec))
+            for name, spec in PERIODIC_TASKS.items()
+        ],
+        ignore_conflicts=True,
+    )
+
+
+def schedule_due_tasks(now: Optional[datetime] = None) -> List[str]:
+    """Enqueue every periodic task whose interval has come round."""
+    now = now or timezone.now()
+    _sync_tasks(now)
+    enqueued = []
+    due = PeriodicTask.objects.filter(
+        name__in=list(PERIODIC_TASKS), next_run_at__lte=now
+    ).select_related("last_job")
+    for task in due:
+        spec = PERIODIC_TASKS[task.name]
+        next_run_at = now + timedelta(seconds=spec["every"]) + _jitter(spec)
+        with transaction.atomic():
+            if not PeriodicTask.objects.filter(
+                pk=task.pk, next_run_at=task.next_run_at
+            ).update(next_run_at=next_run_at, modified=now):
+                continue  # another scheduler took this slot
+            if task.last_job and task.last_job.status in ("queued", "running"):
+                logger.warning(f"Periodic task {task.name} still running, skipped")
+                PeriodicTask.objects.filter(pk=task.pk).update(skips=F("skips") + 1)
+                continue
+            job = enqueue_job(spec["job"], spec.get("payload"))
+            PeriodicTask.objects.filter(pk=task.pk).update(
+                last_job=job, last_run_at=now, runs=F("runs") + 1
+            )
+        enqueued.append(task.name)
+    return enqueued
+
+
+def run_scheduler(stop: threading.Event):
+    """Scheduler loop: enqueue due tasks every TICK while this one leads."""
+    lock = LeaderLock()
+    try:
+        while not stop.is_set():
+            try:
+                if lock.acquire():
+                    schedule_due_tasks()
+            except Exception as e:
+                logger.error(f"Scheduler pass failed: {e}")
+            stop.wait(SCHEDULER["TICK"])
+    finally:
+        try:
+            lock.release()
+        finally:
+            db_connection.close()
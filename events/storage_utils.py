@@ -4,11 +4,17 @@ Handles Cloudinary integration with WhiteNoise fallback.
 """
 
 import logging
-from typing import Dict
+import sys
+from functools import lru_cache
+from typing import Dict, Tuple
 
 import cloudinary
+import cloudinary.utils
 from decouple import config
 from django.conf import settings
+from django.core.files.storage import default_storage
+
+from .constants import CLOUDINARY_IMAGES
 
 logger = logging.getLogger(__name__)
 
@@ -75,10 +81,19 @@ class StorageConfig:
         force_whitenoise = config("FORCE_WHITENOISE", default=False, cast=bool)
 
         # Media storage strategy
+        dedup_media = config("MEDIA_DEDUP_ENABLED", default=True, cast=bool)
         if is_cloudinary_available and not force_whitenoise:
-            media_backend = "cloudinary_storage.storage.MediaCloudinaryStorage"
+            media_backend = (
+                "events.cloudinary_media.DedupMediaCloudinaryStorage"
+                if dedup_media
+                else "cloudinary_storage.storage.MediaCloudinaryStorage"
+            )
         else:
-            media_backend = "django.core.files.storage.FileSystemStorage"
+            media_backend = (
+                "events.media_storage.DedupFileSystemStorage"
+                if dedup_media
+                else "django.core.files.storage.FileSystemStorage"
+            )
 
         # Static files storage strategy
         if is_production and is_cloudinary_available and not force_whitenoise:
@@ -134,6 +149,9 @@ class StorageConfig:
         # Add HTMX middleware
         middleware.append("django_htmx.middleware.HtmxMiddleware")
 
+        # Rate limits for expensive views; runs after auth and HTMX detection
+        middleware.append("events.ratelimit.RateLimitMiddleware")
+
         return middleware
 
 
@@ -156,3 +174,26 @@ def configure_cloudinary() -> bool:
         logger.error(f"Failed to configure Cloudinary: {e}")
 
     return False
+
+
+def is_cloudinary_storage(storage=None) -> bool:
+    """Whether media (or ``storage``) is stored on Cloudinary."""
+    storage = storage or default_storage
+    # Never imported here: cloudinary_storage reads settings, which import
+    # this module, and fails without credentials. A Cloudinary storage in
+    # use has always imported it already.
+    module = sys.modules.get("cloudinary_storage.storage")
+    return module is not None and isinstance(storage, module.MediaCloudinaryStorage)
+
+
+@lru_cache(maxsize=CLOUDINARY_IMAGES["URL_CACHE_SIZE"])
+def _build_transformation_url(public_id: str, params: Tuple) -> str:
+    url, _ = cloudinary.utils.cloudinary_url(public_id, secure=True, **dict(params))
+    return url
+
+
+def transformation_url(public_id: str, **options) -> str:
+    """Cloudinary delivery URL of ``public_id`` with the default transformation."""
+    params = {**CLOUDINARY_IMAGES["TRANSFORMATION"], **options}
+    params = {key: value for key, value in params.items() if value is not None}
+    return _build_transformation_url(public_id, tuple(sorted(params.items())))
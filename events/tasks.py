@@ -0,0 +1,87 @@
+"""
+Background jobs run by the run_workers command (see events/jobs.py).
+Each job is a thin wrapper that raises when its work should be retried.
+"""
+
+from datetime import timedelta
+
+from django.utils import timezone
+
+from .broadcasts import run_broadcast, send_due_broadcasts
+from .cancellation import run_cancellation
+from .constants import REVENUE_LEDGER
+from .images import generate_derivatives
+from .jobs import job
+from .models import Broadcast, EventCancellation, PaymentNotification
+from .outbox import dispatch_outbox
+from .payment_inbox import process_notification
+from .reconciliation import reconcile_payments
+from .reminders import send_reminders
+from .revenue import rebuild_ledger
+from .view_tracking import persist_pending_views, view_counter
+
+
+@job("payments.process_notification", queue="payments", priority=10)
+def process_payment_notification(notification_id: int):
+    process_notification(notification_id)
+    if PaymentNotification.objects.filter(
+        pk=notification_id, status="pending"
+    ).exists():
+        # A retryable gateway error: try again after the job's back-off
+        raise RuntimeError(f"Payment notification {notification_id} still pending")
+
+
+@job("payments.reconcile", queue="payments")
+def reconcile_stale_payments():
+    reconcile_payments()
+
+
+@job("outbox.dispatch", queue="email")
+def dispatch_email_outbox():
+    dispatch_outbox()
+
+
+@job("broadcasts.run", queue="email")
+def run_organizer_broadcast(broadcast_id: int):
+    try:
+        run_broadcast(broadcast_id)
+    except Exception:
+        # Release the claim so the retry resumes from the watermark at once
+        Broadcast.objects.filter(pk=broadcast_id, status="sending").update(
+            status="pending", modified=timezone.now()
+        )
+        raise
+
+
+@job("broadcasts.send_due", queue="email")
+def send_due_change_notices():
+    send_due_broadcasts()
+
+
+@job("cancellations.run")
+def run_event_cancellation(cancellation_id: int):
+    run_cancellation(cancellation_id)
+    if EventCancellation.objects.filter(pk=cancellation_id, status="failed").exists():
+        raise RuntimeError(f"Cancellation {cancellation_id} failed")
+
+
+@job("reminders.send", queue="email")
+def send_reminder_window(window: str):
+    send_reminders(window)
+
+
+@job("views.flush")
+def flush_event_views():
+    view_counter.flush()
+    persist_pending_views()
+
+
+@job("revenue.rebuild_recent")
+def rebuild_recent_revenue():
+    today = timezone.localdate()
+    rebuild_ledger(today - timedelta(days=REVENUE_LEDGER["REBUILD_RECENT_DAYS"]), today)
+
+
+@job("images.derivatives", queue="images")
+def generate_image_derivatives(event_id: int):
+    generate_derivatives(event_id)
@@ -0,0 +1,51 @@
+"""
+Template tags for responsive event images.
+"""
+
+from django import template
+from django.core.files.storage import default_storage
+
+from ..constants import IMAGE_DERIVATIVES
+from ..images import current_derivatives
+from ..storage_utils import is_cloudinary_storage, transformation_url
+
+register = template.Library()
+
+MIME_TYPES = {"avif": "image/avif", "webp": "image/webp"}
+
+
+def derivative_srcset(event, fmt):
+    """srcset of an event's stored derivatives in ``fmt``, narrowest first."""
+    names = current_derivatives(event).get(fmt, {})
+    return ", ".join(
+        f"{default_storage.url(names[width])} {width}w"
+        for width in sorted(names, key=int)
+    )
+
+
+def cloudinary_srcset(event):
+    """srcset of Cloudinary transformations; the format is chosen per browser."""
+    return ", ".join(
+        f"{transformation_url(event.image.name, width=width)} {width}w"
+        for width in IMAGE_DERIVATIVES["WIDTHS"]
+    )
+
+
+@register.inclusion_tag("events/_responsive_image.html")
+def responsive_image(event, sizes="card", css_class="", loading="lazy"):
+    """<picture> with AVIF/WebP derivatives, falling back to the original."""
+    sources = []
+    if event.image and is_cloudinary_storage():
+        sources.append({"type": "", "srcset": cloudinary_srcset(event)})
+    else:
+        for fmt in IMAGE_DERIVATIVES["FORMATS"]:
+            srcset = derivative_srcset(event, fmt)
+            if srcset:
+                sources.append({"type": MIME_TYPES[fmt], "srcset": srcset})
+    return {
+        "event": event,
+        "sources": sources,
+        "sizes": IMAGE_DERIVATIVES["SIZES"].get(sizes, sizes),
+        "css_class": css_class,
+        "loading": loading,
+    }
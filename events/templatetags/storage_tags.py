@@ -4,8 +4,12 @@ Template tags for storage-related functionality.
 
 from django import template
 from django.conf import settings
+from django.core.files.storage import default_storage
 
-from ..storage_utils import storage_config
+from ..constants import CLOUDINARY_IMAGES
+from ..images import current_derivatives
+from ..storage_utils import (is_cloudinary_storage, storage_config,
+                             transformation_url)
 
 register = template.Library()
 
@@ -31,3 +35,31 @@ def storage_status():
         "debug": settings.DEBUG,
         "storage_backends": storage_config.get_storage_backends(),
     }
+
+
+def nearest_derivative(image, width):
+    """Smallest local derivative at least ``width`` wide, or the widest one."""
+    instance = getattr(image, "instance", None)
+    if width is None or not hasattr(instance, "image_derivatives"):
+        return None
+    names = current_derivatives(instance).get(CLOUDINARY_IMAGES["LOCAL_FORMAT"], {})
+    widths = sorted(map(int, names))
+    if not widths:
+        return None
+    chosen = next((w for w in widths if w >= int(width)), widths[-1])
+    return names[str(chosen)]
+
+
+@register.simple_tag
+def optimized_image_url(image, width=None):
+    """URL of an event image or profile picture, resized to ``width``.
+
+    On Cloudinary this is a memoized f_auto,q_auto transformation URL; on
+    local storage the nearest derivative from events/images.py, if any.
+    """
+    if not image:
+        return ""
+    if is_cloudinary_storage(image.storage):
+        return transformation_url(image.name, width=width)
+    derivative = nearest_derivative(image, width)
+    return default_storage.url(derivative) if derivative else image.url
@@ -1,6 +1,9 @@
 import pytest
 from django.contrib.staticfiles.storage import staticfiles_storage
 
+from events.constants import OUTBOX
+from events.ratelimit import reset_rate_limits
+
 
 @pytest.fixture(autouse=True, scope="session")
 def mock_static_files_globally(session_mocker):
@@ -18,3 +21,16 @@ def mock_cloudinary_uploader_upload_globally(session_mocker):
             "public_id": "mock_public_id",
         },
     )
+
+
+@pytest.fixture(autouse=True)
+def disable_outbox_dispatch_thread(mocker):
+    # Tests dispatch the outbox explicitly rather than from a background thread
+    mocker.patch.dict(OUTBOX, {"DISPATCH_ON_COMMIT": False})
+
+
+@pytest.fixture(autouse=True)
+def refill_rate_limits():
+    # Buckets in Redis or in-process would leak across tests, where reused
+    # user pks and client addresses share them
+    reset_rate_limits()
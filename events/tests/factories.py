@@ -1,12 +1,22 @@
+from io import BytesIO
+
 import factory
 from django.contrib.auth import get_user_model
 from django.core.files.base import ContentFile
+from PIL import Image
 
 from events.models import Category, Event, Payment, Profile
 
 User = get_user_model()
 
 
+def image_file(width=800, height=400, name="poster.png"):
+    """A decodable PNG upload, for code that really opens the image."""
+    buffer = BytesIO()
+    Image.new("RGB", (width, height), "teal").save(buffer, "PNG")
+    return ContentFile(buffer.getvalue(), name=name)
+
+
 class UserFactory(factory.django.DjangoModelFactory):
     class Meta:
         model = User
@@ -0,0 +1,167 @@
+import json
+
+import pytest
+from django.core import mail
+from django.urls import reverse
+
+from events.attendance import attend_event, register_attendees
+from events.models import RSVP
+from events.notifications import queue_rsvp_confirmations
+from events.outbox import dispatch_outbox
+from events.tests.factories import EventFactory, UserFactory
+
+
+@pytest.fixture
+def queue_mock(mocker):
+    mocker.patch("events.handlers.record_trending_activity")
+    return mocker.patch("events.handlers.queue_rsvp_confirmations")
+
+
+@pytest.mark.django_db
+def test_register_attendees_bulk_inserts_and_queues_one_job(
+    queue_mock, django_assert_max_num_queries
+):
+    event = EventFactory(status="published", ticket_price=0)
+    users = UserFactory.create_batch(50)
+
+    with django_assert_max_num_queries(10):
+        result = register_attendees(event, users)
+
+    assert result["success"]
+    assert len(result["registered"]) == 50
+    assert RSVP.objects.attending().filter(event=event).count() == 50
+    assert event.participants.count() == 50
+    queue_mock.assert_called_once()
+
+
+@pytest.mark.django_db
+def test_register_attendees_reactivates_and_skips_existing(queue_mock):
+    event = EventFactory(status="published", ticket_price=0)
+    attending, maybe, new = UserFactory.create_batch(3)
+    RSVP.objects.create(event=event, user=attending, status="attending")
+    RSVP.objects.create(event=event, user=maybe, status="maybe")
+
+    result = register_attendees(event, [attending, maybe, new])
+
+    assert result["registered"] == sorted([maybe.pk, new.pk])
+    assert result["already_registered"] == [attending.pk]
+    assert RSVP.objects.get(event=event, user=maybe).status == "attending"
+
+
+@pytest.mark.django_db
+def test_register_attendees_rejects_group_over_capacity(queue_mock):
+    event = EventFactory(status="published", ticket_price=0, capacity=3)
+    RSVP.objects.create(event=event, user=UserFactory())
+
+    result = register_attendees(event, UserFactory.create_batch(3))
+
+    assert not result["success"]
+    assert "2 seat(s) left" in result["error"]
+    assert RSVP.objects.filter(event=event).count() == 1
+    queue_mock.assert_not_called()
+
+
+@pytest.mark.django_db
+def test_attend_event_takes_only_free_seats(queue_mock):
+    event = EventFactory(status="published", ticket_price=0, capacity=1)
+    first, second = UserFactory.create_batch(2)
+
+    assert attend_event(event, first)
+    assert not attend_event(event, second)
+    # Confirming an existing seat does not need a free one
+    assert attend_event(event, first)
+    assert list(event.attendees()) == [first]
+
+
+@pytest.mark.django_db
+def test_queue_rsvp_confirmations_sends_batch_through_outbox():
+    event = EventFactory(status="published", ticket_price=0)
+    users = UserFactory.create_batch(3)
+
+    assert queue_rsvp_confirmations(event, [u.pk for u in users]) == 3
+    assert len(mail.outbox) == 0
+    assert dispatch_outbox() == {"sent": 3, "failed": 0}
+    assert len(mail.outbox) == 3
+    assert mail.outbox[0].subject == f"RSVP Confirmation for: {event.name}"
+
+
+@pytest.mark.django_db
+def test_bulk_registration_endpoint(client, queue_mock):
+    organizer = UserFactory()
+    event = EventFactory(status="published", ticket_price=0, organizer=organizer)
+    users = UserFactory.create_batch(3)
+    client.force_login(organizer)
+
+    response = client.post(
+        reverse("event_register_bulk", kwargs={"pk": event.pk}),
+        data=json.dumps(
+            {
+                "emails": [users[0].email, "nobody@example.com"],
+                "usernames": [users[1].username, users[2].username],
+            }
+        ),
+        content_type="application/json",
+    )
+
+    assert response.status_code == 201
+    assert response.json() == {
+        "registered": 3,
+        "already_registered": 0,
+        "unknown": ["nobody@example.com"],
+    }
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("status", ["draft", "cancelled"])
+def test_bulk_registration_requires_published_event(client, queue_mock, status):
+    organizer = UserFactory()
+    event = EventFactory(status=status, ticket_price=0, organizer=organizer)
+    client.force_login(organizer)
+
+    response = client.post(
+        reverse("event_register_bulk", kwargs={"pk": event.pk}),
+        data=json.dumps({"usernames": [UserFactory().username]}),
+        content_type="application/json",
+    )
+
+    assert response.status_code == 409
+    assert not RSVP.objects.filter(event=event).exists()
+
+
+@pytest.mark.django_db
+def test_bulk_registration_requires_event_organizer(client, queue_mock):
+    event = EventFactory(status="published", ticket_price=0)
+    client.force_login(UserFactory())
+
+    response = client.post(
+        reverse("event_register_bulk", kwargs={"pk": event.pk}),
+        data=json.dumps({"emails": ["someone@example.com"]}),
+        content_type="application/json",
+    )
+
+    assert response.status_code == 403
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize(
+    "payload",
+    [
+        ["someone@example.com"],
+        {"emails": [["someone@example.com"]]},
+        {"emails": "someone@example.com"},
+        {"usernames": [{"name": "someone"}]},
+    ],
+)
+def test_bulk_registration_rejects_malformed_payloads(client, queue_mock, payload):
+    organizer = UserFactory()
+    event = EventFactory(status="published", ticket_price=0, organizer=organizer)
+    client.force_login(organizer)
+
+    response = client.post(
+        reverse("event_register_bulk", kwargs={"pk": event.pk}),
+        data=json.dumps(payload),
+        content_type="application/json",
+    )
+
+    assert response.status_code == 400
+    assert "error" in response.json()
@@ -0,0 +1,162 @@
+from datetime import date, time, timedelta
+
+import pytest
+from django.contrib.auth.models import Group
+from django.urls import reverse
+from django.utils import timezone
+
+from events import broadcasts
+from events.broadcasts import (record_event_changes, run_broadcast,
+                               send_due_broadcasts, start_broadcast)
+from events.constants import BROADCASTS, RSVPStatus
+from events.models import RSVP, Broadcast, OutboxEmail
+from events.tests.factories import EventFactory, UserFactory
+
+
+@pytest.fixture
+def organizer():
+    user = UserFactory()
+    user.groups.add(Group.objects.get_or_create(name="Organizer")[0])
+    return user
+
+
+@pytest.fixture
+def event(organizer):
+    event = EventFactory(
+        organizer=organizer,
+        status="published",
+        ticket_price=0,
+        date=date(2030, 5, 1),
+        time=time(18, 0),
+        location="Main Hall",
+    )
+    RSVP.objects.bulk_create(
+        RSVP(event=event, user=user, status=RSVPStatus.ATTENDING)
+        for user in UserFactory.create_batch(5)
+    )
+    return event
+
+
+@pytest.mark.django_db
+def test_broadcast_is_queued_in_chunks_with_throttled_send_times(
+    event, organizer, mocker
+):
+    mocker.patch.dict(BROADCASTS, {"EMAILS_PER_SECOND": 2})
+    mocker.patch("events.broadcasts.dispatch_broadcast")
+    render = mocker.spy(broadcasts, "render_to_string")
+    broadcast = start_broadcast(event, organizer, "Doors open early", "Come at 5pm")
+
+    assert run_broadcast(broadcast.pk, batch_size=2) == 5
+
+    emails = list(OutboxEmail.objects.order_by("next_attempt_at"))
+    assert sorted(email.recipients[0] for email in emails) == sorted(
+        event.attendees().values_list("email", flat=True)
+    )
+    gaps = [b.next_attempt_at - a.next_attempt_at for a, b in zip(emails, emails[1:])]
+    assert all(
+        abs(gap - timedelta(seconds=0.5)) < timedelta(seconds=0.1) for gap in gaps
+    )
+    assert "Come at 5pm" in emails[0].html_body
+    render.assert_called_once()
+
+    broadcast.refresh_from_db()
+    assert broadcast.status == "completed"
+    assert (broadcast.recipients_queued, broadcast.recipients_total) == (5, 5)
+    # A finished broadcast cannot be claimed again
+    assert run_broadcast(broadcast.pk) == 0
+
+
+@pytest.mark.django_db
+def test_interrupted_broadcast_resumes_after_its_watermark(event, organizer, mocker):
+    mocker.patch("events.broadcasts.dispatch_broadcast")
+    broadcast = start_broadcast(event, organizer, "Subject", "Message")
+    enqueue = mocker.patch(
+        "events.broadcasts.enqueue_messages", side_effect=[2, RuntimeError("crash")]
+    )
+
+    with pytest.raises(RuntimeError):
+        run_broadcast(broadcast.pk, batch_size=2)
+
+    Broadcast.objects.filter(pk=broadcast.pk).update(
+        modified=timezone.now() - timedelta(seconds=BROADCASTS["STALE_AFTER"] + 1)
+    )
+    enqueue.side_effect = lambda messages, **kwargs: len(messages)
+
+    assert send_due_broadcasts() == 3
+    # The crashed chunk rolled back with its watermark, so it is queued again
+    chunks = [[m.to[0] for m in call.args[0]] for call in enqueue.call_args_list]
+    assert chunks[2][:2] == chunks[1]
+    assert len({email for chunk in chunks for email in chunk}) == 5
+    broadcast.refresh_from_db()
+    assert broadcast.recipients_queued == 5
+
+
+@pytest.mark.django_db
+def test_quick_edits_are_merged_into_one_change_notice(event):
+    first = record_event_changes(event, {"location": ("Main Hall", "Room 1")})
+    second = record_event_changes(
+        event,
+        {"location": ("Room 1", "Room 2"), "time": ("18:00:00", "19:00:00")},
+    )
+
+    assert first.pk == second.pk
+    notice = Broadcast.objects.get()
+    assert notice.changes == {
+        "location": ["Main Hall", "Room 2"],
+        "time": ["18:00:00", "19:00:00"],
+    }
+    assert notice.send_after > timezone.now()
+    assert send_due_broadcasts() == 0
+
+    # Edits that undo every change drop the notice altogether
+    record_event_changes(
+        event,
+        {"location": ("Room 2", "Main Hall"), "time": ("19:00:00", "18:00:00")},
+    )
+    assert not Broadcast.objects.exists()
+
+
+@pytest.mark.django_db
+def test_editing_an_event_schedules_a_debounced_change_notice(client, event, organizer):
+    client.force_login(organizer)
+    data = {
+        "name": event.name,
+        "description": event.description,
+        "date": "2030-05-01",
+        "time": "18:00",
+        "location": "Room 42",
+        "capacity": "",
+        "category": event.category_id,
+    }
+
+    response = client.post(reverse("event_update", args=[event.pk]), data)
+
+    assert response.status_code == 302
+    notice = Broadcast.objects.get(kind="change")
+    assert notice.changes == {"location": ["Main Hall", "Room 42"]}
+    assert not OutboxEmail.objects.exists()
+
+    Broadcast.objects.update(send_after=timezone.now())
+    assert send_due_broadcasts() == 5
+    assert "Room 42" in OutboxEmail.objects.first().html_body
+
+
+@pytest.mark.django_db
+def test_broadcast_view(client, event, organizer, mocker):
+    dispatch = mocker.patch("events.broadcasts.dispatch_broadcast")
+    url = reverse("event_broadcast", args=[event.pk])
+
+    client.force_login(UserFactory())
+    response = client.post(url, {"subject": "Hi", "message": "There"})
+    assert response.status_code == 302
+    assert not Broadcast.objects.exists()
+
+    client.force_login(organizer)
+    assert client.post(url, {"subject": "", "message": "There"}).status_code == 400
+    assert not Broadcast.objects.exists()
+
+    response = client.post(url, {"subject": "Hi", "message": "There"})
+    assert response.status_code == 302
+    broadcast = Broadcast.objects.get()
+    assert (broadcast.kind, broadcast.sender) == ("message", organizer)
+    dispatch.assert_called_once_with(broadcast.pk)
@@ -0,0 +1,251 @@
+from datetime import timedelta
+
+import pytest
+from django.contrib.auth.models import Group
+from django.core import mail
+from django.urls import reverse
+from django.utils import timezone
+
+from events.attendance import set_rsvp_status
+from events.cancellation import (RateLimiter, notify_attendees,
+                                 process_refunds, run_cancellation,
+                                 start_cancellation)
+from events.constants import CANCELLATION, RSVPStatus
+from events.models import EventCancellation, OutboxEmail, Payment, Refund
+from events.payment_gateway import RefundNotProcessed
+from events.tests.factories import EventFactory, PaymentFactory, UserFactory
+
+
+class FakeRefundClient:
+    def __init__(self, failures=None):
+        # Refused before anything was refunded
+        self.failures = failures or {}
+        # Timed out; "lost" ones were refunded all the same
+        self.timeouts = {}
+        self.lost = {}
+        self.refunded = []
+
+    def refund_transaction(self, tran_id, amount, remarks):
+        if self.failures.get(tran_id, 0) > 0:
+            self.failures[tran_id] -= 1
+            raise RefundNotProcessed("gateway down")
+        if self.timeouts.get(tran_id, 0) > 0:
+            self.timeouts[tran_id] -= 1
+            raise ConnectionError("timed out")
+        self.refunded.append(tran_id)
+        if self.lost.get(tran_id, 0) > 0:
+            self.lost[tran_id] -= 1
+            raise ConnectionError("timed out")
+        return f"ref_{tran_id}"
+
+    def find_refund(self, tran_id):
+        return f"ref_{tran_id}" if tran_id in self.refunded else None
+
+
+@pytest.fixture(autouse=True)
+def fast_pipeline(mocker):
+    mocker.patch.dict(
+        CANCELLATION,
+        {
+            "WORKERS": 1,
+            "BATCH_SIZE": 2,
+            "RETRY_DELAY": 0,
+            "REFUNDS_PER_SECOND": 10000,
+            "EMAILS_PER_SECOND": 10000,
+        },
+    )
+    return mocker.patch("events.cancellation.redis_client")
+
+
+@pytest.fixture
+def refund_client(mocker):
+    client = FakeRefundClient()
+    mocker.patch("events.cancellation.get_gateway_client", return_value=client)
+    return client
+
+
+@pytest.fixture
+def organizer():
+    user = UserFactory()
+    user.groups.add(Group.objects.get_or_create(name="Organizer")[0])
+    return user
+
+
+@pytest.fixture
+def sold_out_event(organizer):
+    event = EventFactory(
+        organizer=organizer, status="published", ticket_price=50, tickets_sold=5
+    )
+    for _ in range(5):
+        attendee = UserFactory()
+        PaymentFactory(user=attendee, event=event, amount=50, status="valid")
+        set_rsvp_status(event, attendee, RSVPStatus.ATTENDING)
+    PaymentFactory(event=event, amount=50, status="failed")
+    mail.outbox.clear()
+    return event
+
+
+@pytest.mark.django_db
+def test_cancel_view_returns_before_refunds_run(
+    client, organizer, sold_out_event, mocker, django_capture_on_commit_callbacks
+):
+    dispatch = mocker.patch("events.cancellation.dispatch_cancellation")
+    client.force_login(organizer)
+
+    with django_capture_on_commit_callbacks(execute=True):
+        response = client.post(
+            reverse("event_cancel", args=[sold_out_event.pk]), {"reason": "Storm"}
+        )
+
+    assert response.status_code == 302
+    sold_out_event.refresh_from_db()
+    assert sold_out_event.status == "cancelled"
+    cancellation = EventCancellation.objects.get(event=sold_out_event)
+    assert cancellation.reason == "Storm"
+    dispatch.assert_called_once_with(cancellation.pk)
+    assert not Refund.objects.exists()
+
+
+@pytest.mark.django_db(transaction=True)
+def test_run_cancellation_refunds_and_notifies_everyone(
+    sold_out_event, refund_client, fast_pipeline
+):
+    cancellation = EventCancellation.objects.create(event=sold_out_event)
+
+    assert run_cancellation(cancellation.pk)
+
+    cancellation.refresh_from_db()
+    sold_out_event.refresh_from_db()
+    assert cancellation.status == "completed"
+    assert (cancellation.refunds_total, cancellation.refunds_requested) == (5, 5)
+    assert cancellation.attendees_notified == cancellation.attendees_total == 5
+    assert cancellation.progress() == 100
+    assert Payment.objects.filter(event=sold_out_event, status="refunded").count() == 5
+    assert sold_out_event.tickets_sold == 0
+    notices = OutboxEmail.objects.filter(subject__startswith="Event cancelled")
+    assert notices.count() == 5
+    fast_pipeline.invalidate_event_caches.assert_called_once_with(sold_out_event.pk)
+
+    # A second run is a no-op
+    assert not run_cancellation(cancellation.pk)
+    assert len(refund_client.refunded) == 5
+
+
+@pytest.mark.django_db(transaction=True)
+def test_failed_refunds_are_retried_then_given_up(sold_out_event, refund_client):
+    flaky, broken = Payment.objects.filter(
+        event=sold_out_event, status="valid"
+    ).values_list("transaction_id", flat=True)[:2]
+    refund_client.failures = {flaky: 1, broken: 99}
+    cancellation = EventCancellation.objects.create(event=sold_out_event)
+
+    run_cancellation(cancellation.pk)
+
+    cancellation.refresh_from_db()
+    assert (cancellation.refunds_requested, cancellation.refunds_failed) == (4, 1)
+    refund = Refund.objects.get(payment__transaction_id=broken)
+    assert refund.status == "failed"
+    assert refund.attempts == CANCELLATION["MAX_REFUND_ATTEMPTS"]
+    assert Payment.objects.get(transaction_id=broken).status == "valid"
+
+
+@pytest.mark.django_db(transaction=True)
+def test_unknown_refund_outcomes_are_checked_before_retrying(
+    sold_out_event, refund_client
+):
+    lost, unsent = Payment.objects.filter(
+        event=sold_out_event, status="valid"
+    ).values_list("transaction_id", flat=True)[:2]
+    refund_client.lost = {lost: 1}
+    refund_client.timeouts = {unsent: 1}
+    cancellation = EventCancellation.objects.create(event=sold_out_event)
+
+    run_cancellation(cancellation.pk)
+
+    # Refunded by the gateway despite the timeout: found, not requested again
+    assert refund_client.refunded.count(lost) == 1
+    assert Refund.objects.get(payment__transaction_id=lost).attempts == 1
+    # Never reached the gateway: requested again once that is known
+    assert refund_client.refunded.count(unsent) == 1
+    assert Refund.objects.get(payment__transaction_id=unsent).attempts == 2
+    assert not Refund.objects.exclude(status="requested").exists()
+
+
+@pytest.mark.django_db(transaction=True)
+def test_refunds_stuck_processing_after_a_crash_are_reconciled(
+    sold_out_event, refund_client
+):
+    payment = Payment.objects.filter(event=sold_out_event, status="valid").first()
+    stuck = Refund.objects.create(
+        payment=payment, amount=payment.amount, status="processing", attempts=1
+    )
+    Refund.objects.filter(pk=stuck.pk).update(
+        modified=timezone.now() - timedelta(hours=1)
+    )
+    # The crashed worker's request had reached the gateway
+    refund_client.refunded.append(payment.transaction_id)
+
+    process_refunds(event_id=sold_out_event.pk)
+
+    stuck.refresh_from_db()
+    assert (stuck.status, stuck.attempts) == ("requested", 1)
+    assert refund_client.refunded == [payment.transaction_id]
+
+
+@pytest.mark.django_db(transaction=True)
+def test_resumed_cancellation_skips_notified_attendees(sold_out_event, refund_client):
+    user_ids = sorted(sold_out_event.rsvps.values_list("user_id", flat=True))
+    cancellation = EventCancellation.objects.create(
+        event=sold_out_event,
+        status="failed",
+        attendees_notified=2,
+        last_notified_user_id=user_ids[1],
+    )
+
+    run_cancellation(cancellation.pk)
+
+    cancellation.refresh_from_db()
+    assert (
+        OutboxEmail.objects.filter(subject__startswith="Event cancelled").count() == 3
+    )
+    assert cancellation.attendees_notified == 5
+
+
+@pytest.mark.django_db
+def test_notices_are_queued_at_the_email_rate(sold_out_event, mocker):
+    mocker.patch.dict(CANCELLATION, {"EMAILS_PER_SECOND": 2})
+    cancellation = EventCancellation.objects.create(event=sold_out_event)
+
+    assert notify_attendees(cancellation) == 5
+
+    # Spaced across batches, not restarted with each one
+    send_times = list(
+        OutboxEmail.objects.filter(subject__startswith="Event cancelled")
+        .order_by("next_attempt_at")
+        .values_list("next_attempt_at", flat=True)
+    )
+    gaps = [later - earlier for earlier, later in zip(send_times, send_times[1:])]
+    assert all(
+        abs(gap - timedelta(seconds=0.5)) < timedelta(seconds=0.1) for gap in gaps
+    )
+    cancellation.refresh_from_db()
+    assert cancellation.attendees_notified == 5
+
+
+def test_rate_limiter_spaces_calls(mocker):
+    mocker.patch("events.cancellation.time.monotonic", return_value=100.0)
+    sleep = mocker.patch("events.cancellation.time.sleep")
+    limiter = RateLimiter(per_second=4)
+
+    for _ in range(3):
+        limiter.wait()
+
+    assert [call.args[0] for call in sleep.call_args_list] == [0.25, 0.5]
+
+
+@pytest.mark.django_db
+def test_start_cancellation_is_idempotent(sold_out_event, mocker):
+    mocker.patch("events.cancellation.dispatch_cancellation")
+    first = start_cancellation(sold_out_event)
+    second = start_cancellation(sold_out_event)
+    assert first.pk == second.pk
@@ -0,0 +1,194 @@
+from decimal import Decimal
+
+import pytest
+from django.urls import reverse
+
+from events.coupons import redeem_coupon, release_redemptions
+from events.models import Coupon, CouponRedemption, Payment
+from events.payment_utils import payment_handler
+from events.tests.factories import EventFactory, PaymentFactory, UserFactory
+
+
+@pytest.fixture
+def redis_gate(mocker):
+    gate = mocker.patch("events.coupons.redis_client")
+    gate.reserve_coupon.return_value = None  # Redis down: database only
+    return gate
+
+
+@pytest.fixture
+def gateway_mock(mocker):
+    mocker.patch("events.handlers.record_trending_activity")
+    mock_sslcz = mocker.patch.object(payment_handler, "sslcz")
+    mock_sslcz.createSession.side_effect = lambda body: {
+        "status": "SUCCESS",
+        "GatewayPageURL": f"https://gateway.test/pay/{body['tran_id']}",
+    }
+    return mock_sslcz
+
+
+@pytest.fixture
+def event():
+    return EventFactory(
+        status="published", ticket_price=Decimal("100.00"), tickets_sold=0
+    )
+
+
+@pytest.fixture
+def checkout(client, event, gateway_mock, redis_gate):
+    def submit(user, code):
+        client.force_login(user)
+        return client.post(
+            reverse("initiate_payment", args=[event.pk]), {"coupon_code": code}
+        )
+
+    return submit
+
+
+def pending_payment(user, event):
+    return PaymentFactory(user=user, event=event, status="pending")
+
+
+def test_discount_for_caps_fixed_discounts():
+    coupon = Coupon(code="BIG", discount_type="fixed", value=Decimal("150"))
+    assert coupon.discount_for(Decimal("100.00")) == Decimal("100.00")
+
+    coupon = Coupon(code="TEN", discount_type="percent", value=Decimal("12.5"))
+    assert coupon.discount_for(Decimal("99.99")) == Decimal("12.50")
+
+
+@pytest.mark.django_db
+def test_checkout_with_coupon_sends_discounted_amount(checkout, event, gateway_mock):
+    Coupon.objects.create(code="save20", event=event, value=Decimal("20"))
+
+    response = checkout(UserFactory(), " Save20 ")
+
+    assert response.status_code == 302
+    payment = Payment.objects.get()
+    assert payment.amount == Decimal("80.00")
+    body = gateway_mock.createSession.call_args.args[0]
+    assert body["total_amount"] == "80.00"
+    redemption = CouponRedemption.objects.get()
+    assert redemption.payment == payment
+    assert redemption.discount == Decimal("20.00")
+    assert Coupon.objects.get().redemptions_count == 1
+
+
+@pytest.mark.django_db
+def test_coupon_for_another_event_is_rejected(checkout, gateway_mock):
+    Coupon.objects.create(
+        code="OTHER", event=EventFactory(ticket_price=10), value=Decimal("10")
+    )
+
+    checkout(UserFactory(), "OTHER")
+
+    assert Payment.objects.get().status == "failed"
+    gateway_mock.createSession.assert_not_called()
+
+
+@pytest.mark.django_db
+def test_database_enforces_total_limit_without_redis(event, redis_gate):
+    coupon = Coupon.objects.create(code="ONCE", value=Decimal("10"), max_redemptions=1)
+
+    first_user, second_user = UserFactory(), UserFactory()
+    first = redeem_coupon("ONCE", first_user, event, pending_payment(first_user, event))
+    second = redeem_coupon(
+        "ONCE", second_user, event, pending_payment(second_user, event)
+    )
+
+    assert first["success"]
+    assert not second["success"]
+    assert "fully redeemed" in second["error"]
+    coupon.refresh_from_db()
+    assert coupon.redemptions_count == 1
+
+
+@pytest.mark.django_db
+def test_database_enforces_per_user_limit(event, redis_gate):
+    Coupon.objects.create(code="MINE", value=Decimal("10"), per_user_limit=1)
+    user = UserFactory()
+
+    assert redeem_coupon("MINE", user, event, pending_payment(user, event))["success"]
+    again = redeem_coupon("MINE", user, event, pending_payment(user, event))
+
+    assert not again["success"]
+    assert CouponRedemption.objects.count() == 1
+    assert Coupon.objects.get().redemptions_count == 1
+
+
+@pytest.mark.django_db
+def test_redis_gate_rejects_before_touching_the_database(
+    event, redis_gate, django_assert_max_num_queries
+):
+    Coupon.objects.create(code="HOT", value=Decimal("10"), max_redemptions=100)
+    redis_gate.reserve_coupon.return_value = 0
+    user = UserFactory()
+    payment = pending_payment(user, event)
+
+    with django_assert_max_num_queries(1):
+        result = redeem_coupon("HOT", user, event, payment)
+
+    assert not result["success"]
+    assert Coupon.objects.get().redemptions_count == 0
+
+
+@pytest.mark.django_db
+def test_unseeded_counters_are_seeded_from_the_database(event, redis_gate):
+    coupon = Coupon.objects.create(
+        code="SEED", value=Decimal("10"), redemptions_count=7
+    )
+    redis_gate.reserve_coupon.side_effect = [-2, 1]
+    user = UserFactory()
+
+    assert redeem_coupon("SEED", user, event, pending_payment(user, event))["success"]
+
+    redis_gate.seed_coupon_counters.assert_called_once_with(coupon.pk, user.pk, 7, 0)
+    redis_gate.release_coupon.assert_not_called()
+
+
+@pytest.mark.django_db
+def test_database_rejection_returns_the_redis_reservation(event, redis_gate):
+    coupon = Coupon.objects.create(
+        code="STALE", value=Decimal("10"), max_redemptions=1, redemptions_count=1
+    )
+    redis_gate.reserve_coupon.return_value = 1
+    user = UserFactory()
+
+    result = redeem_coupon("STALE", user, event, pending_payment(user, event))
+
+    assert not result["success"]
+    redis_gate.release_coupon.assert_called_once_with(coupon.pk, user.pk)
+
+
+@pytest.mark.django_db
+def test_failed_payment_releases_its_coupon(
+    checkout, redis_gate, django_capture_on_commit_callbacks
+):
+    coupon = Coupon.objects.create(code="BACK", value=Decimal("10"), max_redemptions=1)
+    user = UserFactory()
+    checkout(user, "BACK")
+    payment = Payment.objects.get()
+
+    with django_capture_on_commit_callbacks(execute=True):
+        payment_handler.handle_failed_payment({"tran_id": payment.transaction_id})
+
+    coupon.refresh_from_db()
+    assert coupon.redemptions_count == 0
+    assert not CouponRedemption.objects.exists()
+    redis_gate.release_coupon.assert_called_once_with(coupon.pk, user.pk)
+    assert release_redemptions([payment.pk]) == 0
+
+
+@pytest.mark.django_db
+def test_fully_discounted_checkout_skips_the_gateway(checkout, event, gateway_mock):
+    Coupon.objects.create(code="FREE", value=Decimal("100"))
+
+    response = checkout(UserFactory(), "FREE")
+
+    payment = Payment.objects.get()
+    assert payment.status == "valid"
+    assert payment.amount == 0
+    assert response.url.startswith(reverse("payment_success"))
+    gateway_mock.createSession.assert_not_called()
+    event.refresh_from_db()
+    assert event.tickets_sold == 1
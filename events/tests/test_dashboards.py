@@ -2,6 +2,8 @@ import pytest
 from django.contrib.auth.models import Group
 from django.urls import reverse
 
+from events.attendance import set_rsvp_status
+from events.constants import RSVPStatus
 from events.tests.factories import (CategoryFactory, EventFactory,
                                     PaymentFactory, UserFactory)
 from events.views import (get_admin_stats_htmx, get_organizer_stats_htmx,
@@ -55,9 +57,9 @@ def setup_dashboard_data(admin_user, organizer_user, participant_user):
     PaymentFactory(user=participant_user, event=event2, amount=event2.ticket_price)
     PaymentFactory(user=organizer_user, event=event3, amount=event3.ticket_price)
 
-    event1.participants.add(participant_user)
-    event2.participants.add(participant_user)
-    event3.participants.add(organizer_user)
+    set_rsvp_status(event1, participant_user, RSVPStatus.ATTENDING)
+    set_rsvp_status(event2, participant_user, RSVPStatus.ATTENDING)
+    set_rsvp_status(event3, organizer_user, RSVPStatus.ATTENDING)
 
     return {
         "admin": admin_user,
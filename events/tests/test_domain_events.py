@@ -0,0 +1,181 @@
+from collections import defaultdict
+from dataclasses import dataclass
+
+import pytest
+from django.urls import reverse
+
+from events import domain_events
+from events.attendance import register_attendees
+from events.domain_events import (DomainEvent, EventChanged, ParticipantAdded,
+                                  PaymentValidated, handler_metrics,
+                                  handlers_for, publish, subscribe)
+from events.handlers import (invalidate_event_caches, score_payments,
+                             score_rsvps)
+from events.models import Broadcast, OutboxEmail, Payment
+from events.reconciliation import mark_payments_valid
+from events.tests.factories import EventFactory, UserFactory
+
+
+@dataclass(frozen=True)
+class Pinged(DomainEvent):
+    value: int
+
+
+@pytest.fixture
+def bus(mocker):
+    """An empty handler registry, so only the test's handlers run."""
+    mocker.patch.object(domain_events, "_handlers", defaultdict(list))
+    mocker.patch.object(domain_events, "_metrics", {})
+
+
+@pytest.mark.django_db
+def test_handlers_run_in_their_dispatch_mode(
+    bus, mocker, django_capture_on_commit_callbacks
+):
+    calls = []
+    submit = mocker.patch.object(
+        domain_events.executor, "submit", side_effect=lambda fn, *args: fn(*args)
+    )
+    mocker.patch.object(domain_events, "db_connection")
+    subscribe(Pinged)(lambda e: calls.append(("sync", e.value)))
+    subscribe(Pinged, mode="on_commit")(lambda e: calls.append(("commit", e.value)))
+    subscribe(Pinged, mode="queued")(lambda e: calls.append(("queued", e.value)))
+
+    with django_capture_on_commit_callbacks() as callbacks:
+        publish(Pinged(1))
+        assert calls == [("sync", 1)]
+
+    for callback in callbacks:
+        callback()
+    assert calls == [("sync", 1), ("commit", 1), ("queued", 1)]
+    submit.assert_called_once()
+
+
+@pytest.mark.django_db
+def test_sync_failures_propagate_and_later_failures_are_logged(
+    bus, django_capture_on_commit_callbacks
+):
+    def boom(event):
+        raise ValueError("boom")
+
+    subscribe(Pinged, mode="on_commit")(boom)
+    with django_capture_on_commit_callbacks(execute=True):
+        publish(Pinged(1))  # logged, not raised
+
+    subscribe(Pinged)(boom)
+    with pytest.raises(ValueError):
+        publish(Pinged(2))
+
+    stats = handler_metrics()[f"{__name__}.{boom.__qualname__}"]
+    assert (stats["calls"], stats["errors"]) == (2, 2)
+
+
+def test_handler_metrics_time_every_call(bus, mocker):
+    ticks = iter([0.0, 0.1, 1.0, 1.5])
+    mocker.patch("events.domain_events.time.perf_counter", lambda: next(ticks))
+    warning = mocker.patch("events.domain_events.logger.warning")
+
+    def handler(event):
+        pass
+
+    subscribe(Pinged)(handler)
+    subscribe(Pinged)(handler)  # registering twice is a no-op
+    publish(Pinged(1))
+    publish(Pinged(2))
+
+    stats = handler_metrics()[f"{__name__}.{handler.__qualname__}"]
+    assert stats["calls"] == 2
+    assert stats["errors"] == 0
+    assert stats["max_ms"] == pytest.approx(500)
+    assert stats["avg_ms"] == pytest.approx(300)
+    warning.assert_called_once()  # only the 500ms call is slow
+
+
+def test_subscribe_rejects_unknown_modes(bus):
+    with pytest.raises(ValueError):
+        subscribe(Pinged, mode="later")
+
+
+def test_side_effects_are_registered_centrally():
+    assert (score_rsvps, "queued") in handlers_for(ParticipantAdded)
+    assert (score_payments, "queued") in handlers_for(PaymentValidated)
+    assert (invalidate_event_caches, "on_commit") in handlers_for(EventChanged)
+
+
+@pytest.mark.django_db
+def test_bulk_registration_publishes_one_participant_added(mocker):
+    publish = mocker.patch("events.attendance.publish")
+    event = EventFactory(status="published", ticket_price=0)
+    users = UserFactory.create_batch(3)
+
+    register_attendees(event, users)
+
+    publish.assert_called_once_with(
+        ParticipantAdded(event.pk, tuple(sorted(u.pk for u in users)))
+    )
+
+
+@pytest.mark.django_db
+def test_reverse_participant_add_queues_confirmations():
+    events = [EventFactory(status="published", ticket_price=0) for _ in range(2)]
+    user = UserFactory()
+
+    user.events_joined.add(*events)
+
+    assert sorted(OutboxEmail.objects.values_list("subject", flat=True)) == sorted(
+        f"RSVP Confirmation for: {event.name}" for event in events
+    )
+
+
+@pytest.mark.django_db
+def test_reconciled_payments_are_published_per_event(mocker):
+    mocker.patch("events.handlers.queue_rsvp_confirmations")
+    publish = mocker.patch("events.reconciliation.publish")
+    event = EventFactory(ticket_price=100, tickets_sold=0)
+    payments = [
+        Payment.objects.create(
+            user=UserFactory(),
+            event=event,
+            amount=100 * quantity,
+            quantity=quantity,
+            transaction_id=f"TXN-{quantity}",
+        )
+        for quantity in (1, 2)
+    ]
+
+    assert mark_payments_valid([p.pk for p in payments]) == 2
+
+    published = publish.call_args.args[0]
+    assert published.event_id == event.pk
+    assert sorted(published.payment_ids) == sorted(p.pk for p in payments)
+    assert published.tickets == 3
+
+
+@pytest.mark.django_db
+def test_event_edit_invalidates_caches_after_commit(
+    client, mocker, django_capture_on_commit_callbacks
+):
+    invalidate = mocker.patch("events.handlers.redis_client.invalidate_event_caches")
+    organizer = UserFactory()
+    organizer.groups.create(name="Organizer")
+    event = EventFactory(organizer=organizer, status="draft", ticket_price=0)
+    client.force_login(organizer)
+
+    with django_capture_on_commit_callbacks(execute=True):
+        response = client.post(
+            reverse("event_update", args=[event.pk]),
+            {
+                "name": "Renamed",
+                "description": event.description,
+                "date": event.date.isoformat(),
+                "time": "12:00",
+                "location": "Somewhere else",
+                "capacity": "",
+                "category": event.category_id,
+            },
+        )
+
+    assert response.status_code == 302
+    invalidate.assert_called_once_with(event.pk)
+    # Drafts have no attendees to tell about the new location
+    assert not Broadcast.objects.exists()
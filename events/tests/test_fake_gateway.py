@@ -0,0 +1,107 @@
+from decimal import Decimal
+from urllib.parse import parse_qsl, urlsplit
+
+import pytest
+import requests
+from django.core.management import call_command
+
+from events.fake_gateway import start_fake_gateway
+from events.models import Event, Payment
+from events.payment_gateway import (GatewayUnavailable, RefundNotProcessed,
+                                    SSLCommerzClient, SSLCommerzGatewayClient)
+
+
+@pytest.fixture
+def gateway():
+    server = start_fake_gateway()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def sslcz(gateway):
+    return SSLCommerzClient(
+        {"store_id": "store", "store_pass": "secret", "issandbox": True},
+        api_url=gateway.base_url,
+    )
+
+
+def create_session(sslcz, tran_id="txn_1"):
+    return sslcz.createSession(
+        {
+            "total_amount": "100.00",
+            "currency": "BDT",
+            "tran_id": tran_id,
+            "success_url": "http://testserver/payment_success/",
+            "fail_url": "http://testserver/payment_fail/",
+        }
+    )
+
+
+def test_fake_gateway_payment_round_trip(sslcz):
+    session = create_session(sslcz)
+    assert session["status"] == "SUCCESS"
+
+    response = requests.get(session["GatewayPageURL"], allow_redirects=False)
+    assert response.status_code == 302
+    location = urlsplit(response.headers["Location"])
+    callback = dict(parse_qsl(location.query))
+    assert location.path == "/payment_success/"
+    assert callback["tran_id"] == "txn_1"
+
+    assert sslcz.validationResponse(callback)
+    assert sslcz.validationResponse(callback, Decimal("100.00"), "BDT")
+    assert not sslcz.validationResponse({**callback, "tran_id": "txn_other"})
+    # A payment for less than the order, or in another currency, is refused
+    assert not sslcz.validationResponse(callback, Decimal("150.00"), "BDT")
+    assert not sslcz.validationResponse(callback, Decimal("100.00"), "USD")
+    client = SSLCommerzGatewayClient(sslcz)
+    assert client.query_transaction("txn_1", Decimal("100.00"), "BDT") == "valid"
+    assert client.query_transaction("txn_1", Decimal("150.00"), "BDT") == "failed"
+
+
+def test_fake_gateway_refunds_settled_transaction_once(sslcz):
+    session = create_session(sslcz)
+    requests.get(session["GatewayPageURL"], allow_redirects=False)
+    client = SSLCommerzGatewayClient(sslcz)
+
+    assert client.find_refund("txn_1") is None
+    refund_ref_id = client.refund_transaction("txn_1", "100.00", "Event cancelled")
+    assert refund_ref_id
+    assert client.find_refund("txn_1") == refund_ref_id
+    with pytest.raises(RefundNotProcessed):
+        client.refund_transaction("txn_1", "100.00", "Event cancelled")
+
+
+def test_fake_gateway_declines_and_errors(gateway, sslcz):
+    gateway.decline_rate = 1.0
+    session = create_session(sslcz)
+    response = requests.get(session["GatewayPageURL"], allow_redirects=False)
+    assert urlsplit(response.headers["Location"]).path == "/payment_fail/"
+    assert SSLCommerzGatewayClient(sslcz).query_transaction("txn_1") == "failed"
+
+    gateway.error_rate = 1.0
+    with pytest.raises(GatewayUnavailable):
+        create_session(sslcz, "txn_2")
+
+
+@pytest.mark.django_db(transaction=True)
+def test_load_test_payments_command(mocker):
+    mocker.patch("events.handlers.record_trending_activity")
+    # Drain the queue in-process: the in-memory test database does not take
+    # concurrent writers
+    call_command(
+        "load_test_payments",
+        flows=4,
+        concurrency=1,
+        workers=0,
+        latency=0,
+        jitter=0,
+        host="testserver",
+        keep_data=True,
+    )
+
+    event = Event.objects.get(name__startswith="Load test")
+    assert event.tickets_sold == 4
+    assert Payment.objects.filter(event=event, status="valid").count() == 4
@@ -0,0 +1,102 @@
+from io import BytesIO
+
+import pytest
+from django.core.management import call_command
+from django.template import Context, Template
+from PIL import Image
+
+from events.images import (generate_derivatives, render_derivatives,
+                           store_derivatives, supported_formats)
+from events.jobs import run_pending_jobs
+from events.models import Event, Job
+from events.tests.factories import EventFactory, image_file
+
+
+def render_tag(event, sizes="card"):
+    template = Template(
+        '{% load image_tags %}{% responsive_image event sizes "cover" %}'
+    )
+    return template.render(Context({"event": event, "sizes": sizes}))
+
+
+def test_renditions_never_upscale():
+    renditions = render_derivatives(
+        image_file().read(), [320, 640, 960, 1280], ["webp"]
+    )
+
+    assert sorted(renditions["webp"]) == [320, 640, 800]
+    with Image.open(BytesIO(renditions["webp"][320])) as image:
+        assert (image.format, image.size) == ("WEBP", (320, 160))
+
+
+def test_formats_pillow_cannot_encode_are_skipped(mocker):
+    mocker.patch("events.images.features.check", side_effect=lambda f: f == "webp")
+
+    assert supported_formats() == ["webp"]
+
+
+@pytest.mark.django_db
+def test_upload_queues_a_job_that_records_derivatives():
+    event = EventFactory(ticket_price=0, image=image_file())
+
+    job = Job.objects.get(name="images.derivatives")
+    assert job.payload == {"event_id": event.pk}
+    assert run_pending_jobs(["images"]) == {"succeeded": 1, "failed": 0}
+
+    event.refresh_from_db()
+    assert event.image_derivatives["source"] == event.image.name
+    assert sorted(event.image_derivatives["formats"]["webp"], key=int) == [
+        "320",
+        "640",
+        "800",
+    ]
+    # Saving again without a new image does not queue another job
+    event.save()
+    assert Job.objects.filter(name="images.derivatives").count() == 1
+
+    html = render_tag(event)
+    assert 'type="image/avif"' in html
+    assert "-640w.webp 640w" in html
+    assert f'src="{event.image.url}"' in html
+
+
+@pytest.mark.django_db
+def test_tag_falls_back_to_the_original_image():
+    event = EventFactory(ticket_price=0, image=image_file())
+    generate_derivatives(event.pk)
+    event.refresh_from_db()
+    event.image = image_file(width=600, name="replaced.png")
+    event.save()
+
+    html = render_tag(event, sizes="100vw")
+
+    # The recorded derivatives belong to the previous image
+    assert "<source" not in html
+    assert f'src="{event.image.url}"' in html
+
+
+@pytest.mark.django_db
+def test_derivatives_of_a_replaced_image_are_discarded(mocker):
+    event = EventFactory(ticket_price=0, image=image_file())
+    delete = mocker.patch("events.images.default_storage.delete")
+
+    stored = store_derivatives(event.pk, "event_images/old.png", {"webp": {320: b"x"}})
+
+    assert not stored
+    delete.assert_called_once()
+    assert Event.objects.get(pk=event.pk).image_derivatives == {}
+
+
+@pytest.mark.django_db
+def test_backfill_command_renders_missing_derivatives():
+    done = EventFactory(ticket_price=0, image=image_file())
+    generate_derivatives(done.pk)
+    missing = EventFactory(ticket_price=0, image=image_file(width=300, height=300))
+    broken = EventFactory(ticket_price=0)  # not a decodable image
+
+    call_command("generate_image_derivatives", "--workers", "1")
+
+    missing.refresh_from_db()
+    assert missing.image_derivatives["formats"]["avif"].keys() == {"300"}
+    broken.refresh_from_db()
+    assert broken.image_derivatives == {}
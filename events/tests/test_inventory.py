@@ -0,0 +1,229 @@
+import json
+from datetime import timedelta
+from decimal import Decimal
+
+import pytest
+from django.urls import reverse
+from django.utils import timezone
+
+from events.constants import CHECKOUT, PAYMENT_RECONCILIATION
+from events.inventory import TicketsUnavailable, reserve_tickets
+from events.models import Event, Payment, RevenueLedger
+from events.payment_utils import payment_handler
+from events.reconciliation import (mark_payments_failed, mark_payments_valid,
+                                   reconcile_payments)
+from events.tests.factories import EventFactory, UserFactory
+
+
+@pytest.fixture
+def gateway_mock(mocker):
+    mocker.patch("events.handlers.record_trending_activity")
+    mock_sslcz = mocker.patch.object(payment_handler, "sslcz")
+    mock_sslcz.createSession.side_effect = lambda body: {
+        "status": "SUCCESS",
+        "GatewayPageURL": f"https://gateway.test/pay/{body['tran_id']}",
+    }
+    mock_sslcz.validationResponse.return_value = True
+    return mock_sslcz
+
+
+@pytest.fixture
+def event():
+    return EventFactory(status="published", ticket_price=100, tickets_sold=0)
+
+
+@pytest.fixture
+def order(client, event, gateway_mock):
+    def submit(quantity, user=None):
+        client.force_login(user or UserFactory())
+        return client.post(
+            reverse("initiate_payment", args=[event.pk]), {"quantity": quantity}
+        )
+
+    return submit
+
+
+@pytest.mark.django_db
+def test_group_order_uses_one_payment_and_one_gateway_session(
+    order, event, gateway_mock
+):
+    response = order(3)
+
+    assert response.status_code == 302
+    payment = Payment.objects.get()
+    assert payment.quantity == 3
+    assert payment.amount == 300
+    item = payment.items.get()
+    assert (item.quantity, item.unit_price, item.total()) == (3, 100, 300)
+    gateway_mock.createSession.assert_called_once()
+    body = gateway_mock.createSession.call_args.args[0]
+    assert body["num_of_item"] == 3
+    assert body["total_amount"] == "300.00"
+    assert json.loads(body["cart"]) == [{"product": event.name, "amount": "300.00"}]
+    event.refresh_from_db()
+    assert event.tickets_reserved == 3
+    assert event.tickets_sold == 0
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("quantity", ["0", str(CHECKOUT["MAX_QUANTITY"] + 1), "x"])
+def test_out_of_range_quantity_is_rejected(order, gateway_mock, quantity):
+    response = order(quantity)
+
+    assert response.status_code == 302
+    assert not Payment.objects.exists()
+    gateway_mock.createSession.assert_not_called()
+
+
+@pytest.mark.django_db
+def test_orders_cannot_oversell_capacity(order, event, gateway_mock):
+    event.capacity = 5
+    event.tickets_sold = 1
+    event.save()
+
+    order(3)
+    order(2)
+    order(1)
+
+    assert sorted(Payment.objects.values_list("quantity", flat=True)) == [1, 3]
+    event.refresh_from_db()
+    assert event.tickets_reserved == 4
+    assert gateway_mock.createSession.call_count == 2
+
+
+@pytest.mark.django_db
+def test_reserve_tickets_reports_what_is_left():
+    event = EventFactory(ticket_price=10, capacity=4, tickets_sold=1)
+
+    with pytest.raises(TicketsUnavailable) as error:
+        reserve_tickets(event, 4)
+
+    assert error.value.available == 3
+
+
+@pytest.mark.django_db
+def test_validation_commits_the_whole_order(order, event, gateway_mock):
+    order(4)
+    payment = Payment.objects.get()
+
+    result = payment_handler.validate_payment({"tran_id": payment.transaction_id})
+
+    assert result["success"]
+    # The gateway must confirm the whole order's amount was paid
+    assert gateway_mock.validationResponse.call_args.args[1:] == (
+        Decimal("400.00"),
+        "BDT",
+    )
+    event.refresh_from_db()
+    assert (event.tickets_sold, event.tickets_reserved) == (4, 0)
+    assert event.participant_count() == 1
+    ledger = RevenueLedger.objects.get(event=event)
+    assert (ledger.tickets, ledger.revenue) == (4, 400)
+
+
+@pytest.mark.django_db
+def test_failed_payment_releases_its_tickets(order, event):
+    order(2)
+    payment = Payment.objects.get()
+
+    payment_handler.handle_failed_payment({"tran_id": payment.transaction_id})
+
+    event.refresh_from_db()
+    assert (event.tickets_sold, event.tickets_reserved) == (0, 0)
+
+
+@pytest.mark.django_db
+def test_reconciliation_settles_orders_by_quantity(order, event):
+    order(2)
+    order(3)
+    paid, abandoned = Payment.objects.order_by("quantity")
+
+    assert mark_payments_valid([paid.pk]) == 1
+    assert mark_payments_failed([abandoned.pk]) == 1
+
+    event.refresh_from_db()
+    assert (event.tickets_sold, event.tickets_reserved) == (2, 0)
+
+
+@pytest.mark.django_db
+def test_abandoned_order_frees_its_tickets(order, event, mocker):
+    order(3)
+    order(2)
+    abandoned, recent = Payment.objects.order_by("-quantity")
+    Payment.objects.filter(pk=abandoned.pk).update(
+        created=timezone.now()
+        - timedelta(seconds=PAYMENT_RECONCILIATION["EXPIRE_AFTER"] + 60)
+    )
+    Payment.objects.filter(pk=recent.pk).update(
+        created=timezone.now()
+        - timedelta(seconds=PAYMENT_RECONCILIATION["STALE_AFTER"] + 60)
+    )
+    # The gateway has no attempts on record for either session
+    client = mocker.Mock()
+    client.query_transaction.return_value = None
+
+    totals = reconcile_payments(client=client)
+
+    assert (totals["checked"], totals["expired"]) == (2, 1)
+    abandoned.refresh_from_db()
+    assert abandoned.status == "failed"
+    event.refresh_from_db()
+    assert (event.tickets_sold, event.tickets_reserved) == (0, 2)
+
+
+@pytest.mark.django_db
+def test_late_payment_after_failure_wins_back_its_tickets(order, event):
+    order(2)
+    payment = Payment.objects.get()
+    payment_handler.handle_failed_payment({"tran_id": payment.transaction_id})
+
+    result = payment_handler.validate_payment({"tran_id": payment.transaction_id})
+
+    assert result["success"]
+    payment.refresh_from_db()
+    assert payment.status == "valid"
+    event.refresh_from_db()
+    assert (event.tickets_sold, event.tickets_reserved) == (2, 0)
+
+
+@pytest.mark.django_db
+def test_late_payment_for_expired_order_is_refunded_when_sold_out(order, event):
+    Event.objects.filter(pk=event.pk).update(capacity=3)
+    order(2)
+    expired = Payment.objects.get()
+    assert mark_payments_failed([expired.pk]) == 1
+    order(3)
+
+    result = payment_handler.validate_payment({"tran_id": expired.transaction_id})
+
+    assert not result["success"]
+    expired.refresh_from_db()
+    assert expired.status == "failed"
+    assert expired.refund.status == "pending"
+    event.refresh_from_db()
+    assert (event.tickets_sold, event.tickets_reserved) == (0, 3)
+
+    # A replay once tickets free up does not revive a payment due a refund
+    Payment.objects.exclude(pk=expired.pk).update(status="failed")
+    Event.objects.filter(pk=event.pk).update(tickets_reserved=0)
+    result = payment_handler.validate_payment({"tran_id": expired.transaction_id})
+
+    assert not result["success"]
+    event.refresh_from_db()
+    assert event.tickets_sold == 0
+
+
+@pytest.mark.django_db
+def test_replayed_callback_does_not_revive_refunded_payment(order, event, gateway_mock):
+    order(2)
+    payment = Payment.objects.get()
+    Payment.objects.filter(pk=payment.pk).update(status="refunded")
+
+    result = payment_handler.validate_payment({"tran_id": payment.transaction_id})
+
+    assert not result["success"]
+    gateway_mock.validationResponse.assert_not_called()
+    payment.refresh_from_db()
+    assert payment.status == "refunded"
+    event.refresh_from_db()
+    assert event.tickets_sold == 0
@@ -0,0 +1,207 @@
+from dataclasses import replace
+from datetime import timedelta
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+from django.utils import timezone
+
+from events import jobs
+from events.constants import JOBS
+from events.jobs import (claim_jobs, enqueue_job, job, queue_metrics,
+                         retry_delay, run_job, run_pending_jobs)
+from events.models import Job
+from events.payment_inbox import enqueue_notification
+
+calls = []
+
+
+@job("tests.record", queue="tests")
+def record(value):
+    calls.append(value)
+
+
+@job("tests.fail", queue="tests", max_attempts=2)
+def fail():
+    raise RuntimeError("gateway down")
+
+
+@pytest.fixture(autouse=True)
+def clear_calls():
+    calls.clear()
+
+
+@pytest.mark.django_db
+def test_jobs_are_claimed_by_priority_and_claims_do_not_overlap():
+    low = enqueue_job("tests.record", {"value": "low"})
+    high = enqueue_job("tests.record", {"value": "high"}, priority=5)
+    later = enqueue_job(
+        "tests.record",
+        {"value": "later"},
+        run_at=timezone.now() + timedelta(minutes=5),
+    )
+
+    first = claim_jobs(["tests"], limit=1)
+    second = claim_jobs(["tests"], limit=5)
+
+    assert [j.pk for j in first] == [high.pk]
+    assert [j.pk for j in second] == [low.pk]
+    assert claim_jobs(["tests"]) == []
+    assert Job.objects.get(pk=later.pk).status == "queued"
+    assert first[0].attempts == 1
+
+
+@pytest.mark.django_db
+def test_stale_claims_are_retaken():
+    enqueue_job("tests.record", {"value": 1})
+    claimed = claim_jobs(["tests"])
+    Job.objects.filter(pk=claimed[0].pk).update(
+        modified=timezone.now() - timedelta(seconds=JOBS["STALE_AFTER"] + 1)
+    )
+
+    retaken = claim_jobs(["tests"])
+
+    assert [j.pk for j in retaken] == [claimed[0].pk]
+    assert retaken[0].attempts == 2
+
+
+@pytest.mark.django_db
+def test_a_claim_retaken_while_waiting_in_the_batch_is_skipped(mocker):
+    first = enqueue_job("tests.record", {"value": "first"}, priority=5)
+    second = enqueue_job("tests.record", {"value": "second"})
+
+    def slow_record(value):
+        calls.append(value)
+        # The second job's claim went stale behind this one and was retaken
+        Job.objects.filter(pk=second.pk).update(claim_token="other-worker")
+
+    spec = replace(jobs._registry["tests.record"], func=slow_record)
+    mocker.patch.dict(jobs._registry, {"tests.record": spec})
+
+    totals = run_pending_jobs(["tests"], max_batches=1)
+
+    assert calls == ["first"]
+    assert totals == {"succeeded": 1, "failed": 0}
+    assert Job.objects.get(pk=first.pk).status == "succeeded"
+    assert Job.objects.get(pk=second.pk).claim_token == "other-worker"
+
+
+@pytest.mark.django_db
+def test_heartbeat_keeps_a_long_job_from_being_retaken(mocker):
+    long_job = enqueue_job("tests.record", {"value": "long"})
+    retaken = []
+
+    def long_record(value):
+        # Runs past STALE_AFTER, beating its heart along the way
+        Job.objects.filter(pk=long_job.pk).update(
+            modified=timezone.now() - timedelta(seconds=JOBS["STALE_AFTER"] + 1)
+        )
+        assert jobs.heartbeat()
+        retaken.extend(claim_jobs(["tests"]))
+
+    spec = replace(jobs._registry["tests.record"], func=long_record)
+    mocker.patch.dict(jobs._registry, {"tests.record": spec})
+
+    assert run_pending_jobs(["tests"]) == {"succeeded": 1, "failed": 0}
+    assert retaken == []
+    assert Job.objects.get(pk=long_job.pk).attempts == 1
+    # Outside a job there is nothing to renew
+    assert jobs.heartbeat()
+
+
+@pytest.mark.django_db
+def test_failed_jobs_back_off_then_go_to_the_dead_letters(mocker):
+    mocker.patch.dict(JOBS, {"BACKOFF_BASE": 0})
+    dead = enqueue_job("tests.fail")
+
+    assert run_pending_jobs(["tests"]) == {"succeeded": 0, "failed": 2}
+
+    dead.refresh_from_db()
+    assert dead.status == "dead"
+    assert dead.attempts == 2
+    assert dead.last_error == "gateway down"
+    assert dead.finished_at is not None
+
+
+@pytest.mark.django_db
+def test_failed_job_is_requeued_after_its_retry_delay():
+    failing = enqueue_job("tests.fail")
+
+    assert not run_job(claim_jobs(["tests"])[0])
+
+    failing.refresh_from_db()
+    assert failing.status == "queued"
+    assert failing.run_at > timezone.now() + retry_delay(1) - timedelta(seconds=5)
+    assert claim_jobs(["tests"]) == []
+
+
+def test_retry_delay_doubles_up_to_the_cap():
+    assert retry_delay(1) == timedelta(seconds=JOBS["BACKOFF_BASE"])
+    assert retry_delay(3) == timedelta(seconds=JOBS["BACKOFF_BASE"] * 4)
+    assert retry_delay(50) == timedelta(seconds=JOBS["BACKOFF_MAX"])
+
+
+@pytest.mark.django_db
+def test_unknown_jobs_are_rejected_and_stale_names_dead_lettered():
+    with pytest.raises(ValueError):
+        enqueue_job("tests.missing")
+
+    orphan = Job.objects.create(name="tests.removed", queue="tests", max_attempts=1)
+    run_pending_jobs(["tests"])
+
+    orphan.refresh_from_db()
+    assert orphan.status == "dead"
+    assert "Unknown job" in orphan.last_error
+
+
+@pytest.mark.django_db
+def test_queue_metrics_report_backlog_and_throughput():
+    enqueue_job("tests.record", {"value": 1})
+    enqueue_job("tests.record", {"value": 2})
+    run_pending_jobs(["tests"], max_batches=1, batch_size=1)
+    Job.objects.create(name="tests.fail", queue="tests", status="dead")
+
+    metrics = queue_metrics(window=60)["tests"]
+
+    assert (metrics["queued"], metrics["running"], metrics["dead"]) == (1, 0, 1)
+    assert metrics["succeeded"] == 1
+    assert metrics["per_minute"] == 1
+    assert metrics["avg_seconds"] >= 0
+
+
+@pytest.mark.django_db
+def test_run_workers_once_drains_only_the_given_queue():
+    enqueue_job("tests.record", {"value": "a"})
+    enqueue_job("tests.record", {"value": "b"})
+    other = Job.objects.create(name="tests.record", queue="elsewhere")
+    out = StringIO()
+
+    call_command("run_workers", "--once", "--queue", "tests", stdout=out)
+
+    assert sorted(calls) == ["a", "b"]
+    assert "Ran 2 job(s); 0 failed." in out.getvalue()
+    assert Job.objects.get(pk=other.pk).status == "queued"
+
+    call_command("run_workers", "--metrics", stdout=out)
+    assert "tests: 0 queued, 0 running, 0 dead" in out.getvalue()
+
+
+@pytest.mark.django_db
+def test_payment_notifications_are_validated_by_a_job(mocker):
+    validate = mocker.patch(
+        "events.payment_inbox.payment_handler.validate_payment",
+        side_effect=[
+            {"success": False, "error": "timeout", "retryable": True},
+            {"success": True},
+        ],
+    )
+    mocker.patch.dict(JOBS, {"BACKOFF_BASE": 0})
+
+    notification = enqueue_notification("ipn", {"tran_id": "TXN-1"})
+
+    queued = Job.objects.get(name="payments.process_notification")
+    assert queued.payload == {"notification_id": notification.pk}
+    assert run_pending_jobs(["payments"]) == {"succeeded": 1, "failed": 1}
+    assert validate.call_count == 2
+    notification.refresh_from_db()
+    assert notification.status == "processed"
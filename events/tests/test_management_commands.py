@@ -1,4 +1,5 @@
 from decimal import Decimal
+from io import StringIO
 from unittest import mock
 
 import pytest
@@ -6,7 +7,8 @@ from django.contrib.auth import get_user_model
 from django.core.files.storage import Storage
 from django.core.management import call_command
 
-from events.models import Category, Event, Payment, Profile
+from events.models import RSVP, Category, Event, Payment, Profile
+from events.tests.factories import EventFactory, UserFactory
 
 User = get_user_model()
 
@@ -42,8 +44,26 @@ def test_populate_demo_data_command(mocker):
     future_tech_summit = Event.objects.get(name="Future Tech Summit")
     assert future_tech_summit.ticket_price == Decimal("99.99")
     assert future_tech_summit.participants.count() == 2
+    assert future_tech_summit.participant_count() == 2
 
     # Assertions for Payments
     assert Payment.objects.count() == 7  # Based on the command's logic
     assert Payment.objects.filter(event__name="Future Tech Summit").count() == 2
     assert Payment.objects.filter(event__name="DjangoCon 2024").count() == 3
+
+
+@pytest.mark.django_db
+def test_backfill_rsvps_command_copies_participants_in_batches():
+    event = EventFactory(ticket_price=0)
+    users = UserFactory.create_batch(5)
+    event.participants.add(*users)
+    RSVP.objects.create(event=event, user=users[0], status="maybe")
+
+    out = StringIO()
+    call_command("backfill_rsvps", batch_size=2, stdout=out)
+
+    assert "4 participant row(s) copied" in out.getvalue()
+    assert RSVP.objects.filter(event=event).count() == 5
+    assert RSVP.objects.attending().filter(event=event).count() == 4
+    # Existing RSVP decisions are left untouched
+    assert RSVP.objects.get(event=event, user=users[0]).status == "maybe"
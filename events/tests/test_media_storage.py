@@ -0,0 +1,94 @@
+import os
+import subprocess
+import sys
+
+import pytest
+from django.core.exceptions import ImproperlyConfigured
+from django.core.files.base import ContentFile
+
+from events.media_storage import DedupFileSystemStorage
+from events.models import MediaBlob
+
+
+@pytest.fixture
+def storage(tmp_path):
+    return DedupFileSystemStorage(location=tmp_path)
+
+
+@pytest.mark.django_db
+def test_identical_uploads_are_stored_once(storage, tmp_path):
+    first = storage.save("event_images/banner.png", ContentFile(b"banner"))
+    second = storage.save("event_images/other.png", ContentFile(b"banner"))
+    third = storage.save("event_images/banner.png", ContentFile(b"new banner"))
+
+    assert second == first
+    assert third != first
+    assert len(list((tmp_path / "event_images").iterdir())) == 2
+    blob = MediaBlob.objects.get(name=first)
+    assert (blob.refs, blob.size) == (2, 6)
+
+
+@pytest.mark.django_db
+def test_file_is_deleted_with_its_last_reference(storage):
+    name = storage.save("banner.png", ContentFile(b"banner"))
+    storage.save("banner.png", ContentFile(b"banner"))
+
+    storage.delete(name)
+    assert storage.exists(name)
+    assert MediaBlob.objects.get(name=name).refs == 1
+
+    storage.delete(name)
+    assert not storage.exists(name)
+    assert not MediaBlob.objects.exists()
+    # The same bytes are uploaded afresh afterwards
+    assert storage.save("banner.png", ContentFile(b"banner")) == name
+    assert storage.exists(name)
+
+
+@pytest.mark.django_db
+def test_files_stored_before_dedup_are_deleted_as_usual(storage, tmp_path):
+    (tmp_path / "legacy.png").write_bytes(b"legacy")
+
+    storage.delete("legacy.png")
+
+    assert not storage.exists("legacy.png")
+
+
+@pytest.mark.django_db
+def test_duplicate_cloudinary_upload_is_not_transferred(mocker):
+    # cloudinary_storage refuses to import without credentials
+    try:
+        from events.cloudinary_media import DedupMediaCloudinaryStorage
+    except ImproperlyConfigured:
+        pytest.skip("Cloudinary credentials are not configured")
+    upload = mocker.patch(
+        "cloudinary.uploader.upload", return_value={"public_id": "media/banner_x1"}
+    )
+    storage = DedupMediaCloudinaryStorage()
+
+    names = [
+        storage.save("event_images/banner.png", ContentFile(b"banner", name="b.png"))
+        for _ in range(3)
+    ]
+
+    assert names == ["media/banner_x1"] * 3
+    upload.assert_called_once()
+    assert MediaBlob.objects.get().refs == 3
+
+
+def test_local_media_works_without_cloudinary_credentials():
+    env = {k: v for k, v in os.environ.items() if not k.startswith("CLOUDINARY")}
+    env["CLOUDINARY_ENABLED"] = "false"
+    script = (
+        "import django; django.setup()\n"
+        "from django.core.files.storage import default_storage\n"
+        "from events.storage_utils import is_cloudinary_storage\n"
+        "print(default_storage.__class__.__name__, is_cloudinary_storage())"
+    )
+
+    result = subprocess.run(
+        [sys.executable, "-c", script], env=env, capture_output=True, text=True
+    )
+
+    assert result.returncode == 0, result.stderr
+    assert result.stdout.split()[-2:] == ["DedupFileSystemStorage", "False"]
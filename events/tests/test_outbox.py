@@ -0,0 +1,157 @@
+from datetime import timedelta
+from smtplib import SMTPRecipientsRefused
+
+import pytest
+from django.core import mail
+from django.core.management import call_command
+from django.urls import reverse
+from django.utils import timezone
+
+from events.attendance import set_rsvp_status
+from events.constants import OUTBOX, RSVPStatus
+from events.models import OutboxEmail
+from events.outbox import (claim_batch, dispatch_outbox, enqueue_email,
+                           retry_delay, schedule_dispatch)
+from events.tests.factories import EventFactory, UserFactory
+
+
+@pytest.fixture
+def failing_connection(mocker):
+    """SMTP connection that refuses the given recipients."""
+
+    def install(refused=(), connect_error=None):
+        connection = mocker.MagicMock()
+        connection.__enter__.return_value = connection
+        if connect_error:
+            connection.__enter__.side_effect = connect_error
+
+        def send_messages(messages):
+            if set(messages[0].to) & set(refused):
+                raise SMTPRecipientsRefused({})
+            return 1
+
+        connection.send_messages.side_effect = send_messages
+        return mocker.patch("events.outbox.get_connection", return_value=connection)
+
+    return install
+
+
+@pytest.mark.django_db
+def test_enqueue_email_sends_nothing_until_dispatched(
+    django_capture_on_commit_callbacks,
+):
+    with django_capture_on_commit_callbacks() as callbacks:
+        email = enqueue_email(
+            "Hello", ["a@example.com"], html_message="<p>Hi <b>there</b></p>"
+        )
+
+    assert callbacks == [schedule_dispatch]
+    assert email.body == "Hi there"
+    assert len(mail.outbox) == 0
+
+    assert dispatch_outbox() == {"sent": 1, "failed": 0}
+    email.refresh_from_db()
+    assert email.status == "sent"
+    assert email.sent_at is not None
+    assert mail.outbox[0].alternatives[0][0] == "<p>Hi <b>there</b></p>"
+
+
+@pytest.mark.django_db
+def test_dispatch_reuses_one_connection_per_batch(mocker):
+    for i in range(5):
+        enqueue_email(f"Message {i}", [f"user{i}@example.com"], body="Body")
+    get_connection = mocker.spy(mail, "get_connection")
+    mocker.patch("events.outbox.get_connection", get_connection)
+
+    assert dispatch_outbox(batch_size=2) == {"sent": 5, "failed": 0}
+
+    assert get_connection.call_count == 3
+    assert len(mail.outbox) == 5
+
+
+@pytest.mark.django_db
+def test_failed_send_is_retried_with_backoff(failing_connection):
+    enqueue_email("Ok", ["ok@example.com"], body="Body")
+    enqueue_email("Bad", ["bad@example.com"], body="Body")
+    failing_connection(refused=["bad@example.com"])
+
+    assert dispatch_outbox() == {"sent": 1, "failed": 1}
+
+    bad = OutboxEmail.objects.get(subject="Bad")
+    assert bad.status == "pending"
+    assert bad.attempts == 1
+    assert bad.next_attempt_at > timezone.now() + retry_delay(1) - timedelta(seconds=5)
+    # Not due yet, so an immediate rerun leaves it alone
+    assert dispatch_outbox() == {"sent": 0, "failed": 0}
+
+
+def test_retry_delay_doubles_up_to_the_cap():
+    assert retry_delay(1) == timedelta(seconds=OUTBOX["BACKOFF_BASE"])
+    assert retry_delay(2) == timedelta(seconds=OUTBOX["BACKOFF_BASE"] * 2)
+    assert retry_delay(50) == timedelta(seconds=OUTBOX["BACKOFF_MAX"])
+
+
+@pytest.mark.django_db
+def test_email_fails_after_max_attempts(failing_connection, mocker):
+    mocker.patch.dict(OUTBOX, {"MAX_ATTEMPTS": 2, "BACKOFF_BASE": 0})
+    enqueue_email("Bad", ["bad@example.com"], body="Body")
+    failing_connection(connect_error=ConnectionRefusedError("smtp down"))
+
+    assert dispatch_outbox() == {"sent": 0, "failed": 2}
+
+    email = OutboxEmail.objects.get()
+    assert email.status == "failed"
+    assert email.attempts == 2
+    assert "smtp down" in email.last_error
+
+
+@pytest.mark.django_db
+def test_claims_do_not_overlap_and_stale_claims_are_retaken():
+    for i in range(3):
+        enqueue_email(f"Message {i}", ["a@example.com"], body="Body")
+
+    first = claim_batch(2)
+    second = claim_batch(2)
+    assert len(first) == 2
+    assert len(second) == 1
+    assert claim_batch(2) == []
+
+    OutboxEmail.objects.filter(pk=first[0].pk).update(
+        modified=timezone.now() - timedelta(seconds=OUTBOX["STALE_AFTER"] + 1)
+    )
+    assert [email.pk for email in claim_batch(2)] == [first[0].pk]
+
+
+@pytest.mark.django_db
+def test_rsvp_signal_queues_confirmation_in_outbox():
+    event = EventFactory(status="published", ticket_price=0)
+    user = UserFactory()
+
+    set_rsvp_status(event, user, RSVPStatus.ATTENDING)
+
+    assert len(mail.outbox) == 0
+    email = OutboxEmail.objects.get()
+    assert email.recipients == [user.email]
+    assert email.subject == f"RSVP Confirmation for: {event.name}"
+
+
+@pytest.mark.django_db
+def test_contact_form_queues_email(client):
+    response = client.post(
+        reverse("contact"),
+        {
+            "name": "Visitor",
+            "email": "visitor@example.com",
+            "subject": "Question",
+            "message": "When does the next event start?",
+        },
+    )
+
+    assert response.status_code == 302
+    assert len(mail.outbox) == 0
+    email = OutboxEmail.objects.get()
+    assert email.subject == "Question"
+    assert email.reply_to == ["visitor@example.com"]
+
+    call_command("dispatch_outbox")
+    assert mail.outbox[0].reply_to == ["visitor@example.com"]
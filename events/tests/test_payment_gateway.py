@@ -0,0 +1,93 @@
+import pytest
+import requests
+
+from events.fake_gateway import start_fake_gateway
+from events.payment_gateway import (CircuitBreaker, GatewayTransport,
+                                    GatewayUnavailable, SSLCommerzClient)
+
+
+@pytest.fixture
+def gateway():
+    server = start_fake_gateway()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture(autouse=True)
+def no_backoff(mocker):
+    return mocker.patch("events.payment_gateway.time.sleep")
+
+
+def make_client(gateway, **transport_options):
+    return SSLCommerzClient(
+        {"store_id": "store", "store_pass": "secret", "issandbox": True},
+        api_url=gateway.base_url,
+        transport=GatewayTransport(**transport_options),
+    )
+
+
+def test_idempotent_calls_are_retried_with_backoff(gateway, mocker, no_backoff):
+    client = make_client(gateway, max_retries=2)
+    session = client.createSession({"tran_id": "txn_1", "total_amount": "10"})
+    requests.get(session["GatewayPageURL"], allow_redirects=False)
+    mocker.patch.object(gateway, "should_fail", side_effect=[True, True, False])
+
+    response = client.transaction_query_tranid("txn_1")
+
+    assert response["element"][0]["status"] == "VALID"
+    assert no_backoff.call_count == 2
+
+
+def test_session_creation_is_not_retried(gateway, mocker):
+    client = make_client(gateway, max_retries=2)
+    should_fail = mocker.patch.object(gateway, "should_fail", return_value=True)
+
+    with pytest.raises(GatewayUnavailable):
+        client.createSession({"tran_id": "txn_1", "total_amount": "10"})
+    assert should_fail.call_count == 1
+
+
+def test_open_breaker_fails_fast_without_network(gateway, mocker):
+    breaker = CircuitBreaker(failure_threshold=2, reset_after=60)
+    client = make_client(gateway, breaker=breaker, max_retries=0)
+    mocker.patch.object(gateway, "should_fail", return_value=True)
+
+    for _ in range(2):
+        with pytest.raises(GatewayUnavailable):
+            client.transaction_query_tranid("txn_1")
+    assert breaker.is_open
+
+    send = mocker.patch.object(client.transport.session, "get")
+    with pytest.raises(GatewayUnavailable, match="circuit breaker is open"):
+        client.transaction_query_tranid("txn_1")
+    send.assert_not_called()
+
+
+def test_breaker_lets_one_trial_through_after_reset(mocker):
+    breaker = CircuitBreaker(failure_threshold=1, reset_after=30)
+    clock = mocker.patch("events.payment_gateway.time.monotonic", return_value=100)
+    breaker.record_failure()
+    assert not breaker.allow()
+
+    clock.return_value = 131
+    assert breaker.allow()
+    assert not breaker.allow()
+
+    breaker.record_failure()
+    assert not breaker.allow()
+
+    clock.return_value = 162
+    assert breaker.allow()
+    breaker.record_success()
+    assert not breaker.is_open
+    assert breaker.allow()
+
+
+def test_transport_applies_connect_and_read_timeouts(gateway, mocker):
+    client = make_client(gateway)
+    send = mocker.spy(client.transport.session, "get")
+
+    client.transaction_query_tranid("txn_1")
+
+    assert send.call_args.kwargs["timeout"] == client.transport.timeout
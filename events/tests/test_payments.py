@@ -1,8 +1,15 @@
+from datetime import timedelta
+
 import pytest
 from django.contrib.auth import get_user_model
+from django.core.management import call_command
 from django.urls import reverse
+from django.utils import timezone
 
-from events.models import Payment
+from events.constants import CHECKOUT, PAYMENT_INBOX
+from events.models import Payment, PaymentNotification
+from events.payment_inbox import process_notification
+from events.payment_utils import payment_handler
 from events.tests.factories import CategoryFactory, EventFactory, UserFactory
 
 User = get_user_model()
@@ -191,3 +198,251 @@ def test_payment_ipn_invalid(client, user, event, sslcommerz_mock, config_mock):
     assert user not in event.participants.all()
     assert response.status_code == 200
     assert response.content.decode() == "IPN Received"
+
+
+@pytest.fixture
+def gateway_mock(mocker):
+    mocker.patch("events.handlers.record_trending_activity")
+    mock_sslcz = mocker.patch.object(payment_handler, "sslcz")
+    mock_sslcz.validationResponse.return_value = True
+    return mock_sslcz
+
+
+@pytest.fixture
+def pending_payment(user, event):
+    return Payment.objects.create(
+        user=user,
+        event=event,
+        amount=event.ticket_price,
+        status="pending",
+        transaction_id="idempotent_tran_id",
+    )
+
+
+@pytest.mark.django_db
+def test_validate_payment_is_idempotent(gateway_mock, pending_payment, event, user):
+    data = {"tran_id": pending_payment.transaction_id}
+    first = payment_handler.validate_payment(data)
+    second = payment_handler.validate_payment(data)
+
+    assert first["success"] and second["success"]
+    gateway_mock.validationResponse.assert_called_once()
+    event.refresh_from_db()
+    pending_payment.refresh_from_db()
+    assert pending_payment.status == "valid"
+    assert event.tickets_sold == 1
+    assert event.participant_count() == 1
+
+
+@pytest.mark.django_db
+def test_redirect_and_ipn_are_acknowledged_and_grant_one_ticket(
+    client,
+    user,
+    gateway_mock,
+    pending_payment,
+    event,
+    mocker,
+    django_capture_on_commit_callbacks,
+):
+    dispatch = mocker.patch("events.payment_inbox.dispatch_notification")
+    data = {"tran_id": pending_payment.transaction_id}
+    client.force_login(user)
+
+    with django_capture_on_commit_callbacks(execute=True):
+        redirect_response = client.get(reverse("payment_success"), data)
+        ipn_response = client.post(reverse("payment_ipn"), data)
+
+    assert redirect_response.status_code == 200
+    assert b"Confirming Your Payment" in redirect_response.content
+    assert ipn_response.content.decode() == "IPN Received"
+    gateway_mock.validationResponse.assert_not_called()
+    assert dispatch.call_count == 2
+
+    for notification in PaymentNotification.objects.all():
+        assert process_notification(notification.pk)
+
+    gateway_mock.validationResponse.assert_called_once()
+    event.refresh_from_db()
+    assert event.tickets_sold == 1
+    assert set(PaymentNotification.objects.values_list("status", flat=True)) == {
+        "processed"
+    }
+
+
+@pytest.mark.django_db
+def test_payment_status_fragment_reports_validated_payment(
+    client, gateway_mock, pending_payment, user
+):
+    url = reverse("payment_status_htmx", args=[pending_payment.transaction_id])
+    client.force_login(user)
+    assert b"Confirming Your Payment" in client.get(url).content
+
+    payment_handler.validate_payment({"tran_id": pending_payment.transaction_id})
+
+    assert b"Payment Successful" in client.get(url).content
+
+
+@pytest.mark.django_db
+def test_gateway_errors_are_retried_until_max_attempts(pending_payment, mocker):
+    mocker.patch.object(
+        payment_handler,
+        "validate_payment",
+        return_value={"success": False, "error": "timeout", "retryable": True},
+    )
+    notification = PaymentNotification.objects.create(
+        source="ipn",
+        transaction_id=pending_payment.transaction_id,
+        payload={"tran_id": pending_payment.transaction_id},
+    )
+
+    for _ in range(PAYMENT_INBOX["MAX_ATTEMPTS"] - 1):
+        assert not process_notification(notification.pk)
+    assert process_notification(notification.pk)
+
+    notification.refresh_from_db()
+    assert notification.status == "failed"
+    assert notification.attempts == PAYMENT_INBOX["MAX_ATTEMPTS"]
+
+
+@pytest.mark.django_db(transaction=True)
+def test_process_payment_inbox_command(gateway_mock, pending_payment, event):
+    PaymentNotification.objects.create(
+        source="ipn",
+        transaction_id=pending_payment.transaction_id,
+        payload={"tran_id": pending_payment.transaction_id},
+    )
+
+    call_command("process_payment_inbox", workers=2)
+
+    pending_payment.refresh_from_db()
+    assert pending_payment.status == "valid"
+    assert PaymentNotification.objects.get().status == "processed"
+
+
+@pytest.mark.django_db
+def test_fail_callback_does_not_downgrade_valid_payment(
+    client, gateway_mock, pending_payment
+):
+    payment_handler.validate_payment({"tran_id": pending_payment.transaction_id})
+    client.post(reverse("payment_fail"), {"tran_id": pending_payment.transaction_id})
+
+    pending_payment.refresh_from_db()
+    assert pending_payment.status == "valid"
+
+
+@pytest.fixture
+def checkout(client, user, gateway_mock):
+    client.force_login(user)
+    gateway_mock.createSession.side_effect = lambda body: {
+        "status": "SUCCESS",
+        "GatewayPageURL": f"https://gateway.test/pay/{body['tran_id']}",
+    }
+    event = EventFactory(status="published", ticket_price=100)
+    url = reverse("initiate_payment", args=[event.pk])
+    return lambda token, **order: client.post(url, {"checkout_token": token, **order})
+
+
+@pytest.mark.django_db
+def test_resubmitted_checkout_reuses_payment_session(checkout, gateway_mock):
+    first = checkout("token-a")
+    second = checkout("token-a")
+
+    assert first.status_code == second.status_code == 302
+    assert first.url == second.url
+    assert Payment.objects.count() == 1
+    gateway_mock.createSession.assert_called_once()
+
+
+@pytest.mark.django_db
+def test_new_checkout_token_starts_new_session(checkout, gateway_mock):
+    first = checkout("token-a")
+    second = checkout("token-b")
+
+    assert first.url != second.url
+    assert Payment.objects.count() == 2
+    assert len(set(Payment.objects.values_list("transaction_id", flat=True))) == 2
+
+
+@pytest.mark.django_db
+def test_expired_or_failed_session_is_not_reused(checkout, gateway_mock):
+    checkout("token-a")
+    Payment.objects.update(status="failed")
+    checkout("token-a")
+
+    Payment.objects.filter(status="pending").update(
+        created=timezone.now() - timedelta(seconds=CHECKOUT["SESSION_TTL"] + 1)
+    )
+    checkout("token-a")
+
+    assert gateway_mock.createSession.call_count == 3
+    assert Payment.objects.filter(idempotency_key="token-a").count() == 1
+    assert Payment.objects.count() == 3
+
+
+@pytest.mark.django_db
+def test_resubmitted_checkout_for_another_order_is_refused(checkout, gateway_mock):
+    checkout("token-a", quantity=1)
+
+    assert checkout("token-a", quantity=2).status_code == 409
+    assert checkout("token-a", quantity=1, coupon_code="SAVE10").status_code == 409
+    assert Payment.objects.count() == 1
+    gateway_mock.createSession.assert_called_once()
+
+
+@pytest.mark.django_db
+def test_resubmit_during_session_start_polls_instead_of_waiting(
+    client, checkout, gateway_mock
+):
+    checkout("token-a")
+    # As if the first submit were still waiting on the gateway
+    Payment.objects.update(gateway_url="")
+
+    response = checkout("token-a")
+
+    assert response.status_code == 202
+    payment = Payment.objects.get()
+    status_url = reverse("checkout_status", args=[payment.event_id, "token-a"])
+    assert status_url in response.content.decode()
+    assert client.get(status_url).status_code == 204
+
+    Payment.objects.update(gateway_url="https://gateway.test/pay/1")
+    response = client.get(status_url)
+    assert response["HX-Redirect"] == "https://gateway.test/pay/1"
+
+    Payment.objects.update(status="failed")
+    response = client.get(status_url)
+    assert response["HX-Redirect"] == reverse("event_detail", args=[payment.event_id])
+
+
+@pytest.mark.django_db
+def test_payment_status_fragment_is_only_shown_to_the_payer(client, pending_payment):
+    url = reverse("payment_status_htmx", args=[pending_payment.transaction_id])
+
+    assert client.get(url).status_code == 302
+    client.force_login(UserFactory())
+    assert client.get(url).status_code == 404
+    client.force_login(UserFactory(is_staff=True))
+    assert client.get(url).status_code == 200
+
+
+@pytest.mark.django_db
+def test_payment_success_hides_other_payers_details(
+    client, pending_payment, event, mocker
+):
+    enqueue = mocker.patch("events.views.enqueue_notification")
+    url = reverse("payment_success")
+    data = {"tran_id": pending_payment.transaction_id}
+
+    response = client.get(url, data)
+
+    assert response.status_code == 200
+    assert event.name not in response.content.decode()
+    enqueue.assert_called_once()
+
+    # Callbacks replayed for a settled payment are not queued again
+    Payment.objects.filter(pk=pending_payment.pk).update(status="valid")
+    client.force_login(UserFactory())
+    response = client.get(url, data)
+
+    assert event.name not in response.content.decode()
+    enqueue.assert_called_once()
@@ -0,0 +1,149 @@
+import json
+
+import pytest
+from django.test import RequestFactory
+from django.urls import reverse
+
+from events.constants import RATE_LIMITING, RATE_LIMITS
+from events.ratelimit import (LocalTokenBuckets, client_ip, local_buckets,
+                              reset_rate_limits)
+from events.tests.factories import EventFactory, UserFactory
+
+CONTACT = {
+    "name": "Visitor",
+    "email": "visitor@example.com",
+    "subject": "Question",
+    "message": "When does the next event start?",
+}
+
+
+@pytest.fixture
+def clock(mocker):
+    now = [1000.0]
+    mocker.patch("events.ratelimit.time.monotonic", side_effect=lambda: now[0])
+    return now
+
+
+def test_local_bucket_allows_a_burst_then_refills(clock):
+    buckets = LocalTokenBuckets()
+
+    assert [buckets.take("k", 3, rate=0.5)[0] for _ in range(4)] == [
+        True,
+        True,
+        True,
+        False,
+    ]
+    assert buckets.take("k", 3, rate=0.5) == (False, pytest.approx(2.0))
+
+    clock[0] += 2
+    assert buckets.take("k", 3, rate=0.5)[0]
+    assert not buckets.take("k", 3, rate=0.5)[0]
+
+
+def test_local_buckets_evict_the_least_recently_used(clock):
+    buckets = LocalTokenBuckets(max_keys=2)
+    buckets.take("a", 1, rate=0.1)
+    buckets.take("b", 1, rate=0.1)
+    buckets.take("c", 1, rate=0.1)
+
+    # "a" was evicted, so it starts again from a full bucket
+    assert buckets.take("a", 1, rate=0.1)[0]
+    assert not buckets.take("c", 1, rate=0.1)[0]
+
+
+def test_forwarded_for_is_only_trusted_from_configured_proxies(mocker):
+    request = RequestFactory().get(
+        "/", REMOTE_ADDR="10.0.0.9", HTTP_X_FORWARDED_FOR="1.2.3.4, 203.0.113.7"
+    )
+
+    assert client_ip(request) == "10.0.0.9"
+    mocker.patch.dict(RATE_LIMITING, {"TRUST_FORWARDED_FOR": True})
+    # The spoofable left-most hop is ignored in favour of the proxy's own
+    assert client_ip(request) == "203.0.113.7"
+    mocker.patch.dict(RATE_LIMITING, {"TRUSTED_PROXY_HOPS": 2})
+    assert client_ip(request) == "1.2.3.4"
+    mocker.patch.dict(RATE_LIMITING, {"TRUSTED_PROXY_HOPS": 3})
+    assert client_ip(request) == "10.0.0.9"
+
+
+@pytest.mark.django_db
+def test_contact_form_ignores_spoofed_forwarded_for(client):
+    url = reverse("contact")
+    for _ in range(RATE_LIMITS["contact"]["burst"]):
+        client.post(url, CONTACT, HTTP_X_FORWARDED_FOR="198.51.100.1")
+
+    response = client.post(url, CONTACT, HTTP_X_FORWARDED_FOR="198.51.100.2")
+
+    assert response.status_code == 429
+
+
+@pytest.mark.django_db
+def test_contact_form_is_limited_per_ip(client):
+    burst = RATE_LIMITS["contact"]["burst"]
+    url = reverse("contact")
+    for _ in range(burst):
+        assert client.post(url, CONTACT).status_code == 302
+
+    response = client.post(url, CONTACT)
+
+    assert response.status_code == 429
+    assert int(response["Retry-After"]) >= 1
+    assert b"Too many requests" in response.content
+    # Reading the form is not limited, and other clients are unaffected
+    assert client.get(url).status_code == 200
+    assert client.post(url, CONTACT, REMOTE_ADDR="10.0.0.2").status_code == 302
+
+
+@pytest.mark.django_db
+def test_rsvp_limit_is_per_user_and_htmx_friendly(client, mocker):
+    mocker.patch.dict(RATE_LIMITS, {"rsvp": {**RATE_LIMITS["rsvp"], "burst": 2}})
+    event = EventFactory(status="published", ticket_price=0)
+    url = reverse("rsvp_toggle", kwargs={"pk": event.pk})
+    client.force_login(UserFactory())
+    for _ in range(2):
+        assert client.post(url, HTTP_HX_REQUEST="true").status_code == 200
+
+    response = client.post(url, HTTP_HX_REQUEST="true")
+
+    assert response.status_code == 429
+    assert "showMessage" in json.loads(response["HX-Trigger"])
+    client.force_login(UserFactory())
+    assert client.post(url, HTTP_HX_REQUEST="true").status_code == 200
+
+
+@pytest.mark.django_db
+def test_shared_redis_bucket_is_used_when_available(client, mocker):
+    take = mocker.patch(
+        "events.ratelimit.redis_client.take_token", return_value=(False, 2.5)
+    )
+    local = mocker.patch("events.ratelimit.local_buckets.take")
+    user = UserFactory()
+    event = EventFactory(status="published", ticket_price=10)
+    client.force_login(user)
+
+    response = client.post(reverse("initiate_payment", kwargs={"pk": event.pk}))
+
+    assert response.status_code == 429
+    assert response["Retry-After"] == "3"
+    assert take.call_args.args[0] == f"ratelimit:payment:user:{user.pk}"
+    local.assert_not_called()
+
+
+@pytest.mark.django_db
+def test_middleware_limits_search_but_not_browsing(client, mocker):
+    mocker.patch.dict(RATE_LIMITS, {"search": {**RATE_LIMITS["search"], "burst": 1}})
+    url = reverse("event_list")
+
+    assert client.get(url, {"q": "jazz"}).status_code == 200
+    assert client.get(url, {"q": "rock"}).status_code == 429
+    assert client.get(url).status_code == 200
+
+
+def test_reset_clears_shared_and_local_buckets(mocker, clock):
+    clear = mocker.patch("events.ratelimit.redis_client.clear_rate_limits")
+    local_buckets.take("k", 1, rate=0.1)
+
+    reset_rate_limits()
+
+    clear.assert_called_once_with(RATE_LIMITING["KEY_PREFIX"])
+    assert local_buckets.take("k", 1, rate=0.1)[0]
@@ -0,0 +1,177 @@
+from datetime import timedelta
+from decimal import Decimal
+
+import pytest
+from django.core.management import call_command
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from events.models import RSVP, Payment
+from events.payment_gateway import SSLCommerzGatewayClient
+from events.reconciliation import reconcile_payments
+from events.tests.factories import EventFactory, UserFactory
+
+
+class FakeGatewayClient:
+    """Local stand-in for the gateway transaction query API."""
+
+    outcomes = {}
+
+    def __init__(self):
+        self.queried = []
+
+    def query_transaction(self, tran_id, amount=None, currency=None):
+        self.queried.append(tran_id)
+        outcome = self.outcomes.get(tran_id)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+
+@pytest.fixture(autouse=True)
+def trending_mock(mocker):
+    return mocker.patch("events.handlers.record_trending_activity")
+
+
+@pytest.fixture
+def event():
+    return EventFactory(ticket_price=100, tickets_sold=0)
+
+
+def make_payment(event, tran_id, age=3600, status="pending"):
+    payment = Payment.objects.create(
+        user=UserFactory(),
+        event=event,
+        amount=100,
+        status=status,
+        transaction_id=tran_id,
+    )
+    Payment.objects.filter(pk=payment.pk).update(
+        created=timezone.now() - timedelta(seconds=age)
+    )
+    return payment
+
+
+@pytest.mark.django_db
+def test_reconcile_payments_settles_stale_pending_payments(event, mocker):
+    paid = [make_payment(event, f"txn_paid_{i}") for i in range(3)]
+    abandoned = make_payment(event, "txn_abandoned")
+    # Not settled yet, but still within its expiry
+    unknown = make_payment(event, "txn_unknown", age=2000)
+    erroring = make_payment(event, "txn_error")
+    recent = make_payment(event, "txn_recent", age=60)
+    mocker.patch.object(
+        FakeGatewayClient,
+        "outcomes",
+        {
+            **{payment.transaction_id: "valid" for payment in paid},
+            "txn_abandoned": "failed",
+            "txn_error": ConnectionError("gateway down"),
+            "txn_recent": "valid",
+        },
+    )
+    client = FakeGatewayClient()
+
+    totals = reconcile_payments(older_than=1800, chunk_size=2, client=client)
+
+    assert totals == {"checked": 6, "valid": 3, "failed": 1, "expired": 0}
+    assert "txn_recent" not in client.queried
+    event.refresh_from_db()
+    assert event.tickets_sold == 3
+    assert RSVP.objects.attending().filter(event=event).count() == 3
+    assert set(Payment.objects.filter(status="valid")) == set(paid)
+    abandoned.refresh_from_db()
+    assert abandoned.status == "failed"
+    for payment in (unknown, erroring, recent):
+        payment.refresh_from_db()
+        assert payment.status == "pending"
+
+
+@pytest.mark.django_db
+def test_reconcile_payments_skips_payments_settled_meanwhile(event, mocker):
+    payment = make_payment(event, "txn_race")
+    mocker.patch.object(FakeGatewayClient, "outcomes", {"txn_race": "valid"})
+
+    def settle_first(tran_id, amount, currency):
+        Payment.objects.filter(pk=payment.pk).update(status="valid")
+        return "valid"
+
+    client = FakeGatewayClient()
+    client.query_transaction = settle_first
+
+    assert reconcile_payments(client=client)["valid"] == 0
+    event.refresh_from_db()
+    assert event.tickets_sold == 0
+
+
+@pytest.mark.django_db
+def test_reconcile_payments_fails_payments_of_the_wrong_amount(event, mocker):
+    underpaid = make_payment(event, "txn_underpaid")
+    paid = make_payment(event, "txn_paid")
+    sslcz = mocker.Mock()
+    sslcz.transaction_query_tranid.side_effect = lambda tran_id: {
+        "APIConnect": "DONE",
+        "element": [
+            {
+                "status": "VALID",
+                "amount": "10.00" if tran_id == "txn_underpaid" else "100.00",
+                "currency": "BDT",
+            }
+        ],
+    }
+
+    totals = reconcile_payments(client=SSLCommerzGatewayClient(sslcz))
+
+    assert (totals["valid"], totals["failed"]) == (1, 1)
+    underpaid.refresh_from_db()
+    paid.refresh_from_db()
+    assert (underpaid.status, paid.status) == ("failed", "valid")
+    event.refresh_from_db()
+    assert event.tickets_sold == 1
+
+
+@pytest.mark.django_db
+def test_reconcile_payments_command_uses_configured_client(event, mocker):
+    path = "events.tests.test_reconciliation.FakeGatewayClient"
+    make_payment(event, "txn_cmd")
+    # The command imports its own copy of this module by dotted path
+    mocker.patch.object(import_string(path), "outcomes", {"txn_cmd": "valid"})
+
+    call_command("reconcile_payments", client=path, workers=2)
+
+    assert Payment.objects.get(transaction_id="txn_cmd").status == "valid"
+
+
+def test_sslcommerz_client_normalizes_transaction_status(mocker):
+    sslcz = mocker.Mock()
+    client = SSLCommerzGatewayClient(sslcz)
+
+    sslcz.transaction_query_tranid.return_value = {
+        "APIConnect": "DONE",
+        "element": [{"status": "FAILED"}, {"status": "VALID"}],
+    }
+    assert client.query_transaction("txn") == "valid"
+
+    sslcz.transaction_query_tranid.return_value = {
+        "APIConnect": "DONE",
+        "element": [{"status": "CANCELLED"}],
+    }
+    assert client.query_transaction("txn") == "failed"
+
+    sslcz.transaction_query_tranid.return_value = {
+        "APIConnect": "DONE",
+        "element": [{"status": "PENDING"}],
+    }
+    assert client.query_transaction("txn") is None
+
+    sslcz.transaction_query_tranid.return_value = {
+        "APIConnect": "DONE",
+        "element": [{"status": "VALID", "amount": "100.00", "currency": "BDT"}],
+    }
+    assert client.query_transaction("txn", Decimal("100.00"), "BDT") == "valid"
+    assert client.query_transaction("txn", Decimal("150.00"), "BDT") == "failed"
+    assert client.query_transaction("txn", Decimal("100.00"), "USD") == "failed"
+
+    sslcz.transaction_query_tranid.return_value = {"APIConnect": "FAILED"}
+    with pytest.raises(ConnectionError):
+        client.query_transaction("txn")
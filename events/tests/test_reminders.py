@@ -0,0 +1,123 @@
+from datetime import date, datetime, time
+
+import pytest
+from django.core.management import call_command
+from django.utils import timezone
+
+from events import reminders
+from events.constants import RSVPStatus
+from events.models import RSVP, OutboxEmail, ReminderSchedule
+from events.reminders import events_starting_between, send_reminders
+from events.tests.factories import EventFactory, UserFactory
+
+NOW = timezone.make_aware(datetime(2030, 1, 1, 12, 0))
+
+
+def make_event(day, at, **kwargs):
+    return EventFactory(date=day, time=at, status="published", ticket_price=0, **kwargs)
+
+
+def attend(event, *users):
+    RSVP.objects.bulk_create(
+        RSVP(event=event, user=user, status=RSVPStatus.ATTENDING) for user in users
+    )
+
+
+@pytest.fixture
+def events():
+    return {
+        "started": make_event(date(2030, 1, 1), time(11, 0)),
+        "soon": make_event(date(2030, 1, 1), time(13, 0)),
+        "tomorrow": make_event(date(2030, 1, 2), time(10, 0)),
+        "later": make_event(date(2030, 1, 2), time(13, 0)),
+    }
+
+
+@pytest.mark.django_db
+def test_events_starting_between_is_one_range_query(events, django_assert_num_queries):
+    EventFactory(
+        date=date(2030, 1, 1), time=time(14, 0), status="draft", ticket_price=0
+    )
+
+    with django_assert_num_queries(1):
+        found = list(
+            events_starting_between(NOW, timezone.make_aware(datetime(2030, 1, 2, 12)))
+        )
+
+    assert found == [events["soon"], events["tomorrow"]]
+
+
+@pytest.mark.django_db
+def test_reminders_are_one_digest_per_attendee(events, mocker):
+    both, one, elsewhere = UserFactory.create_batch(3)
+    attend(events["soon"], both, one)
+    attend(events["tomorrow"], both)
+    attend(events["later"], elsewhere)
+    render = mocker.spy(reminders, "render_to_string")
+
+    assert send_reminders("day", now=NOW) == 2
+
+    digests = {email.recipients[0]: email for email in OutboxEmail.objects.all()}
+    assert set(digests) == {both.email, one.email}
+    assert digests[both.email].subject == "Reminder: 2 of your events start soon"
+    assert events["soon"].name in digests[both.email].html_body
+    assert events["tomorrow"].name in digests[both.email].html_body
+    assert digests[one.email].subject == f"Reminder: {events['soon'].name} starts soon"
+    fragments = [
+        call for call in render.call_args_list if "_reminder_event" in call.args[0]
+    ]
+    assert len(fragments) == 2
+
+
+@pytest.mark.django_db
+def test_reruns_do_not_resend_and_later_runs_pick_up_new_events(events):
+    user = UserFactory()
+    attend(events["soon"], user)
+    attend(events["later"], user)
+
+    assert send_reminders("day", now=NOW) == 1
+    assert send_reminders("day", now=NOW) == 0
+    assert send_reminders("day", now=timezone.make_aware(datetime(2030, 1, 1, 14))) == 1
+
+    subjects = list(OutboxEmail.objects.values_list("subject", flat=True))
+    assert subjects == [
+        f"Reminder: {events['soon'].name} starts soon",
+        f"Reminder: {events['later'].name} starts soon",
+    ]
+
+
+@pytest.mark.django_db
+def test_interrupted_run_resumes_after_the_watermark(events, mocker):
+    users = UserFactory.create_batch(3)
+    attend(events["soon"], *users)
+    enqueue = mocker.patch(
+        "events.reminders.enqueue_messages",
+        side_effect=[1, RuntimeError("crashed")],
+    )
+
+    with pytest.raises(RuntimeError):
+        send_reminders("hour", now=NOW, batch_size=1)
+
+    schedule = ReminderSchedule.objects.get(window="hour")
+    assert schedule.last_user_id == users[0].pk
+    assert schedule.run_until is not None
+
+    enqueue.side_effect = None
+    enqueue.return_value = 1
+    assert send_reminders("hour", now=NOW, batch_size=1) == 2
+    resumed = [call.args[0][0].to for call in enqueue.call_args_list[2:]]
+    assert resumed == [[users[1].email], [users[2].email]]
+    schedule.refresh_from_db()
+    assert schedule.run_until is None
+    assert schedule.last_user_id == 0
+
+
+@pytest.mark.django_db
+def test_send_reminders_command_runs_every_window(mocker):
+    run = mocker.patch(
+        "events.management.commands.send_reminders.send_reminders", return_value=0
+    )
+
+    call_command("send_reminders")
+
+    assert [call.args[0] for call in run.call_args_list] == ["day", "hour"]
@@ -0,0 +1,131 @@
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+import pytest
+from django.contrib.auth.models import Group
+from django.core.management import call_command
+from django.urls import reverse
+from django.utils import timezone
+
+from events.models import RevenueLedger
+from events.payment_utils import payment_handler
+from events.revenue import rebuild_ledger, record_payments, revenue_series
+from events.tests.factories import EventFactory, PaymentFactory, UserFactory
+
+
+@pytest.fixture
+def organizer():
+    user = UserFactory()
+    user.groups.add(Group.objects.get_or_create(name="Organizer")[0])
+    return user
+
+
+@pytest.fixture
+def event(organizer):
+    return EventFactory(organizer=organizer, ticket_price=50, tickets_sold=0)
+
+
+@pytest.fixture
+def today():
+    return timezone.localdate()
+
+
+def paid_on(event, day, amount=50):
+    paid_at = timezone.make_aware(datetime.combine(day, datetime.min.time()))
+    return PaymentFactory(event=event, amount=amount, status="valid", paid_at=paid_at)
+
+
+@pytest.mark.django_db
+def test_validated_payment_is_added_to_ledger(event, today, mocker):
+    mocker.patch("events.handlers.record_trending_activity")
+    mocker.patch.object(payment_handler, "sslcz").validationResponse.return_value = True
+    payment = PaymentFactory(event=event, amount=50, status="pending")
+
+    payment_handler.validate_payment({"tran_id": payment.transaction_id})
+    payment_handler.validate_payment({"tran_id": payment.transaction_id})
+
+    row = RevenueLedger.objects.get()
+    assert (row.event, row.organizer, row.day) == (event, event.organizer, today)
+    assert row.revenue == Decimal("50")
+    assert row.tickets == 1
+
+
+@pytest.mark.django_db
+def test_rebuild_matches_incremental_rollup(event, today):
+    payments = [
+        paid_on(event, today - timedelta(days=40)),
+        paid_on(event, today - timedelta(days=2), amount=20),
+        paid_on(event, today - timedelta(days=2)),
+        paid_on(event, today),
+    ]
+    PaymentFactory(event=event, amount=999, status="failed")
+    record_payments(payments)
+    incremental = list(RevenueLedger.objects.values_list("day", "revenue", "tickets"))
+
+    assert rebuild_ledger(chunk_days=7) == 3
+    assert list(RevenueLedger.objects.values_list("day", "revenue", "tickets")) == (
+        incremental
+    )
+    assert RevenueLedger.objects.get(day=today - timedelta(days=2)).revenue == 70
+
+
+@pytest.mark.django_db
+def test_rebuild_command_limits_range(event, today):
+    paid_on(event, today - timedelta(days=10))
+    RevenueLedger.objects.create(
+        event=event, day=today, revenue=Decimal("1"), tickets=1
+    )
+
+    call_command("rebuild_revenue_ledger", since=str(today - timedelta(days=10)))
+
+    assert list(RevenueLedger.objects.values_list("day", flat=True)) == [
+        today - timedelta(days=10)
+    ]
+
+
+@pytest.mark.django_db
+def test_revenue_series_fills_missing_days(event, today):
+    record_payments([paid_on(event, today)])
+
+    series = revenue_series(today - timedelta(days=2), today)
+
+    assert [point["tickets"] for point in series] == [0, 0, 1]
+    assert series[-1]["revenue"] == Decimal("50")
+
+
+@pytest.mark.django_db
+def test_revenue_endpoint_scopes_organizers_to_their_events(
+    client, organizer, event, today
+):
+    other_event = EventFactory(ticket_price=10)
+    record_payments([paid_on(event, today), paid_on(other_event, today, amount=10)])
+    client.force_login(organizer)
+
+    response = client.get(reverse("revenue_timeseries"), {"start": str(today)})
+
+    assert response.status_code == 200
+    data = response.json()
+    assert data["total_revenue"] == "50.00"
+    assert data["series"] == [
+        {"day": today.isoformat(), "revenue": "50.00", "tickets": 1}
+    ]
+
+
+@pytest.mark.django_db
+def test_revenue_endpoint_renders_htmx_chart_and_validates_input(
+    client, organizer, today
+):
+    client.force_login(organizer)
+    url = reverse("revenue_timeseries")
+
+    response = client.get(url, HTTP_HX_REQUEST="true")
+    assert response.status_code == 200
+    assert b'id="revenue-chart"' in response.content
+
+    assert client.get(url, {"start": "not-a-date"}).status_code == 400
+    assert client.get(url, {"start": str(today - timedelta(days=400))}).status_code == (
+        400
+    )
+
+    client.force_login(UserFactory())
+    assert client.get(url).status_code == 403
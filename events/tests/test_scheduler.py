@@ -0,0 +1,130 @@
+import threading
+from datetime import timedelta
+
+import pytest
+from django.utils import timezone
+
+from events import scheduler
+from events.constants import PERIODIC_TASKS, SCHEDULER
+from events.models import Job, PeriodicTask
+from events.scheduler import LeaderLock, run_scheduler, schedule_due_tasks
+
+TASKS = {
+    "flush": {"job": "views.flush", "every": 60},
+    "reminders": {
+        "job": "reminders.send",
+        "every": 300,
+        "jitter": 30,
+        "payload": {"window": "day"},
+    },
+}
+
+
+@pytest.fixture(autouse=True)
+def tasks(mocker):
+    mocker.patch.dict(PERIODIC_TASKS, TASKS, clear=True)
+
+
+@pytest.mark.django_db
+def test_due_tasks_are_enqueued_once_per_interval():
+    now = timezone.now()
+    PeriodicTask.objects.create(name="flush", next_run_at=now)
+    PeriodicTask.objects.create(name="reminders", next_run_at=now)
+
+    assert sorted(schedule_due_tasks(now)) == ["flush", "reminders"]
+    # A second scheduler pass in the same interval finds nothing due
+    assert schedule_due_tasks(now + timedelta(seconds=30)) == []
+
+    jobs = {job.name: job for job in Job.objects.all()}
+    assert set(jobs) == {"views.flush", "reminders.send"}
+    assert jobs["reminders.send"].payload == {"window": "day"}
+    reminders = PeriodicTask.objects.get(name="reminders")
+    assert reminders.runs == 1
+    assert reminders.last_run_at == now
+    assert reminders.last_job == jobs["reminders.send"]
+    assert (
+        now + timedelta(seconds=300)
+        <= reminders.next_run_at
+        <= now + timedelta(seconds=330)
+    )
+
+
+@pytest.mark.django_db
+def test_new_tasks_start_within_their_jitter():
+    now = timezone.now()
+
+    assert schedule_due_tasks(now) == ["flush"]
+
+    reminders = PeriodicTask.objects.get(name="reminders")
+    assert now <= reminders.next_run_at <= now + timedelta(seconds=30)
+
+
+@pytest.mark.django_db
+def test_run_is_skipped_while_the_previous_one_is_unfinished():
+    now = timezone.now()
+    task = PeriodicTask.objects.create(name="flush", next_run_at=now)
+    schedule_due_tasks(now)
+
+    later = now + timedelta(seconds=61)
+    assert "flush" not in schedule_due_tasks(later)
+    task.refresh_from_db()
+    assert (task.runs, task.skips) == (1, 1)
+
+    Job.objects.update(status="succeeded")
+    assert "flush" in schedule_due_tasks(later + timedelta(seconds=61))
+    assert Job.objects.filter(name="views.flush").count() == 2
+
+
+@pytest.mark.django_db
+def test_a_slot_taken_by_another_scheduler_is_not_enqueued_again(mocker):
+    mocker.patch.dict(PERIODIC_TASKS, {"flush": TASKS["flush"]}, clear=True)
+    now = timezone.now()
+    PeriodicTask.objects.create(name="flush", next_run_at=now)
+    jitter = scheduler._jitter
+    calls = []
+
+    def race(spec):
+        calls.append(spec)
+        if len(calls) == 2:
+            # After this pass loaded the due task, a second leader claims it
+            assert schedule_due_tasks(now) == ["flush"]
+        return jitter(spec)
+
+    mocker.patch("events.scheduler._jitter", side_effect=race)
+
+    assert schedule_due_tasks(now) == []
+    assert Job.objects.count() == 1
+    assert PeriodicTask.objects.get(name="flush").runs == 1
+
+
+def test_redis_lock_elects_one_leader(mocker):
+    hold = mocker.patch("events.scheduler.redis_client.hold_lock")
+    release = mocker.patch("events.scheduler.redis_client.release_lock")
+    leader, follower = LeaderLock(), LeaderLock()
+
+    hold.side_effect = lambda key, token, ttl: token == leader.token
+    assert leader.acquire()
+    assert not follower.acquire()
+
+    leader.release()
+    follower.release()
+    release.assert_called_once_with(SCHEDULER["LOCK_KEY"], leader.token)
+
+
+def test_without_redis_the_single_instance_leads(mocker):
+    mocker.patch("events.scheduler.redis_client.hold_lock", return_value=None)
+
+    assert LeaderLock().acquire()
+
+
+def test_only_the_leader_schedules(mocker):
+    mocker.patch("events.scheduler.LeaderLock.acquire", return_value=False)
+    mocker.patch("events.scheduler.db_connection")
+    schedule = mocker.patch("events.scheduler.schedule_due_tasks")
+    stop = threading.Event()
+    stop.set()
+    mocker.patch.object(stop, "is_set", side_effect=[False, True])
+
+    run_scheduler(stop)
+
+    schedule.assert_not_called()
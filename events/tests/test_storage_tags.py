@@ -0,0 +1,77 @@
+import cloudinary
+import pytest
+from django.template import Context, Template
+
+from events.images import generate_derivatives
+from events.models import Job
+from events.storage_utils import _build_transformation_url, transformation_url
+from events.tests.factories import EventFactory, UserFactory, image_file
+
+
+@pytest.fixture(autouse=True)
+def url_cache(mocker):
+    mocker.patch.object(cloudinary.config(), "cloud_name", "demo", create=True)
+    _build_transformation_url.cache_clear()
+    yield
+    _build_transformation_url.cache_clear()
+
+
+@pytest.fixture
+def on_cloudinary(mocker):
+    for module in ("images", "templatetags.image_tags", "templatetags.storage_tags"):
+        mocker.patch(f"events.{module}.is_cloudinary_storage", return_value=True)
+
+
+def render(source, **context):
+    return Template("{% load storage_tags image_tags %}" + source).render(
+        Context(context)
+    )
+
+
+def test_transformation_urls_are_memoized(mocker):
+    build = mocker.spy(cloudinary.utils, "cloudinary_url")
+
+    first = transformation_url("media/event_images/poster_x1", width=640)
+    again = transformation_url("media/event_images/poster_x1", width=640, crop="limit")
+
+    assert first == again
+    assert "/image/upload/c_limit,f_auto,q_auto,w_640/" in first
+    assert build.call_count == 1
+    assert transformation_url("media/event_images/poster_x1") != first
+    assert build.call_count == 2
+
+
+@pytest.mark.django_db
+def test_cloudinary_images_use_transformations(on_cloudinary):
+    event = EventFactory(ticket_price=0, image=image_file())
+
+    assert render("{% optimized_image_url event.image 320 %}", event=event).endswith(
+        f"w_320/v1/{event.image.name}"
+    )
+    html = render("{% responsive_image event %}", event=event)
+    assert "c_limit,f_auto,q_auto,w_1280" in html
+    assert "type=" not in html
+    # Cloudinary resizes on delivery, so no derivative job is queued
+    assert not Job.objects.filter(name="images.derivatives").exists()
+
+
+@pytest.mark.django_db
+def test_local_storage_falls_back_to_derivatives():
+    event = EventFactory(ticket_price=0, image=image_file())
+    generate_derivatives(event.pk)
+    event.refresh_from_db()
+    user = UserFactory()
+    user.profile.profile_picture = image_file(name="me.png")
+    user.profile.save()
+
+    assert render("{% optimized_image_url event.image 500 %}", event=event).endswith(
+        "-640w.webp"
+    )
+    assert render("{% optimized_image_url event.image %}", event=event) == (
+        event.image.url
+    )
+    # Profile pictures have no derivatives and keep their original URL
+    assert render(
+        "{% optimized_image_url user.profile.profile_picture 64 %}", user=user
+    ) == (user.profile.profile_picture.url)
+    assert render("{% optimized_image_url missing 64 %}") == ""
@@ -0,0 +1,64 @@
+from datetime import timedelta
+
+import pytest
+from django.urls import reverse
+from django.utils import timezone
+
+from events.models import RSVP
+from events.tests.factories import EventFactory, UserFactory
+from events.trending import get_trending_events
+
+
+@pytest.fixture
+def upcoming_date():
+    return timezone.localdate() + timedelta(days=7)
+
+
+@pytest.fixture
+def redis_mock(mocker):
+    return mocker.patch("events.trending.redis_client")
+
+
+@pytest.mark.django_db
+def test_trending_events_follow_redis_ranking(redis_mock, upcoming_date):
+    first = EventFactory(status="published", date=upcoming_date, ticket_price=0)
+    second = EventFactory(status="published", date=upcoming_date, ticket_price=0)
+    past = EventFactory(
+        status="published", date=upcoming_date - timedelta(days=30), ticket_price=0
+    )
+    redis_mock.get_trending.return_value = [
+        (past.pk, 50.0),
+        (second.pk, 20.0),
+        (first.pk, 10.0),
+    ]
+
+    trending = get_trending_events(limit=2)
+
+    assert trending == [second, first]
+    assert trending[0].trending_score == 20.0
+
+
+@pytest.mark.django_db
+def test_trending_events_fall_back_to_database(redis_mock, upcoming_date):
+    redis_mock.get_trending.return_value = None
+    quiet = EventFactory(
+        status="published", date=upcoming_date, ticket_price=0, view_count=3
+    )
+    popular = EventFactory(
+        status="published", date=upcoming_date, ticket_price=0, view_count=1
+    )
+    RSVP.objects.create(event=popular, user=UserFactory())
+    EventFactory(status="draft", date=upcoming_date, ticket_price=0, view_count=99)
+
+    assert get_trending_events() == [popular, quiet]
+
+
+@pytest.mark.django_db
+def test_trending_fragment_renders(client, redis_mock, upcoming_date):
+    event = EventFactory(status="published", date=upcoming_date, ticket_price=0)
+    redis_mock.get_trending.return_value = [(event.pk, 1.0)]
+
+    response = client.get(reverse("trending_events_htmx"))
+
+    assert response.status_code == 200
+    assert event.name in response.content.decode()
@@ -0,0 +1,59 @@
+import pytest
+
+from events.tests.factories import EventFactory
+from events.view_tracking import (ViewCounterBuffer, persist_event_views,
+                                  persist_pending_views)
+
+
+@pytest.fixture
+def redis_mock(mocker):
+    return mocker.patch("events.view_tracking.redis_client")
+
+
+@pytest.mark.django_db
+def test_buffer_flushes_to_redis_in_one_batch(redis_mock):
+    redis_mock.flush_event_views.return_value = True
+    buffer = ViewCounterBuffer(flush_threshold=3, flush_interval=3600)
+
+    buffer.record(1)
+    buffer.record(2)
+    assert buffer.pending(1) == 1
+    redis_mock.flush_event_views.assert_not_called()
+
+    buffer.record(1)
+
+    redis_mock.flush_event_views.assert_called_once_with({1: 2, 2: 1})
+    assert buffer.pending(1) == 0
+
+
+@pytest.mark.django_db
+def test_buffer_persists_to_database_when_redis_unavailable(redis_mock):
+    redis_mock.flush_event_views.return_value = False
+    event = EventFactory(ticket_price=0, view_count=4)
+    buffer = ViewCounterBuffer(flush_threshold=2, flush_interval=3600)
+
+    buffer.record(event.pk)
+    buffer.record(event.pk)
+
+    event.refresh_from_db()
+    assert event.view_count == 6
+
+
+@pytest.mark.django_db
+def test_persist_pending_views_updates_view_counts(redis_mock):
+    first = EventFactory(ticket_price=0)
+    second = EventFactory(ticket_price=0, view_count=10)
+    redis_mock.pop_pending_event_views.return_value = {first.pk: 3, second.pk: 5}
+
+    assert persist_pending_views() == 2
+
+    first.refresh_from_db()
+    second.refresh_from_db()
+    assert first.view_count == 3
+    assert second.view_count == 15
+
+
+@pytest.mark.django_db
+def test_persist_event_views_ignores_empty_counts():
+    event = EventFactory(ticket_price=0)
+    assert persist_event_views({event.pk: 0}) == 0
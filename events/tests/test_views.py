@@ -1,6 +1,9 @@
 import pytest
 from django.urls import reverse
 
+from events.models import RSVP
+from events.tests.factories import EventFactory, UserFactory
+
 
 @pytest.mark.django_db
 def test_home_view_status_code(client):
@@ -20,3 +23,62 @@ def test_home_view_context_data(client):
     assert "featured_events" in response.context
     assert "total_events" in response.context
     assert "total_categories" in response.context
+
+
+@pytest.mark.django_db
+def test_event_detail_participant_preview_is_bounded(client):
+    event = EventFactory(status="published", ticket_price=0)
+    for user in UserFactory.create_batch(7):
+        RSVP.objects.create(event=event, user=user)
+
+    response = client.get(reverse("event_detail", kwargs={"pk": event.pk}))
+
+    assert response.status_code == 200
+    detail_event = response.context["event"]
+    assert detail_event.attendee_count == 7
+    assert len(detail_event.participant_preview) == 5
+    assert "+2 more" in response.content.decode()
+
+
+@pytest.mark.django_db
+def test_event_detail_query_count_is_fixed(client, django_assert_max_num_queries):
+    small_event = EventFactory(status="published", ticket_price=0)
+    RSVP.objects.create(event=small_event, user=UserFactory())
+    large_event = EventFactory(status="published", ticket_price=0)
+    for user in UserFactory.create_batch(20):
+        RSVP.objects.create(event=large_event, user=user)
+
+    with django_assert_max_num_queries(3) as small_queries:
+        client.get(reverse("event_detail", kwargs={"pk": small_event.pk}))
+    with django_assert_max_num_queries(len(small_queries)):
+        client.get(reverse("event_detail", kwargs={"pk": large_event.pk}))
+
+
+@pytest.mark.django_db
+def test_event_detail_counts_only_attending_rsvps(client):
+    event = EventFactory(status="published", ticket_price=0)
+    RSVP.objects.create(event=event, user=UserFactory(), status="attending")
+    RSVP.objects.create(event=event, user=UserFactory(), status="maybe")
+    RSVP.objects.create(event=event, user=UserFactory(), status="not_attending")
+
+    response = client.get(reverse("event_detail", kwargs={"pk": event.pk}))
+
+    assert response.context["event"].attendee_count == 1
+    assert len(response.context["event"].participant_preview) == 1
+
+
+@pytest.mark.django_db
+def test_rsvp_toggle_records_rsvp_status(client, mocker):
+    mocker.patch("events.handlers.record_trending_activity")
+    user = UserFactory()
+    event = EventFactory(status="published", ticket_price=0)
+    client.force_login(user)
+    url = reverse("rsvp_toggle", kwargs={"pk": event.pk})
+
+    client.post(url)
+    assert RSVP.objects.get(event=event, user=user).status == "attending"
+    assert event.participants.filter(pk=user.pk).exists()
+
+    client.post(url, {"status": "maybe"})
+    assert RSVP.objects.get(event=event, user=user).status == "maybe"
+    assert not event.participants.filter(pk=user.pk).exists()
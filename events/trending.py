@@ -0,0 +1,48 @@
+"""
+Trending events leaderboard for EventMan.
+Reads the decayed Redis sorted set, with a database fallback.
+"""
+
+from typing import List
+
+from django.db.models import Count, F, Q
+from django.utils import timezone
+
+from .constants import TRENDING, RSVPStatus
+from .models import Event
+from .redis_utils import redis_client
+
+
+def record_trending_activity(event_id, activity, count=1):
+    """Add the weight of an activity ("view", "rsvp", "payment") to an event."""
+    weight = TRENDING["WEIGHTS"][activity] * count
+    return redis_client.add_trending_scores({event_id: weight})
+
+
+def get_trending_events(limit=None) -> List[Event]:
+    """Top upcoming published events by trending score."""
+    limit = limit or TRENDING["DEFAULT_LIMIT"]
+    candidates = Event.objects.filter(
+        status="published", date__gte=timezone.localdate()
+    ).select_related("category")
+
+    # Over-fetch so past or unpublished events in the set can be skipped
+    ranked = redis_client.get_trending(limit * 3)
+    if ranked:
+        events = candidates.in_bulk([event_id for event_id, _ in ranked])
+        trending = []
+        for event_id, score in ranked:
+            event = events.get(event_id)
+            if event is not None:
+                event.trending_score = score
+                trending.append(event)
+        if trending:
+            return trending[:limit]
+
+    return list(
+        candidates.annotate(
+            trending_score=F("view_count")
+            + Count("rsvps", filter=Q(rsvps__status=RSVPStatus.ATTENDING))
+            * TRENDING["WEIGHTS"]["rsvp"]
+        ).order_by("-trending_score", "date", "time")[:limit]
+    )
@@ -1,11 +1,12 @@
 from django.urls import path
 
 from . import views
-from .views import (AdminDashboardView, CachedDashboardStatsView,
-                    CachedEventDetailView, CategoryCreateView,
-                    CategoryDeleteView, CategoryListView, CategoryUpdateView,
-                    CheckoutView, CustomPasswordChangeDoneView,
-                    CustomPasswordChangeView, DashboardRedirectView,
+from .views import (AdminDashboardView, BulkRegistrationView,
+                    CachedDashboardStatsView, CachedEventDetailView,
+                    CategoryCreateView, CategoryDeleteView, CategoryListView,
+                    CategoryUpdateView, CheckoutView,
+                    CustomPasswordChangeDoneView, CustomPasswordChangeView,
+                    DashboardRedirectView, EventBroadcastView, EventCancelView,
                     EventCreateView, EventDeleteView, EventListView,
                     EventUpdateView, HealthCheckView, HomeView,
                     OrganizerDashboardView, ParticipantDashboardView,
@@ -13,7 +14,7 @@ from .views import (AdminDashboardView, CachedDashboardStatsView,
                     RSVPToggleView, get_admin_payments_htmx,
                     get_admin_stats_htmx, get_live_stats_htmx,
                     get_organizer_events_htmx, get_organizer_stats_htmx,
-                    get_participant_payments_htmx)
+                    get_participant_payments_htmx, get_trending_events_htmx)
 
 urlpatterns = [
     # Home and dashboard URLs
@@ -37,12 +38,29 @@ urlpatterns = [
     path("participants/", ParticipantListView.as_view(), name="participant_list"),
     # Event URLs with HTMX support
     path("events/", EventListView.as_view(), name="event_list"),
+    path("events/trending/", get_trending_events_htmx, name="trending_events_htmx"),
     path("events/<int:pk>/", CachedEventDetailView.as_view(), name="event_detail"),
     path("events/new/", EventCreateView.as_view(), name="event_create"),
     path("events/<int:pk>/edit/", EventUpdateView.as_view(), name="event_update"),
     path("events/<int:pk>/delete/", EventDeleteView.as_view(), name="event_delete"),
+    path("events/<int:pk>/cancel/", EventCancelView.as_view(), name="event_cancel"),
+    path(
+        "events/<int:pk>/broadcast/",
+        EventBroadcastView.as_view(),
+        name="event_broadcast",
+    ),
+    path(
+        "events/<int:pk>/cancellation/",
+        views.cancellation_progress_htmx,
+        name="cancellation_progress_htmx",
+    ),
     path("events/<int:pk>/checkout/", CheckoutView.as_view(), name="event_checkout"),
     path("events/<int:pk>/rsvp/", RSVPToggleView.as_view(), name="rsvp_toggle"),
+    path(
+        "events/<int:pk>/register-bulk/",
+        BulkRegistrationView.as_view(),
+        name="event_register_bulk",
+    ),
     # Category URLs
     path("categories/", CategoryListView.as_view(), name="category_list"),
     path("categories/new/", CategoryCreateView.as_view(), name="category_create"),
@@ -79,14 +97,25 @@ urlpatterns = [
     path("organizer-events/", get_organizer_events_htmx, name="organizer_events_htmx"),
     path("admin-stats/", get_admin_stats_htmx, name="admin_stats_htmx"),
     path("admin-payments/", get_admin_payments_htmx, name="admin_payments_htmx"),
+    path("revenue/", views.revenue_timeseries, name="revenue_timeseries"),
     # Payment URLs
     path(
         "event/<int:pk>/initiate_payment/",
         views.initiate_payment,
         name="initiate_payment",
     ),
+    path(
+        "event/<int:pk>/checkout/<str:token>/status/",
+        views.checkout_status,
+        name="checkout_status",
+    ),
     path("payment_success/", views.payment_success, name="payment_success"),
     path("payment_fail/", views.payment_fail, name="payment_fail"),
     path("payment_ipn/", views.payment_ipn, name="payment_ipn"),
+    path(
+        "payment_status/<str:tran_id>/",
+        views.payment_status_htmx,
+        name="payment_status_htmx",
+    ),
     path("contact/", views.contact_view, name="contact"),  # New contact page URL
 ]
@@ -0,0 +1,111 @@
+"""
+Buffered event view tracking for EventMan.
+Views are counted in-process, flushed to Redis in pipelined batches and
+periodically persisted to Event.view_count.
+"""
+
+import atexit
+import logging
+import threading
+import time
+from collections import Counter
+from typing import Dict
+
+from django.db.models import Case, F, IntegerField, Value, When
+
+from .constants import VIEW_TRACKING
+from .models import Event
+from .redis_utils import redis_client
+
+logger = logging.getLogger(__name__)
+
+
+def persist_event_views(view_counts: Dict[int, int]) -> int:
+    """Add view counts to Event.view_count in batched UPDATE statements."""
+    batch_size = VIEW_TRACKING["PERSIST_BATCH_SIZE"]
+    items = [(pk, count) for pk, count in view_counts.items() if count > 0]
+    updated = 0
+
+    for start in range(0, len(items), batch_size):
+        batch = items[start : start + batch_size]
+        increment = Case(
+            *[When(pk=pk, then=Value(count)) for pk, count in batch],
+            default=Value(0),
+            output_field=IntegerField(),
+        )
+        updated += Event.objects.filter(pk__in=[pk for pk, _ in batch]).update(
+            view_count=F("view_count") + increment
+        )
+
+    return updated
+
+
+def persist_pending_views() -> int:
+    """Move the view counts pending in Redis into the database."""
+    pending = redis_client.pop_pending_event_views()
+    if not pending:
+        return 0
+
+    try:
+        return persist_event_views(pending)
+    except Exception as e:
+        logger.error(f"Failed to persist views, returning them to Redis: {e}")
+        redis_client.flush_event_views(pending)
+        raise
+
+
+class ViewCounterBuffer:
+    """Thread-safe in-process buffer of event view increments."""
+
+    def __init__(self, flush_threshold=None, flush_interval=None):
+        self.flush_threshold = flush_threshold or VIEW_TRACKING["FLUSH_THRESHOLD"]
+        self.flush_interval = flush_interval or VIEW_TRACKING["FLUSH_INTERVAL"]
+        self._counts = Counter()
+        self._buffered = 0
+        self._last_flush = time.monotonic()
+        self._lock = threading.Lock()
+
+    def record(self, event_id):
+        """Count a single view, flushing when the buffer is full or stale."""
+        with self._lock:
+            self._counts[int(event_id)] += 1
+            self._buffered += 1
+            flush_due = (
+                self._buffered >= self.flush_threshold
+                or time.monotonic() - self._last_flush >= self.flush_interval
+            )
+
+        if flush_due:
+            self.flush()
+
+    def pending(self, event_id):
+        """Views buffered in this process and not yet flushed."""
+        with self._lock:
+            return self._counts.get(int(event_id), 0)
+
+    def flush(self):
+        """Push buffered counts to Redis, or straight to the DB without Redis."""
+        with self._lock:
+            batch, self._counts = self._counts, Counter()
+            self._buffered = 0
+            self._last_flush = time.monotonic()
+
+        if not batch:
+            return 0
+
+        if redis_client.flush_event_views(batch):
+            return len(batch)
+
+        try:
+            return persist_event_views(batch)
+        except Exception as e:
+            logger.error(f"Failed to persist buffered views: {e}")
+            with self._lock:
+                self._counts.update(batch)
+                self._buffered += sum(batch.values())
+            return 0
+
+
+# Global view counter instance
+view_counter = ViewCounterBuffer()
+atexit.register(view_counter.flush)
@@ -1,4 +1,6 @@
 import json
+import uuid
+from datetime import date, timedelta
 
 from braces.views import GroupRequiredMixin, SuperuserRequiredMixin
 from decouple import config
@@ -9,31 +11,45 @@ from django.contrib.auth.decorators import login_required
 from django.contrib.auth.mixins import LoginRequiredMixin, UserPassesTestMixin
 from django.contrib.auth.views import (PasswordChangeDoneView,
                                        PasswordChangeView)
-from django.core.mail import send_mail
 from django.db import models
-from django.db.models import Count, Q
+from django.db.models import Count, Exists, OuterRef, Prefetch, Q
 from django.http import HttpResponse, JsonResponse
 from django.shortcuts import get_object_or_404, redirect, render
 from django.template.loader import render_to_string
 from django.urls import reverse, reverse_lazy
 from django.utils import timezone
+from django.utils.decorators import method_decorator
 from django.views.decorators.http import require_http_methods
 from django.views.generic import (CreateView, DeleteView, DetailView, ListView,
                                   TemplateView, UpdateView, View)
 from django_filters.views import FilterView
 
-from .constants import UserGroups
+from .attendance import (attend_event, is_attending, register_attendees,
+                         set_rsvp_status)
+from .broadcasts import start_broadcast
+from .cancellation import start_cancellation
+from .constants import (BULK_REGISTRATION, CHECKOUT, PAYMENT_INBOX,
+                        REVENUE_LEDGER, RSVP_STATUS_CHOICES, RSVPStatus,
+                        UserGroups)
+from .domain_events import EventChanged, publish
 from .filters import CategoryFilter, EventFilter
 from .forms.contact_form import ContactForm
 from .forms.forms import CategoryForm, EventForm, EventSearchForm, ProfileForm
-from .models import Category, Event, Payment, Profile
+from .models import RSVP, Category, Event, EventCancellation, Payment, Profile
+from .outbox import enqueue_email
+from .payment_inbox import enqueue_notification
 from .payment_utils import payment_handler
+from .ratelimit import rate_limit
 from .redis_utils import redis_client
+from .revenue import revenue_series
+from .trending import get_trending_events
+from .view_tracking import view_counter
 
 User = get_user_model()
 
 
 # Contact View
+@rate_limit("contact")
 def contact_view(request):
     if request.method == "POST":
         form = ContactForm(request.POST)
@@ -45,18 +61,16 @@ def contact_view(request):
 
             full_message = f"Name: {name}\nEmail: {email}\n\n{message}"
 
-            try:
-                send_mail(
-                    subject,  # Email subject
-                    full_message,  # Email body
-                    settings.DEFAULT_FROM_EMAIL,  # From email
-                    [config("CONTACT_EMAIL", default="admin@eventman.com")],  # To email
-                    fail_silently=False,
-                )
-                messages.success(request, "Your message has been sent successfully!")
-                return redirect("contact")  # Redirect to the contact page (GET request)
-            except Exception as e:
-                messages.error(request, f"There was an error sending your message: {e}")
+            # Queued in the outbox; SMTP runs outside the request
+            enqueue_email(
+                subject,
+                [config("CONTACT_EMAIL", default="admin@eventman.com")],
+                body=full_message,
+                from_email=settings.DEFAULT_FROM_EMAIL,
+                reply_to=[email],
+            )
+            messages.success(request, "Your message has been sent successfully!")
+            return redirect("contact")  # Redirect to the contact page (GET request)
     else:
         form = ContactForm()
     return render(request, "contact.html", {"form": form})
@@ -77,6 +91,7 @@ class HomeView(TemplateView):
         ).order_by("date")[:6]
         context["total_events"] = Event.objects.filter(status="published").count()
         context["total_categories"] = Category.objects.count()
+        context["trending_events"] = get_trending_events()
         return context
 
 
@@ -164,16 +179,20 @@ class ParticipantDashboardView(LoginRequiredMixin, TemplateView):
         user = self.request.user
         current_date = timezone.localdate()
 
+        attending_events = Event.objects.filter(
+            rsvps__user=user, rsvps__status=RSVPStatus.ATTENDING
+        )
+
         context.update(
             {
-                "my_events": user.events_joined.filter(status="published"),
-                "upcoming_events": user.events_joined.filter(
+                "my_events": attending_events.filter(status="published"),
+                "upcoming_events": attending_events.filter(
                     date__gte=current_date, status="published"
                 ).order_by("date"),
-                "past_events": user.events_joined.filter(date__lt=current_date),
+                "past_events": attending_events.filter(date__lt=current_date),
                 "recommended_events": Event.objects.filter(
                     status="published", date__gte=current_date
-                ).exclude(participants=user)[:6],
+                ).exclude(rsvps__in=RSVP.objects.attending().filter(user=user))[:6],
             }
         )
         return context
@@ -192,10 +211,8 @@ class EventListView(FilterView):
     paginate_by = 12
 
     def get_queryset(self):
-        return (
-            Event.objects.select_related("category", "organizer")
-            .prefetch_related("participants")
-            .order_by("date", "time")
+        return Event.objects.select_related("category", "organizer").order_by(
+            "date", "time"
         )
 
     def get_context_data(self, **kwargs):
@@ -226,17 +243,50 @@ class EventDetailView(DetailView):
     template_name = "events/event_detail.html"
     context_object_name = "event"
 
+    participant_preview_limit = 5
+
     def get_queryset(self):
-        return Event.objects.select_related("category", "organizer").prefetch_related(
-            "participants"
+        """Annotate the attending count and prefetch a bounded RSVP preview."""
+        queryset = (
+            Event.objects.select_related("category", "organizer", "cancellation")
+            .annotate(
+                attendee_count=Count(
+                    "rsvps", filter=Q(rsvps__status=RSVPStatus.ATTENDING)
+                )
+            )
+            .prefetch_related(
+                Prefetch(
+                    "rsvps",
+                    queryset=RSVP.objects.attending()
+                    .select_related("user__profile")
+                    .order_by("pk")[: self.participant_preview_limit],
+                    to_attr="participant_preview",
+                )
+            )
         )
 
+        user = self.request.user
+        if user.is_authenticated:
+            queryset = queryset.annotate(
+                user_is_participant=Exists(
+                    RSVP.objects.attending().filter(event=OuterRef("pk"), user=user)
+                )
+            )
+        return queryset
+
 
 class CheckoutView(LoginRequiredMixin, EventDetailView):
     """Displays the checkout page for an event, reusing EventDetailView's logic."""
 
     template_name = "events/checkout.html"
 
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        # One token per rendered page; double submits share it
+        context["checkout_token"] = uuid.uuid4().hex
+        context["max_quantity"] = CHECKOUT["MAX_QUANTITY"]
+        return context
+
 
 class EventCreateView(GroupRequiredMixin, CreateView):
     """Enhanced event creation with crispy forms"""
@@ -278,7 +328,14 @@ class EventUpdateView(GroupRequiredMixin, UserPassesTestMixin, UpdateView):
 
     def form_valid(self, form):
         messages.success(self.request, "Event updated successfully!")
-        return super().form_valid(form)
+        response = super().form_valid(form)
+        if form.changed_data:
+            changes = {
+                field: (str(form.initial.get(field)), str(form.cleaned_data[field]))
+                for field in form.changed_data
+            }
+            publish(EventChanged(self.object.pk, changes, user_id=self.request.user.pk))
+        return response
 
     def get_success_url(self):
         return reverse("event_detail", kwargs={"pk": self.object.pk})
@@ -301,9 +358,81 @@ class EventDeleteView(GroupRequiredMixin, UserPassesTestMixin, DeleteView):
         return super().delete(request, *args, **kwargs)
 
 
+class EventCancelView(GroupRequiredMixin, UserPassesTestMixin, View):
+    """Cancel an event; refunds and attendee notices run in the background"""
+
+    group_required = [UserGroups.ORGANIZER]
+
+    def test_func(self):
+        event = get_object_or_404(Event, pk=self.kwargs["pk"])
+        return self.request.user == event.organizer or self.request.user.is_superuser
+
+    def get(self, request, pk):
+        event = get_object_or_404(Event, pk=pk)
+        return render(request, "events/event_confirm_cancel.html", {"event": event})
+
+    def post(self, request, pk):
+        event = get_object_or_404(Event, pk=pk)
+        start_cancellation(
+            event, user=request.user, reason=request.POST.get("reason", "")[:1000]
+        )
+        messages.success(
+            request,
+            "Event cancelled. Refunds and attendee notices are being processed.",
+        )
+        return redirect("event_detail", pk=pk)
+
+
+class EventBroadcastView(GroupRequiredMixin, UserPassesTestMixin, View):
+    """Message every attendee; the fan-out runs in the background"""
+
+    group_required = [UserGroups.ORGANIZER]
+
+    def test_func(self):
+        event = get_object_or_404(Event, pk=self.kwargs["pk"])
+        return self.request.user == event.organizer or self.request.user.is_superuser
+
+    def get(self, request, pk):
+        event = get_object_or_404(Event, pk=pk)
+        return render(request, "events/event_broadcast.html", {"event": event})
+
+    def post(self, request, pk):
+        event = get_object_or_404(Event, pk=pk)
+        subject = request.POST.get("subject", "").strip()[:200]
+        message = request.POST.get("message", "").strip()[:5000]
+        if not subject or not message:
+            messages.error(request, "Both a subject and a message are required.")
+            return render(
+                request,
+                "events/event_broadcast.html",
+                {"event": event, "subject": subject, "message": message},
+                status=400,
+            )
+        start_broadcast(event, request.user, subject, message)
+        messages.success(request, "Your message is being sent to all attendees.")
+        return redirect("event_detail", pk=pk)
+
+
+@login_required
+def cancellation_progress_htmx(request, pk):
+    cancellation = get_object_or_404(
+        EventCancellation.objects.select_related("event"), event_id=pk
+    )
+    if not (
+        request.user.is_superuser or cancellation.event.organizer_id == request.user.pk
+    ):
+        return HttpResponse(status=404)
+    return render(
+        request,
+        "events/_cancellation_progress.html",
+        {"cancellation": cancellation},
+    )
+
+
 # ===== HTMX RSVP VIEW =====
 
 
+@method_decorator(rate_limit("rsvp"), name="post")
 class RSVPToggleView(LoginRequiredMixin, View):
     """HTMX-powered RSVP toggle"""
 
@@ -311,18 +440,38 @@ class RSVPToggleView(LoginRequiredMixin, View):
         event = get_object_or_404(Event, pk=pk, status="published")
         user = request.user
 
-        user_is_participant = user in event.participants.all()
+        # An explicit status wins; otherwise toggle attending on and off
+        status = request.POST.get("status")
+        if status not in dict(RSVP_STATUS_CHOICES):
+            status = (
+                RSVPStatus.NOT_ATTENDING
+                if is_attending(event, user)
+                else RSVPStatus.ATTENDING
+            )
 
-        if user_is_participant:
-            event.participants.remove(user)
-            message = "RSVP cancelled successfully!"
-            btn_class = "btn-primary"
-            btn_text = "📝 RSVP"
-        else:
-            event.participants.add(user)
+        if status != RSVPStatus.ATTENDING:
+            set_rsvp_status(event, user, status)
+        elif not attend_event(event, user):
+            message = "Sorry, this event is fully booked."
+            if request.htmx:
+                response = HttpResponse(status=409)
+                response["HX-Trigger"] = json.dumps({"showMessage": message})
+                return response
+            messages.error(request, message)
+            return redirect("event_detail", pk=event.pk)
+
+        if status == RSVPStatus.ATTENDING:
             message = "RSVP confirmed! See you at the event!"
             btn_class = "btn-success"
             btn_text = "✅ RSVP'd"
+        elif status == RSVPStatus.MAYBE:
+            message = "Marked as maybe. Let us know when you decide!"
+            btn_class = "btn-primary"
+            btn_text = "🤔 Maybe"
+        else:
+            message = "RSVP cancelled successfully!"
+            btn_class = "btn-primary"
+            btn_text = "📝 RSVP"
 
         if request.htmx:
             # Return updated button HTML
@@ -335,7 +484,7 @@ class RSVPToggleView(LoginRequiredMixin, View):
             """
             response = HttpResponse(html)
             response["HX-Trigger"] = json.dumps(
-                {"showMessage": message, "updateCount": event.participants.count()}
+                {"showMessage": message, "updateCount": event.participant_count()}
             )
             return response
 
@@ -344,6 +493,70 @@ class RSVPToggleView(LoginRequiredMixin, View):
         return redirect("event_detail", pk=event.pk)
 
 
+class BulkRegistrationView(LoginRequiredMixin, UserPassesTestMixin, View):
+    """JSON endpoint for registering a whole group to an event at once"""
+
+    def test_func(self):
+        event = get_object_or_404(Event, pk=self.kwargs["pk"])
+        return self.request.user == event.organizer or self.request.user.is_superuser
+
+    def post(self, request, pk):
+        event = get_object_or_404(Event, pk=pk)
+        if event.status != "published":
+            return JsonResponse(
+                {"error": "Event is not open for registration"}, status=409
+            )
+
+        try:
+            payload = json.loads(request.body or "{}")
+        except json.JSONDecodeError:
+            return JsonResponse({"error": "Invalid JSON body"}, status=400)
+
+        if not isinstance(payload, dict):
+            return JsonResponse({"error": "Expected a JSON object"}, status=400)
+        identifiers = {}
+        for field in ("emails", "usernames"):
+            values = payload.get(field) or []
+            if not isinstance(values, list) or not all(
+                isinstance(value, str) for value in values
+            ):
+                return JsonResponse(
+                    {"error": f"{field} must be a list of strings"}, status=400
+                )
+            identifiers[field] = set(values)
+        emails, usernames = identifiers["emails"], identifiers["usernames"]
+        if not emails and not usernames:
+            return JsonResponse({"error": "Provide emails or usernames"}, status=400)
+        if len(emails) + len(usernames) > BULK_REGISTRATION["MAX_ATTENDEES"]:
+            return JsonResponse(
+                {
+                    "error": f"At most {BULK_REGISTRATION['MAX_ATTENDEES']} "
+                    "attendees per request"
+                },
+                status=400,
+            )
+
+        users = list(
+            User.objects.filter(Q(email__in=emails) | Q(username__in=usernames))
+        )
+        unknown = (emails - {u.email for u in users}) | (
+            usernames - {u.username for u in users}
+        )
+
+        result = register_attendees(event, users)
+        if not result["success"]:
+            return JsonResponse({"error": result["error"]}, status=409)
+
+        return JsonResponse(
+            {
+                "registered": len(result["registered"]),
+                "already_registered": len(result["already_registered"]),
+                "unknown": sorted(unknown),
+            },
+            status=201 if result["registered"] else 200,
+        )
+
+
 # ===== CATEGORY VIEWS =====
 
 
@@ -445,9 +658,8 @@ class ParticipantListView(GroupRequiredMixin, ListView):
 
     def get_queryset(self):
         return (
-            User.objects.filter(events_joined__isnull=False)
-            .distinct()
-            .annotate(event_count=Count("events_joined"))
+            User.objects.filter(rsvps__status=RSVPStatus.ATTENDING)
+            .annotate(event_count=Count("rsvps"))
             .order_by("-event_count")
         )
 
@@ -464,7 +676,8 @@ class DashboardStatsView(LoginRequiredMixin, View):
         if request.user.is_superuser:
             stats = {
                 "total_events": Event.objects.count(),
-                "total_participants": User.objects.filter(events_joined__isnull=False)
+                "total_participants": RSVP.objects.attending()
+                .values("user")
                 .distinct()
                 .count(),
                 "past_events": Event.objects.filter(date__lt=current_date).count(),
@@ -476,9 +689,9 @@ class DashboardStatsView(LoginRequiredMixin, View):
             user_events = Event.objects.filter(organizer=request.user)
             stats = {
                 "total_events": user_events.count(),
-                "total_participants": User.objects.filter(
-                    events_joined__organizer=request.user
-                )
+                "total_participants": RSVP.objects.attending()
+                .filter(event__organizer=request.user)
+                .values("user")
                 .distinct()
                 .count(),
                 "past_events": user_events.filter(date__lt=current_date).count(),
@@ -487,7 +700,9 @@ class DashboardStatsView(LoginRequiredMixin, View):
                 ).count(),
             }
         else:
-            user_events = request.user.events_joined.all()
+            user_events = Event.objects.filter(
+                rsvps__user=request.user, rsvps__status=RSVPStatus.ATTENDING
+            )
             stats = {
                 "total_events": user_events.count(),
                 "upcoming_events": user_events.filter(
@@ -504,20 +719,54 @@ class DashboardStatsView(LoginRequiredMixin, View):
 
 @login_required
 @require_http_methods(["POST"])
+@rate_limit("payment")
 def initiate_payment(request, pk):
     """Secure payment initiation with CSRF protection."""
     event = get_object_or_404(Event, pk=pk, status="published")
 
     # Check if user already has a valid ticket
-    if request.user in event.participants.all():
+    if is_attending(event, request.user):
         messages.info(request, "You already have a ticket for this event!")
         return redirect("event_detail", pk=pk)
 
-    # Create payment session
-    result = payment_handler.create_payment_session(request, event, request.user)
+    try:
+        quantity = int(request.POST.get("quantity", 1))
+    except ValueError:
+        quantity = 0
+    if not 1 <= quantity <= CHECKOUT["MAX_QUANTITY"]:
+        messages.error(
+            request,
+            f"You can buy between 1 and {CHECKOUT['MAX_QUANTITY']} tickets per order.",
+        )
+        return redirect("event_checkout", pk=pk)
+
+    # Create (or, for a resubmitted checkout page, reuse) the payment session
+    checkout_token = request.POST.get("checkout_token", "")[:64] or None
+    result = payment_handler.create_payment_session(
+        request,
+        event,
+        request.user,
+        idempotency_key=checkout_token,
+        coupon_code=request.POST.get("coupon_code", "").strip()[:50] or None,
+        quantity=quantity,
+    )
 
     if result["success"]:
         return redirect(result["gateway_url"])
+    elif result.get("in_flight") or result.get("conflict"):
+        # An earlier submit of this page holds the token; the page polls
+        # while that submit is still starting its session
+        return render(
+            request,
+            "events/checkout_session.html",
+            {
+                "event": event,
+                "checkout_token": checkout_token,
+                "error": result.get("error"),
+                "poll_interval": CHECKOUT["IN_FLIGHT_POLL"],
+            },
+            status=409 if result.get("conflict") else 202,
+        )
     else:
         messages.error(
             request,
@@ -526,36 +775,73 @@ def initiate_payment(request, pk):
         return redirect("event_detail", pk=pk)
 
 
-@require_http_methods(["GET", "POST"])
-def payment_success(request):
-    """Secure payment success handler."""
-    if request.method == "GET":
-        # Handle GET requests (user redirected from payment gateway)
-        tran_id = request.GET.get("tran_id")
-        if not tran_id:
-            messages.error(request, "Invalid payment response.")
-            return redirect("event_list")
+@login_required
+def checkout_status(request, pk, token):
+    """Send a page polling an in-flight checkout on once its session starts."""
+    event = get_object_or_404(Event, pk=pk)
+    result = payment_handler.checkout_status(event, request.user, token)
+    if result.get("in_flight"):
+        # No content: htmx leaves the page as it is and polls again
+        return HttpResponse(status=204)
+
+    response = HttpResponse()
+    if result["success"]:
+        response["HX-Redirect"] = result["gateway_url"]
     else:
-        # Handle POST requests (callback from payment gateway)
-        tran_id = request.POST.get("tran_id")
+        messages.error(request, f"Payment initiation failed: {result['error']}")
+        response["HX-Redirect"] = reverse("event_detail", args=[pk])
+    return response
+
 
+@require_http_methods(["GET", "POST"])
+def payment_success(request):
+    """Acknowledge the gateway redirect and validate it in the background."""
+    payment_data = request.POST if request.method == "POST" else request.GET
+    tran_id = payment_data.get("tran_id")
     if not tran_id:
+        messages.error(request, "Invalid payment response.")
+        return redirect("event_list")
+
+    payment = (
+        Payment.objects.select_related("event").filter(transaction_id=tran_id).first()
+    )
+    if payment is None:
         messages.error(request, "Missing transaction information.")
         return redirect("event_list")
 
-    # Validate payment
-    result = payment_handler.validate_payment(request.POST or request.GET)
+    if payment.status == "pending":
+        enqueue_notification("redirect", payment_data)
+
+    # Anyone can replay a transaction id; only the payer sees its details
+    if not (request.user.is_staff or request.user.pk == payment.user_id):
+        return render(request, "payment_success.html", {"payment": None})
+
+    if payment.status == "valid":
+        messages.success(request, f"Payment successful for {payment.event.name}!")
+    return render(
+        request,
+        "payment_success.html",
+        {
+            "event": payment.event,
+            "payment": payment,
+            "poll_interval": PAYMENT_INBOX["POLL_INTERVAL"],
+        },
+    )
 
-    if result["success"]:
-        event = result["event"]
-        messages.success(request, f"Payment successful for {event.name}!")
-        return render(request, "payment_success.html", {"event": event})
-    else:
-        messages.error(
-            request,
-            f"Payment validation failed: {result.get('error', 'Unknown error')}",
-        )
-        return redirect("event_list")
+
+@login_required
+def payment_status_htmx(request, tran_id):
+    payments = Payment.objects.select_related("event")
+    if not request.user.is_staff:
+        payments = payments.filter(user=request.user)
+    payment = get_object_or_404(payments, transaction_id=tran_id)
+
+    context = {
+        "payment": payment,
+        "event": payment.event,
+        "poll_interval": PAYMENT_INBOX["POLL_INTERVAL"],
+    }
+    return render(request, "events/_payment_status.html", context)
 
 
 @require_http_methods(["GET", "POST"])
@@ -582,15 +868,9 @@ def payment_ipn(request):
     logger = logging.getLogger(__name__)
     logger.info(f"IPN received from IP: {request.META.get('REMOTE_ADDR')}")
 
-    # Validate payment
-    result = payment_handler.validate_payment(request.POST)
-
-    if result["success"]:
-        logger.info(f"IPN processed successfully: {request.POST.get('tran_id')}")
-        return HttpResponse("IPN Processed")
-    else:
-        logger.warning(f"IPN validation failed: {result.get('error')}")
-        return HttpResponse("IPN Received")
+    # Store and acknowledge; validation happens in the background
+    enqueue_notification("ipn", request.POST)
+    return HttpResponse("IPN Received")
 
 
 # Import existing password change views
@@ -650,7 +930,8 @@ class CachedDashboardStatsView(DashboardStatsView):
         if request.user.is_superuser:
             stats = {
                 "total_events": Event.objects.count(),
-                "total_participants": User.objects.filter(events_joined__isnull=False)
+                "total_participants": RSVP.objects.attending()
+                .values("user")
                 .distinct()
                 .count(),
                 "past_events": Event.objects.filter(date__lt=current_date).count(),
@@ -663,9 +944,9 @@ class CachedDashboardStatsView(DashboardStatsView):
             user_events = Event.objects.filter(organizer=request.user)
             stats = {
                 "total_events": user_events.count(),
-                "total_participants": User.objects.filter(
-                    events_joined__organizer=request.user
-                )
+                "total_participants": RSVP.objects.attending()
+                .filter(event__organizer=request.user)
+                .values("user")
                 .distinct()
                 .count(),
                 "past_events": user_events.filter(date__lt=current_date).count(),
@@ -675,7 +956,9 @@ class CachedDashboardStatsView(DashboardStatsView):
                 "cache_status": "fresh",
             }
         else:
-            user_events = request.user.events_joined.all()
+            user_events = Event.objects.filter(
+                rsvps__user=request.user, rsvps__status=RSVPStatus.ATTENDING
+            )
             stats = {
                 "total_events": user_events.count(),
                 "upcoming_events": user_events.filter(
@@ -691,26 +974,30 @@ class CachedDashboardStatsView(DashboardStatsView):
         return JsonResponse(stats)
 
 
-# Enhanced event detail view with Redis view tracking
+# Enhanced event detail view with buffered view tracking
 class CachedEventDetailView(EventDetailView):
     """Enhanced event detail with view tracking"""
 
     def get(self, request, *args, **kwargs):
         response = super().get(request, *args, **kwargs)
 
-        # Increment view count
+        # Buffer the view; flushed to Redis and persisted in batches
         event_id = kwargs.get("pk")
         if event_id:
-            redis_client.increment_event_views(event_id)
+            view_counter.record(event_id)
 
         return response
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
 
-        # Add view count to context
+        # Persisted views plus those still pending in Redis and this process
         event_id = self.object.pk
-        context["view_count"] = redis_client.get_event_views(event_id)
+        context["view_count"] = (
+            self.object.view_count
+            + redis_client.get_event_views(event_id)
+            + view_counter.pending(event_id)
+        )
 
         return context
 
@@ -729,6 +1016,13 @@ def get_live_stats_htmx(request):
     return render(request, "events/_live_stats.html", context)
 
 
+def get_trending_events_htmx(request):
+    context = {
+        "trending_events": get_trending_events(),
+    }
+    return render(request, "events/_trending_events.html", context)
+
+
 @login_required
 def get_participant_payments_htmx(request):
     user_payments = (
@@ -796,6 +1090,80 @@ def get_admin_stats_htmx(request):
     return render(request, "events/_admin_stats.html", context)
 
 
+def _parse_date_param(request, name, default):
+    value = request.GET.get(name)
+    return date.fromisoformat(value) if value else default
+
+
+@login_required
+def revenue_timeseries(request):
+    """Daily revenue from the ledger, as JSON or an HTMX chart fragment."""
+    user = request.user
+    if not (
+        user.is_superuser or user.groups.filter(name=UserGroups.ORGANIZER).exists()
+    ):
+        return JsonResponse({"error": "Not allowed"}, status=403)
+
+    try:
+        end = _parse_date_param(request, "end", timezone.localdate())
+        start = _parse_date_param(
+            request,
+            "start",
+            end - timedelta(days=REVENUE_LEDGER["DEFAULT_RANGE_DAYS"] - 1),
+        )
+        event_id = int(request.GET["event"]) if request.GET.get("event") else None
+        organizer_id = (
+            int(request.GET["organizer"]) if request.GET.get("organizer") else None
+        )
+    except ValueError:
+        return JsonResponse({"error": "Invalid date or id parameter"}, status=400)
+
+    if start > end or (end - start).days >= REVENUE_LEDGER["MAX_RANGE_DAYS"]:
+        return JsonResponse(
+            {"error": f"Range must be at most {REVENUE_LEDGER['MAX_RANGE_DAYS']} days"},
+            status=400,
+        )
+
+    # Organizers only ever see their own events
+    if not user.is_superuser:
+        organizer_id = user.pk
+
+    series = revenue_series(start, end, organizer_id=organizer_id, event_id=event_id)
+    total_revenue = sum(point["revenue"] for point in series)
+    total_tickets = sum(point["tickets"] for point in series)
+
+    if request.htmx:
+        peak = max((point["revenue"] for point in series), default=0) or 1
+        for point in series:
+            point["percent"] = round(point["revenue"] * 100 / peak)
+        context = {
+            "series": series,
+            "start": start,
+            "end": end,
+            "event_id": event_id,
+            "total_revenue": total_revenue,
+            "total_tickets": total_tickets,
+        }
+        return render(request, "events/_revenue_chart.html", context)
+
+    return JsonResponse(
+        {
+            "start": start.isoformat(),
+            "end": end.isoformat(),
+            "total_revenue": f"{total_revenue:.2f}",
+            "total_tickets": total_tickets,
+            "series": [
+                {
+                    "day": point["day"].isoformat(),
+                    "revenue": f"{point['revenue']:.2f}",
+                    "tickets": point["tickets"],
+                }
+                for point in series
+            ],
+        }
+    )
+
+
 @login_required
 def get_admin_payments_htmx(request):
     all_payments = (